@@ -1,5 +1,8 @@
 import streamlit as st
-import streamlit.components.v1 as components
+
+from combat_log import combat_log
+from combat_sim import estimate
+from game_component import hit_stop_gallery, hit_stop_game
 
 st.set_page_config(page_title="Hit Stop Othello: Final Fix", layout="wide")
 
@@ -13,6 +16,15 @@ OPT_SHOTGUN = "ショットガン (Shotgun) 🔫"
 OPT_LASER = "レーザーガン (Laser Gun) ⚡"
 OPT_BEAM = "極太ビーム (Giant Beam) ☄️"
 
+# ★「並べて比べる」では5つの武器のアリーナを1つのコンポーネントに並べる（この順で、見出しはラジオと同じ）★
+VIEW_SINGLE = "1つの武器で遊ぶ"
+VIEW_GALLERY = "5つの武器を並べて比べる"
+GALLERY_ARENAS = (("ball", OPT_BALL), ("sword", OPT_SWORD), ("shotgun", OPT_SHOTGUN),
+                  ("laser", OPT_LASER), ("giant_beam", OPT_BEAM))
+
+view_mode = st.sidebar.radio("表示", (VIEW_SINGLE, VIEW_GALLERY),
+                             help="並べて比べるときは、画面に入っていて動いている枠だけを描きます。"
+                                  "下の武器選択は、調整とサイドバーの予測・実測を出す武器です")
 weapon_mode = st.sidebar.radio(
     "武器選択 ⚔️",
     (OPT_BALL, OPT_SWORD, OPT_SHOTGUN, OPT_LASER, OPT_BEAM)
@@ -27,636 +39,169 @@ giant_beam_damage = 15
 
 if game_mode == "通常バトル (Normal)":
     start_hp = st.sidebar.slider("白丸のHP", 100, 5000, 200, step=100) 
-    is_infinite_js = "false"
+    is_infinite = False
 else:
     start_hp = 9999
-    is_infinite_js = "true"
+    is_infinite = True
+
+sandbag_count = st.sidebar.slider("サンドバッグの数", 1, 300, 1,
+                                  help="2体以上で右半分に並べます（当たり判定は空間ハッシュで絞り込み）")
+sfx_volume = st.sidebar.slider("🔊 効果音の音量", 0, 100, 60,
+                               help="当たった瞬間に、ヒットストップが長い重い当たりほど低く大きな音を鳴らします（0で鳴らさない）。"
+                                    "ブラウザの決まりで、ゲームを1回クリックするまでは鳴りません")
 
 # ★変数を使って確実に分岐させる！★
 if weapon_mode == OPT_BALL:
-    weapon_type_js = "'ball'"
+    weapon_type = "ball"
     st.sidebar.info("速度に応じてヒットストップが変化する「重量級」武器！⚫")
 
 elif weapon_mode == OPT_SWORD:
-    weapon_type_js = "'sword'"
+    weapon_type = "sword"
     st.sidebar.markdown("---")
     sword_hit_stop = st.sidebar.slider("⚔️ 斬撃の重さ", 0, 20, 5)
     expected_dmg = int(10 + (sword_hit_stop * 1.5))
     st.sidebar.caption(f"威力: {expected_dmg}ダメージ/1hit")
 
 elif weapon_mode == OPT_SHOTGUN:
-    weapon_type_js = "'shotgun'"
+    weapon_type = "shotgun"
     st.sidebar.markdown("---")
     shotgun_damage = st.sidebar.slider("🔫 散弾1発の威力", 1, 20, 8)
     st.sidebar.caption(f"全弾威力: {shotgun_damage * 12}")
 
 elif weapon_mode == OPT_LASER:
-    weapon_type_js = "'laser'"
+    weapon_type = "laser"
     st.sidebar.markdown("---")
     laser_damage = st.sidebar.slider("⚡ レーザー威力", 10, 100, 25)
 
 elif weapon_mode == OPT_BEAM:
-    weapon_type_js = "'giant_beam'"
+    weapon_type = "giant_beam"
     st.sidebar.markdown("---")
     giant_beam_damage = st.sidebar.slider("☄️ ビーム威力(1hit)", 5, 50, 15)
     st.sidebar.caption(f"最大5hit時の合計: {giant_beam_damage * 5}")
 
+# ★ヘッドレス・シミュレーターで見込みを計算（同じ設定はプロセス全体で使い回し）★
+stats = estimate(
+    weapon_type, max_hp=start_hp, infinite=is_infinite,
+    sword_hit_stop=sword_hit_stop, shotgun_damage=shotgun_damage,
+    laser_damage=laser_damage, giant_beam_damage=giant_beam_damage,
+)
+st.sidebar.markdown("---")
+st.sidebar.markdown("##### 📊 シミュレーション予測")
+col_a, col_b = st.sidebar.columns(2)
+if is_infinite:
+    col_a.metric("DPS", f"{stats.dps:.0f}")
+    col_b.metric("ヒットストップ/分", f"{stats.hit_stop_frames:.0f}F")
+else:
+    if stats.ko_rate > 0:
+        ttk_label = f"{stats.ttk_median:.1f}秒"
+    elif stats.dps > 0:
+        ttk_label = f"{stats.horizon_seconds:.0f}秒超"  # 一番長く回しても撃破まで届かなかった
+    else:
+        ttk_label = "撃破できず"
+    col_a.metric("撃破まで", ttk_label)
+    col_b.metric("DPS", f"{stats.dps:.0f}")
+    st.sidebar.caption(
+        f"撃破までのヒットストップ: 約{stats.hit_stop_frames:.0f}フレーム / {stats.hits:.1f}ヒット"
+    )
+    if 0 < stats.ko_rate:
+        st.sidebar.caption(f"ばらつき: {stats.ttk_p10:.1f}〜{stats.ttk_p90:.1f}秒（{stats.engagements}戦）")
+# ゲーム側で撃破したら実測をここに出す（コンポーネントの戻り値は描画のあとで分かる）
+actual_slot = st.sidebar.empty()
+# ゲームから戦闘ログが届いたら、このセッションの実測（DPS・ヒットストップ量）をここに出す
+combat_slot = st.sidebar.container()
+
+st.sidebar.markdown("---")
+with st.sidebar.expander("⚙️ パフォーマンス設定"):
+    particle_budget = st.slider("パーティクル上限", 200, 5000, 1500, step=100,
+                                help="上限に達したら一番薄い粒から上書きされます")
+    # 自動 = 重さを見て 高→中→低→最低 を行き来する。それ以外は段階を固定
+    quality_label = st.selectbox("描画品質", ("自動", "高", "中", "低", "最低"),
+                                 help="低いほど内部解像度・火花の数・光のぼかしを削ります")
+    quality_tier = ("自動", "高", "中", "低", "最低").index(quality_label) - 1
+    quality_down_ms = st.slider("品質を下げる目安 (ms/フレーム)", 17, 50, 20, disabled=quality_tier >= 0,
+                                help="直近60フレームの平均間隔がこれを超えたら1段下げます")
+    quality_up_ms = st.slider("品質を上げる目安 (処理ms)", 2, 16, 8, disabled=quality_tier >= 0,
+                              help="1フレームの処理時間の平均がこれを下回り続けたら1段上げます")
+    perf_hud = st.checkbox("パフォーマンスHUDを表示",
+                           help="fps・フレーム時間・フェーズ別の処理時間・エンティティ数を左上に出します")
+    renderer_label = st.selectbox("描画エンジン", ("Canvas 2D", "WebGL"),
+                                  help="WebGL は火花・弾・ビーム・ヒットストップの輪を GPU でまとめて描きます（数千個でも軽い）。"
+                                       "使えない環境では自動で Canvas 2D に戻ります")
+    renderer = "webgl" if renderer_label == "WebGL" else "canvas"
+    use_worker = st.checkbox("別スレッドで動かす (OffscreenCanvas)", value=True,
+                             help="シミュレーションと描画をワーカーで回して、ページが重くてもカクつかないようにします。"
+                                  "使えないブラウザでは自動で今までどおりに動きます（切り替えはページの再読み込み後）")
+
+# ★ゲーム右下の「⏺ 記録を保存」で落とした .hsr を、描画なしで早回しして再現・計測する★
+replay_file = None
+if view_mode == VIEW_SINGLE:
+    with st.sidebar.expander("🎞️ リプレイ"):
+        replay_file = st.file_uploader("記録ファイル (.hsr)", type=["hsr"],
+                                       help="シードと入力だけの記録です。同じ試合をもう一度流して、かかった時間と結果の一致を確認します")
+        replay_slot = st.container()
+
 st.title("ヒットストップで遊ぶ🛠️")
 st.write("いろんな武器でヒットストップを体験できるよ。")
 
-html_template = """
-<!DOCTYPE html>
-<html>
-<head>
-<meta name="viewport" content="width=device-width, initial-scale=1.0, user-scalable=no">
-<style>
-    body { 
-        margin: 0; overflow: hidden; background-color: #f0f2f6; 
-        display: flex; justify-content: center; align-items: center; height: 100vh;
-        touch-action: none; font-family: 'Arial Black', sans-serif;
-    }
-    canvas { 
-        box-shadow: 0 4px 6px rgba(0,0,0,0.3); 
-        background-color: #262730;
-        border-radius: 10px;
-        cursor: crosshair;
-    }
-    #respawnBtn {
-        position: absolute; top: 50%; left: 50%;
-        transform: translate(-50%, -50%);
-        padding: 15px 30px; font-size: 24px; font-weight: bold;
-        color: white; background-color: #ff4b4b;
-        border: none; border-radius: 50px; cursor: pointer;
-        display: none; box-shadow: 0 0 20px rgba(255, 75, 75, 0.6);
-        animation: pulse 1.5s infinite; z-index: 10;
-    }
-    @keyframes pulse {
-        0% { transform: translate(-50%, -50%) scale(1); }
-        50% { transform: translate(-50%, -50%) scale(1.1); }
-        100% { transform: translate(-50%, -50%) scale(1); }
-    }
-</style>
-</head>
-<body>
-
-<canvas id="gameCanvas"></canvas>
-<button id="respawnBtn" onclick="respawn()">もう一回戦う！🥊</button>
-
-<script>
-    const canvas = document.getElementById('gameCanvas');
-    const ctx = canvas.getContext('2d');
-    const respawnBtn = document.getElementById('respawnBtn');
-
-    const IS_INFINITE = __IS_INFINITE__;
-    const MAX_HP = __MAX_HP__;
-    const WEAPON_TYPE = __WEAPON_TYPE__;
-    const SWORD_HIT_STOP_VAL = __SWORD_HIT_STOP__;
-    const SHOTGUN_DAMAGE_VAL = __SHOTGUN_DAMAGE__;
-    const LASER_DAMAGE_VAL = __LASER_DAMAGE__;
-    const GIANT_BEAM_DAMAGE_VAL = __GIANT_BEAM_DAMAGE__;
-
-    function resizeCanvas() {
-        canvas.width = window.innerWidth;
-        canvas.height = window.innerHeight;
-        if(white.hp > 0 && white.baseX === 0) initPositions();
-    }
-    window.addEventListener('resize', resizeCanvas);
-
-    const GRAVITY = 0.5; const FRICTION = 0.98; const BOUNCE = 0.7;
-    const KO_HIT_STOP = 120;
-    
-    // 武器設定
-    const SWORD_LENGTH = 130; const SWORD_SWING_ANGLE = 120 * (Math.PI / 180); const SWORD_SPEED = 12;
-    const FIXED_UP_ANGLE = -Math.PI / 2; 
-    const SHOTGUN_PELLETS = 12; const SHOTGUN_SPREAD = Math.PI / 5; const SHOTGUN_SPEED = 25; const SHOTGUN_COOLDOWN = 40; 
-    const LASER_COOLDOWN = 30; const LASER_SPEED = 45; const LASER_LENGTH = 160; const LASER_SPREAD = Math.PI / 6; 
-    const GIANT_BEAM_SPEED = 8; const GIANT_BEAM_WIDTH = 240; const GIANT_BEAM_HEIGHT = 80; const GIANT_BEAM_COOLDOWN = 60; const GIANT_BEAM_MAX_HITS = 5;
-
-    let black = { 
-        x: 100, y: 100, vx: 0, vy: 0, radius: 30, 
-        isDragging: false, 
-        angle: FIXED_UP_ANGLE, baseAngle: FIXED_UP_ANGLE, swingProgress: 0, isSwinging: false,
-        hitFlags: [false, false, false],
-        cooldownTimer: 0, 
-        targetX: 100, targetY: 100
-    };
-    let white = { x: 0, y: 0, baseX: 0, baseY: 0, radius: 30, hp: MAX_HP, visible: true };
-    let isKO = false;
-
-    function initPositions() {
-        white.baseX = window.innerWidth * 0.75;
-        white.baseY = window.innerHeight * 0.5;
-        white.x = white.baseX; white.y = white.baseY;
-        black.x = window.innerWidth * 0.25; black.y = window.innerHeight * 0.5;
-        black.vx = 0; black.vy = 0; black.targetX = black.x; black.targetY = black.y;
-        black.angle = FIXED_UP_ANGLE; black.baseAngle = FIXED_UP_ANGLE;
-        black.cooldownTimer = 0;
-    }
-    
-    window.respawn = function() {
-        white.hp = MAX_HP; white.visible = true; isKO = false;
-        initPositions(); respawnBtn.style.display = 'none';
-    };
-
-    setTimeout(() => { resizeCanvas(); initPositions(); }, 100);
-
-    let mouseX = 0, mouseY = 0; let lastMouseX = 0, lastMouseY = 0;
-    let hitStopTimer = 0;
-    let particles = [];
-    let slashEffects = [];
-    let damagePopups = [];
-    let pellets = []; 
-    let laserBolts = []; 
-    let giantBeams = []; 
-    let screenShakeX = 0, screenShakeY = 0;
-
-    class Particle {
-        constructor(x, y, isBig, colorOverride) {
-            this.x = x; this.y = y;
-            const angle = Math.random() * Math.PI * 2;
-            const speed = isBig ? Math.random() * 15 + 5 : Math.random() * 5 + 2;
-            this.vx = Math.cos(angle) * speed; this.vy = Math.sin(angle) * speed;
-            this.life = 1.0;
-            this.decay = isBig ? Math.random() * 0.01 + 0.005 : Math.random() * 0.05 + 0.02;
-            this.color = colorOverride ? colorOverride : (isBig ? `hsl(${Math.random()*60 + 10}, 100%, 60%)` : '#FFD700');
-            this.size = isBig ? Math.random() * 8 + 4 : Math.random() * 3 + 2;
-        }
-        update() { this.x += this.vx; this.y += this.vy; this.vx *= 0.95; this.vy *= 0.95; this.life -= this.decay; }
-        draw(ctx) { ctx.globalAlpha = this.life; ctx.fillStyle = this.color; ctx.beginPath(); ctx.arc(this.x, this.y, this.size, 0, Math.PI * 2); ctx.fill(); ctx.globalAlpha = 1.0; }
-    }
-
-    class SlashEffect {
-        constructor(x, y, angle) {
-            this.x = x; this.y = y; this.angle = angle;
-            this.life = 1.0; this.length = Math.max(window.innerWidth, window.innerHeight) * 2.5; this.width = 2;
-        }
-        update() { this.life -= 0.08; this.width += 4; }
-        draw(ctx) {
-            ctx.save(); ctx.translate(this.x, this.y); ctx.rotate(this.angle);
-            ctx.globalAlpha = this.life; ctx.fillStyle = 'white'; ctx.shadowBlur = 20; ctx.shadowColor = 'cyan';
-            ctx.fillRect(-this.length/2, -this.width/2, this.length, this.width); ctx.rotate(Math.PI / 2);
-            ctx.fillRect(-this.length/2, -this.width/4, this.length, this.width/2);
-            ctx.restore(); ctx.globalAlpha = 1.0;
-        }
-    }
-
-    class Pellet {
-        constructor(x, y, angle) {
-            this.x = x; this.y = y;
-            this.vx = Math.cos(angle) * SHOTGUN_SPEED; this.vy = Math.sin(angle) * SHOTGUN_SPEED;
-            this.life = 30; this.size = 5;
-        }
-        update() { this.x += this.vx; this.y += this.vy; this.life--; }
-        draw(ctx) {
-            ctx.fillStyle = '#ffff00'; ctx.beginPath(); ctx.arc(this.x, this.y, this.size, 0, Math.PI * 2); ctx.fill();
-            ctx.strokeStyle = 'rgba(255, 255, 0, 0.5)'; ctx.lineWidth = 2;
-            ctx.beginPath(); ctx.moveTo(this.x, this.y); ctx.lineTo(this.x - this.vx*2, this.y - this.vy*2); ctx.stroke();
-        }
-    }
-
-    class LaserBolt {
-        constructor(x, y, angle, generation) {
-            this.x = x; this.y = y; this.angle = angle;
-            this.vx = Math.cos(angle) * LASER_SPEED; this.vy = Math.sin(angle) * LASER_SPEED;
-            this.generation = generation; this.life = 100; this.active = true; this.hasHit = false;
-        }
-        update() {
-            let nextX = this.x + this.vx; let nextY = this.y + this.vy; let hitWall = false; let wallNormal = 0; 
-            if (nextX > canvas.width) { nextX = canvas.width; hitWall = true; wallNormal = Math.PI; }
-            else if (nextX < 0) { nextX = 0; hitWall = true; wallNormal = 0; }
-            if (nextY > canvas.height) { nextY = canvas.height; hitWall = true; wallNormal = -Math.PI/2; }
-            else if (nextY < 0) { nextY = 0; hitWall = true; wallNormal = Math.PI/2; }
-            if (hitWall) {
-                this.active = false; 
-                if (this.generation < 1) {
-                    let reflectAngle = this.angle;
-                    if (wallNormal === 0 || wallNormal === Math.PI) reflectAngle = Math.PI - this.angle; else reflectAngle = -this.angle;
-                    spawnLaser(nextX, nextY, reflectAngle, this.generation + 1); spawnLaser(nextX, nextY, reflectAngle + LASER_SPREAD, this.generation + 1); spawnLaser(nextX, nextY, reflectAngle - LASER_SPREAD, this.generation + 1); 
-                    for(let i=0; i<5; i++) particles.push(new Particle(nextX, nextY, false, '#00ffff'));
-                }
-            } else { this.x = nextX; this.y = nextY; }
-            this.life--; if(this.life <= 0) this.active = false;
-        }
-        draw(ctx) {
-            ctx.save(); ctx.shadowBlur = 15; ctx.shadowColor = '#00ffff'; ctx.strokeStyle = '#ccffff'; ctx.lineWidth = 4; ctx.lineCap = 'round';
-            ctx.beginPath(); ctx.moveTo(this.x, this.y); ctx.lineTo(this.x - Math.cos(this.angle)*LASER_LENGTH, this.y - Math.sin(this.angle)*LASER_LENGTH); ctx.stroke();
-            ctx.restore();
-        }
-    }
-    function spawnLaser(x, y, angle, generation) { laserBolts.push(new LaserBolt(x, y, angle, generation)); }
-
-    class GiantBeam {
-        constructor(x, y, angle) {
-            this.x = x; this.y = y; this.angle = angle;
-            this.vx = Math.cos(angle) * GIANT_BEAM_SPEED; this.vy = Math.sin(angle) * GIANT_BEAM_SPEED;
-            this.life = 150; this.hitCount = 0; this.hitCooldown = 0;
-            this.isHitting = false; 
-        }
-        update() {
-            this.x += this.vx; this.y += this.vy; this.life--;
-            if (this.hitCooldown > 0) this.hitCooldown--;
-            if(Math.random() < 0.3) {
-                const pX = this.x + (Math.random() - 0.5) * GIANT_BEAM_WIDTH * 0.8;
-                const pY = this.y + (Math.random() - 0.5) * GIANT_BEAM_HEIGHT * 0.8;
-                particles.push(new Particle(pX, pY, false, '#ff55ff'));
-            }
-            if(this.isHitting && Math.random() < 0.5) {
-                 particles.push(new Particle(white.x, white.y, false, '#ff00ff'));
-            }
-            this.isHitting = false; 
-        }
-        draw(ctx) {
-            ctx.save(); ctx.translate(this.x, this.y); ctx.rotate(this.angle);
-            const r = GIANT_BEAM_HEIGHT / 2; const w = GIANT_BEAM_WIDTH; const h = GIANT_BEAM_HEIGHT;
-            ctx.beginPath(); ctx.moveTo(r, -h/2); ctx.lineTo(w-r, -h/2); ctx.quadraticCurveTo(w, -h/2, w, 0); ctx.quadraticCurveTo(w, h/2, w-r, h/2); ctx.lineTo(r, h/2); ctx.quadraticCurveTo(0, h/2, 0, 0); ctx.quadraticCurveTo(0, -h/2, r, -h/2); ctx.closePath();
-            ctx.shadowBlur = 40; ctx.shadowColor = '#ff00ff';
-            const grad = ctx.createLinearGradient(0, -h/2, 0, h/2);
-            grad.addColorStop(0, 'rgba(255, 100, 255, 0.5)'); grad.addColorStop(0.5, 'rgba(255, 220, 255, 0.9)'); grad.addColorStop(1, 'rgba(255, 100, 255, 0.5)');
-            ctx.fillStyle = grad; ctx.fill();
-            ctx.shadowBlur = 20; ctx.shadowColor = '#ffffff'; ctx.fillStyle = 'rgba(255, 255, 255, 0.7)';
-            const coreMargin = 10;
-            ctx.beginPath(); ctx.moveTo(r, -h/2 + coreMargin); ctx.lineTo(w-r, -h/2 + coreMargin); ctx.quadraticCurveTo(w-coreMargin, -h/2 + coreMargin, w-coreMargin, 0); ctx.quadraticCurveTo(w-coreMargin, h/2 - coreMargin, w-r, h/2 - coreMargin); ctx.lineTo(r, h/2 - coreMargin); ctx.quadraticCurveTo(coreMargin, h/2 - coreMargin, coreMargin, 0); ctx.quadraticCurveTo(coreMargin, -h/2 + coreMargin, r, -h/2 + coreMargin); ctx.closePath(); ctx.fill();
-            ctx.restore();
-        }
-    }
-
-    class DamagePopup {
-        constructor(x, y, damage, isCritical) {
-            this.x = x; this.y = y; this.damage = Math.floor(damage);
-            this.life = 1.0; this.vy = -2; this.isCritical = isCritical; this.scale = isCritical ? 1.5 : 1.0;
-        }
-        update() { this.y += this.vy; this.vy *= 0.95; this.life -= 0.02; }
-        draw(ctx) {
-            ctx.globalAlpha = this.life;
-            ctx.fillStyle = this.isCritical ? '#ff0000' : '#ffffff';
-            ctx.strokeStyle = 'black'; ctx.lineWidth = 3;
-            ctx.font = `bold ${24 * this.scale}px Arial Black`; ctx.textAlign = 'center';
-            const text = this.damage; ctx.strokeText(text, this.x, this.y); ctx.fillText(text, this.x, this.y); ctx.globalAlpha = 1.0;
-        }
-    }
-
-    function getPointerPos(e) {
-        const rect = canvas.getBoundingClientRect();
-        let cx = e.touches ? e.touches[0].clientX : e.clientX;
-        let cy = e.touches ? e.touches[0].clientY : e.clientY;
-        return { x: cx - rect.left, y: cy - rect.top };
-    }
-
-    function applyDamage(damage, hitX, hitY, isCritical) {
-        if (!IS_INFINITE) white.hp -= damage;
-        damagePopups.push(new DamagePopup(white.x, white.y - 40, damage, isCritical));
-        
-        if (!IS_INFINITE && white.hp <= 0 && !isKO) {
-            isKO = true; white.hp = 0; hitStopTimer = KO_HIT_STOP;
-            for(let i=0; i<80; i++) particles.push(new Particle(white.x, white.y, true));
-        } else if (!isKO) {
-            hitStopTimer = 4; // デフォルト（各武器で上書き）
-            const pCount = Math.floor(damage / 5) + 3;
-            for(let i=0; i<pCount; i++) particles.push(new Particle(hitX, hitY, false, isCritical ? '#ff00ff' : '#FFD700'));
-        }
-    }
-
-    function onDown(e) {
-        if(e.type === 'touchstart') e.preventDefault();
-        const pos = getPointerPos(e);
-        const dist = Math.hypot(pos.x - black.x, pos.y - black.y);
-        
-        if (WEAPON_TYPE === 'ball') {
-            if (dist < black.radius * 2.5) { 
-                black.isDragging = true; black.vx = 0; black.vy = 0; lastMouseX = pos.x; lastMouseY = pos.y;
-            }
-        } else if (WEAPON_TYPE === 'sword') {
-            if (!black.isSwinging) {
-                black.isSwinging = true; black.swingProgress = 0; black.hitFlags = [false, false, false]; black.baseAngle = FIXED_UP_ANGLE;
-            }
-        } else if (WEAPON_TYPE === 'shotgun' || WEAPON_TYPE === 'laser' || WEAPON_TYPE === 'giant_beam') {
-            if (dist < black.radius * 2.5) {
-                black.isDragging = true; black.vx = 0; black.vy = 0;
-            } else {
-                if (black.cooldownTimer <= 0) {
-                    const baseAngle = Math.atan2(pos.y - black.y, pos.x - black.x);
-                    if (WEAPON_TYPE === 'shotgun') {
-                        black.cooldownTimer = SHOTGUN_COOLDOWN; 
-                        for(let i=0; i<20; i++) particles.push(new Particle(black.x + Math.cos(baseAngle)*30, black.y + Math.sin(baseAngle)*30, false, '#ffaa00'));
-                        for (let i = 0; i < SHOTGUN_PELLETS; i++) {
-                            const spread = (Math.random() - 0.5) * SHOTGUN_SPREAD;
-                            pellets.push(new Pellet(black.x, black.y, baseAngle + spread));
-                        }
-                    } else if (WEAPON_TYPE === 'laser') {
-                        black.cooldownTimer = LASER_COOLDOWN;
-                        spawnLaser(black.x, black.y, baseAngle, 0);
-                    } else if (WEAPON_TYPE === 'giant_beam') {
-                        black.cooldownTimer = GIANT_BEAM_COOLDOWN;
-                        hitStopTimer = 6; 
-                        screenShakeX = Math.cos(baseAngle) * -10; 
-                        screenShakeY = Math.sin(baseAngle) * -10;
-                        giantBeams.push(new GiantBeam(black.x, black.y, baseAngle));
-                        for(let i=0; i<30; i++) particles.push(new Particle(black.x + Math.cos(baseAngle)*40, black.y + Math.sin(baseAngle)*40, true, '#ff55ff'));
-                    }
-                }
-            }
-        }
-    }
 
-    function onMove(e) {
-        if(e.type === 'touchmove') e.preventDefault();
-        const pos = getPointerPos(e);
-        mouseX = pos.x; mouseY = pos.y;
-        
-        if (black.isDragging) { 
-            black.x = pos.x; black.y = pos.y; 
-            if (WEAPON_TYPE === 'ball') {
-                black.vx = (pos.x - lastMouseX) * 0.5; black.vy = (pos.y - lastMouseY) * 0.5;
-                lastMouseX = pos.x; lastMouseY = pos.y;
-            }
-        } else if (WEAPON_TYPE === 'sword') { 
-            black.targetX = pos.x; black.targetY = pos.y; 
-        }
-        
-        if ((WEAPON_TYPE === 'shotgun' || WEAPON_TYPE === 'laser' || WEAPON_TYPE === 'giant_beam') && !black.isDragging) {
-             black.angle = Math.atan2(mouseY - black.y, mouseX - black.x);
-        }
-    }
-    
-    function onUp(e) { black.isDragging = false; }
-    
-    canvas.addEventListener('mousedown', onDown); canvas.addEventListener('mouseup', onUp); canvas.addEventListener('mousemove', onMove);
-    canvas.addEventListener('touchstart', onDown, {passive: false}); canvas.addEventListener('touchend', onUp); canvas.addEventListener('touchmove', onMove, {passive: false});
-
-    function checkLineCircleCollision(x1, y1, x2, y2, cx, cy, r) {
-        const dx = x2 - x1; const dy = y2 - y1;
-        const lenSq = dx*dx + dy*dy;
-        const t = ((cx - x1) * dx + (cy - y1) * dy) / lenSq;
-        const clampedT = Math.max(0, Math.min(1, t));
-        const closestX = x1 + clampedT * dx;
-        const closestY = y1 + clampedT * dy;
-        const distSq = (cx - closestX)**2 + (cy - closestY)**2;
-        return distSq < r*r;
-    }
-
-    function update() {
-        if (black.cooldownTimer > 0) black.cooldownTimer--;
-
-        if (hitStopTimer > 0) {
-            hitStopTimer--;
-            let baseShake = (WEAPON_TYPE === 'sword' ? 3 : 10);
-            if (WEAPON_TYPE === 'shotgun' || WEAPON_TYPE === 'laser') baseShake = 5;
-            if (WEAPON_TYPE === 'giant_beam') baseShake = 15;
-
-            const shakePower = isKO ? 30 * (hitStopTimer/KO_HIT_STOP) : baseShake;
-            screenShakeX = (Math.random() - 0.5) * shakePower;
-            screenShakeY = (Math.random() - 0.5) * shakePower;
-            white.x = white.baseX + (Math.random() - 0.5) * shakePower * 2;
-            white.y = white.baseY + (Math.random() - 0.5) * shakePower * 2;
-            
-            if (hitStopTimer <= 0) {
-                if (isKO) { white.visible = false; respawnBtn.style.display = 'block'; }
-                white.x = white.baseX; white.y = white.baseY;
-                screenShakeX = 0; screenShakeY = 0;
-            }
-            if (!isKO) {
-                 pellets.forEach(p => p.update());
-                 laserBolts.forEach(l => l.update());
-                 giantBeams.forEach(b => b.update());
-                 checkProjectileCollisions();
-            }
-            draw(); requestAnimationFrame(update); return;
-        }
-
-        if (WEAPON_TYPE === 'ball') {
-             if (!black.isDragging) {
-                black.vy += GRAVITY; black.vx *= FRICTION; black.vy *= FRICTION; black.x += black.vx; black.y += black.vy;
-                if (black.x + black.radius > canvas.width) { black.x = canvas.width - black.radius; black.vx *= -BOUNCE; }
-                else if (black.x - black.radius < 0) { black.x = black.radius; black.vx *= -BOUNCE; }
-                if (black.y + black.radius > canvas.height) { black.y = canvas.height - black.radius; black.vy *= -BOUNCE; if(Math.abs(black.vy) < GRAVITY) black.vy = 0; } 
-                else if (black.y - black.radius < 0) { black.y = black.radius; black.vy *= -BOUNCE; }
-            }
-        } else if (WEAPON_TYPE === 'sword') {
-            const followSpeed = black.isSwinging ? 0.05 : 0.2;
-            black.x += (black.targetX - black.x) * followSpeed; black.y += (black.targetY - black.y) * followSpeed;
-            if (black.isSwinging) {
-                black.swingProgress += 1.0 / SWORD_SPEED;
-                const startAngle = FIXED_UP_ANGLE - SWORD_SWING_ANGLE / 2; const endAngle = FIXED_UP_ANGLE + SWORD_SWING_ANGLE / 2;
-                const t = black.swingProgress; const easeT = t < 0.5 ? 2 * t * t : -1 + (4 - 2 * t) * t;
-                black.angle = startAngle + (endAngle - startAngle) * easeT;
-                if (black.swingProgress >= 1.0) { black.isSwinging = false; }
-            } else {
-                black.baseAngle = FIXED_UP_ANGLE; black.angle = FIXED_UP_ANGLE + Math.sin(Date.now() / 400) * 0.05; 
-            }
-        } else if (WEAPON_TYPE === 'shotgun' || WEAPON_TYPE === 'laser' || WEAPON_TYPE === 'giant_beam') {
-             if (!black.isDragging) {
-                 black.angle = Math.atan2(mouseY - black.y, mouseX - black.x);
-             }
-        }
-
-        pellets.forEach(p => p.update());
-        pellets = pellets.filter(p => p.life > 0);
-        laserBolts.forEach(l => l.update());
-        laserBolts = laserBolts.filter(l => l.active);
-        giantBeams.forEach(b => b.update());
-        giantBeams = giantBeams.filter(b => b.life > 0);
-
-        if (white.visible) {
-            if(WEAPON_TYPE === 'ball' || WEAPON_TYPE === 'sword') checkMeleeCollisions();
-            checkProjectileCollisions(); 
-        }
-
-        particles = particles.filter(p => p.life > 0); particles.forEach(p => p.update());
-        damagePopups = damagePopups.filter(d => d.life > 0); damagePopups.forEach(d => d.update());
-        slashEffects = slashEffects.filter(s => s.life > 0); slashEffects.forEach(s => s.update());
-        draw();
-        requestAnimationFrame(update);
-    }
-
-    function checkProjectileCollisions() {
-        if (!white.visible) return;
-        
-        let pelletHit = false;
-        pellets.forEach(p => {
-            if (p.life <= 0) return;
-            const dist = Math.hypot(p.x - white.x, p.y - white.y);
-            if (dist < white.radius + p.size) {
-                p.life = 0; pelletHit = true;
-                applyDamage(SHOTGUN_DAMAGE_VAL, p.x, p.y - 20, false);
-            }
-        });
-        if (pelletHit && !isKO) {
-             let stop = 2;
-             if (SHOTGUN_DAMAGE_VAL < 8) stop = 1; else if (SHOTGUN_DAMAGE_VAL >= 18) stop = 5; else if (SHOTGUN_DAMAGE_VAL >= 14) stop = 4; else if (SHOTGUN_DAMAGE_VAL >= 10) stop = 3;
-             hitStopTimer = stop; 
-        }
-
-        laserBolts.forEach(l => {
-            if (!l.active || l.hasHit) return; 
-            const tailX = l.x - Math.cos(l.angle) * LASER_LENGTH;
-            const tailY = l.y - Math.sin(l.angle) * LASER_LENGTH;
-            if (checkLineCircleCollision(tailX, tailY, l.x, l.y, white.x, white.y, white.radius + 5)) {
-                l.hasHit = true; 
-                applyDamage(LASER_DAMAGE_VAL, white.x, white.y, true);
-            }
-        });
-
-        giantBeams.forEach(b => {
-            if (b.hitCount >= GIANT_BEAM_MAX_HITS) return; 
-            if (b.hitCooldown > 0) return; 
-
-            const dx = white.x - b.x; const dy = white.y - b.y;
-            const localX = dx * Math.cos(-b.angle) - dy * Math.sin(-b.angle);
-            const localY = dx * Math.sin(-b.angle) + dy * Math.cos(-b.angle);
-            
-            const hitW = GIANT_BEAM_WIDTH * 0.9;
-            const hitH = GIANT_BEAM_HEIGHT * 0.8;
-
-            const closestX = Math.max(0, Math.min(localX, hitW));
-            const closestY = Math.max(-hitH/2, Math.min(localY, hitH/2));
-            const distX = localX - closestX; const distY = localY - closestY;
-            const distanceSq = (distX * distX) + (distY * distY);
-
-            if (distanceSq < (white.radius * white.radius)) {
-                b.hitCount++;
-                b.hitCooldown = 10; 
-                b.isHitting = true; 
-                applyDamage(GIANT_BEAM_DAMAGE_VAL, white.x, white.y, true);
-            }
-        });
-    }
-
-    function checkMeleeCollisions() {
-         let isHit = false; let damage = 0; let isCritical = false; let hitX = 0, hitY = 0;
-         if (WEAPON_TYPE === 'ball') {
-            const dx = black.x - white.x; const dy = black.y - white.y;
-            const dist = Math.hypot(dx, dy); const minDist = black.radius + white.radius;
-            if (dist < minDist) {
-                isHit = true; hitX = (black.x + white.x) / 2; hitY = (black.y + white.y) / 2;
-                const speed = Math.sqrt(black.vx**2 + black.vy**2);
-                damage = speed < 2 ? 5 : 5 + ((speed - 2) / 20) * 45; if(damage > 50) damage = 50; if(damage > 30) isCritical = true;
-                const angle = Math.atan2(dy, dx); const overlap = minDist - dist;
-                black.x += Math.cos(angle) * overlap; black.y += Math.sin(angle) * overlap;
-                black.vx = Math.cos(angle) * (speed * 0.8 + 2); black.vy = Math.sin(angle) * (speed * 0.8 + 2);
-            }
-        } else if (WEAPON_TYPE === 'sword') {
-            if (black.isSwinging) {
-                const dx = black.x - white.x; const dy = black.y - white.y;
-                const dist = Math.hypot(dx, dy);
-                if (dist < SWORD_LENGTH + white.radius) {
-                    let phase = Math.floor(black.swingProgress * 3); if (phase > 2) phase = 2;
-                    if (!black.hitFlags[phase]) {
-                        const angleToEnemy = Math.atan2(white.y - black.y, white.x - black.x);
-                        let angleDiff = angleToEnemy - black.angle;
-                        while (angleDiff > Math.PI) angleDiff -= Math.PI * 2; while (angleDiff < -Math.PI) angleDiff += Math.PI * 2;
-                        if (Math.abs(angleDiff) < Math.PI / 7) {
-                            isHit = true; black.hitFlags[phase] = true; hitX = white.x; hitY = white.y;
-                            damage = 10 + (SWORD_HIT_STOP_VAL * 1.5); isCritical = true;
-                        }
-                    }
-                }
-            }
-        }
-        if (isHit) {
-            applyDamage(damage, hitX, hitY, isCritical);
-            if (WEAPON_TYPE === 'sword') {
-                slashEffects.push(new SlashEffect(white.x, white.y, black.angle));
-                if (!isKO) hitStopTimer = SWORD_HIT_STOP_VAL;
-            } else if (WEAPON_TYPE === 'ball') {
-                // ★鉄球のヒットストップ復活！★
-                if (!isKO) {
-                    hitStopTimer = Math.floor(damage / 2);
-                    if (hitStopTimer < 3) hitStopTimer = 3;
-                }
-            } else {
-                if (!isKO) hitStopTimer = 3; 
-            }
-        }
-    }
-
-    function draw() {
-        ctx.save(); ctx.translate(screenShakeX, screenShakeY);
-        ctx.clearRect(-100, -100, canvas.width+200, canvas.height+200);
-        ctx.strokeStyle = '#444'; ctx.lineWidth = 1;
-        for(let i=0; i<canvas.width; i+=80) { ctx.beginPath(); ctx.moveTo(i,0); ctx.lineTo(i, canvas.height); ctx.stroke(); }
-        for(let i=0; i<canvas.height; i+=80) { ctx.beginPath(); ctx.moveTo(0,i); ctx.lineTo(canvas.width, i); ctx.stroke(); }
-
-        if (white.visible) {
-            ctx.fillStyle = 'white'; ctx.beginPath(); ctx.arc(white.x, white.y, white.radius, 0, Math.PI * 2); ctx.fill();
-            ctx.strokeStyle = '#ccc'; ctx.lineWidth = 2; ctx.stroke();
-            const barWidth = 80; const barHeight = 8;
-            const barX = white.x - barWidth / 2; const barY = white.y + white.radius + 15;
-            ctx.fillStyle = '#555'; ctx.fillRect(barX, barY, barWidth, barHeight);
-            if (IS_INFINITE) {
-                ctx.fillStyle = '#00ffff'; ctx.fillRect(barX, barY, barWidth, barHeight);
-                ctx.fillStyle = '#fff'; ctx.font = '12px Arial'; ctx.textAlign = 'center'; ctx.fillText("∞", white.x, barY + 9);
-            } else {
-                const hpPercent = white.hp / MAX_HP;
-                ctx.fillStyle = hpPercent > 0.5 ? '#00ff00' : (hpPercent > 0.2 ? '#ffff00' : '#ff0000');
-                ctx.fillRect(barX, barY, barWidth * hpPercent, barHeight);
-            }
-        }
-
-        if (WEAPON_TYPE === 'ball') {
-            ctx.fillStyle = 'black'; ctx.beginPath(); ctx.arc(black.x, black.y, black.radius, 0, Math.PI * 2); ctx.fill();
-            ctx.fillStyle = '#555'; ctx.beginPath(); ctx.arc(black.x - 10, black.y - 10, 5, 0, Math.PI * 2); ctx.fill();
-        } else if (WEAPON_TYPE === 'sword') {
-            ctx.save(); ctx.translate(black.x, black.y); ctx.rotate(black.angle);
-            ctx.shadowBlur = 15; ctx.shadowColor = '#00ffff'; ctx.fillStyle = '#ccffff';
-            ctx.beginPath(); ctx.moveTo(0, -10); ctx.lineTo(0, 10); ctx.lineTo(SWORD_LENGTH, 0); ctx.fill();
-            ctx.shadowBlur = 0; ctx.fillStyle = '#555'; ctx.fillRect(0, -8, 25, 16); ctx.fillStyle = '#888'; ctx.fillRect(5, -20, 10, 40); ctx.restore();
-        } else if (WEAPON_TYPE === 'shotgun' || WEAPON_TYPE === 'laser' || WEAPON_TYPE === 'giant_beam') {
-            ctx.save(); ctx.translate(black.x, black.y); ctx.rotate(black.angle);
-            ctx.fillStyle = 'black'; ctx.beginPath(); ctx.arc(0, 0, black.radius, 0, Math.PI * 2); ctx.fill();
-            if (WEAPON_TYPE === 'laser') ctx.fillStyle = '#00ffff';
-            else if (WEAPON_TYPE === 'giant_beam') ctx.fillStyle = '#ff00ff';
-            else ctx.fillStyle = '#ff5555';
-            ctx.beginPath(); ctx.arc(black.radius-5, 0, 8, 0, Math.PI*2); ctx.fill();
-            if(black.cooldownTimer > 0) {
-                 if (WEAPON_TYPE === 'laser') ctx.fillStyle = 'rgba(0, 255, 255, 0.5)';
-                 else if (WEAPON_TYPE === 'giant_beam') ctx.fillStyle = 'rgba(255, 0, 255, 0.5)';
-                 else ctx.fillStyle = 'rgba(255, 0, 0, 0.5)';
-                 let maxCD = SHOTGUN_COOLDOWN;
-                 if(WEAPON_TYPE === 'laser') maxCD = LASER_COOLDOWN;
-                 if(WEAPON_TYPE === 'giant_beam') maxCD = GIANT_BEAM_COOLDOWN;
-                 ctx.beginPath(); ctx.moveTo(0,0);
-                 ctx.arc(0, 0, black.radius, -Math.PI/2, -Math.PI/2 + (Math.PI*2 * (black.cooldownTimer/maxCD)), false);
-                 ctx.fill();
-            }
-            ctx.restore();
-        }
-
-        if (hitStopTimer > 0) {
-            ctx.lineWidth = 5;
-            if(isKO) { ctx.strokeStyle = `rgba(255, 50, 50, ${Math.random()})`; ctx.lineWidth = 10; } 
-            else { 
-                if (WEAPON_TYPE === 'ball') ctx.strokeStyle = 'rgba(255, 255, 0, 0.8)';
-                else if (WEAPON_TYPE === 'sword' || WEAPON_TYPE === 'laser') ctx.strokeStyle = 'rgba(0, 255, 255, 0.8)';
-                else if (WEAPON_TYPE === 'giant_beam') ctx.strokeStyle = 'rgba(255, 0, 255, 0.8)';
-                else ctx.strokeStyle = 'rgba(255, 100, 0, 0.8)'; 
-            }
-            let ringX = isKO ? white.x : (WEAPON_TYPE==='ball' ? (black.x + white.x)/2 : white.x);
-            let ringY = isKO ? white.y : (WEAPON_TYPE==='ball' ? (black.y + white.y)/2 : white.y);
-            const expansion = isKO ? (KO_HIT_STOP - hitStopTimer) : (30 - hitStopTimer) * 2;
-            ctx.beginPath(); ctx.arc(ringX, ringY, black.radius + 20 + expansion, 0, Math.PI * 2); ctx.stroke();
-        }
-
-        pellets.forEach(p => p.draw(ctx));
-        laserBolts.forEach(l => l.draw(ctx));
-        giantBeams.forEach(b => b.draw(ctx)); 
-        particles.forEach(p => p.draw(ctx));
-        slashEffects.forEach(s => s.draw(ctx));
-        damagePopups.forEach(d => d.draw(ctx));
-        ctx.restore();
-    }
-
-    update();
-</script>
-</body>
-</html>
-"""
-
-final_html_code = html_template.replace("__IS_INFINITE__", is_infinite_js) \
-                               .replace("__MAX_HP__", str(start_hp)) \
-                               .replace("__WEAPON_TYPE__", weapon_type_js) \
-                               .replace("__SWORD_HIT_STOP__", str(sword_hit_stop)) \
-                               .replace("__SHOTGUN_DAMAGE__", str(shotgun_damage)) \
-                               .replace("__LASER_DAMAGE__", str(laser_damage)) \
-                               .replace("__GIANT_BEAM_DAMAGE__", str(giant_beam_damage))
-
-components.html(final_html_code, height=600, scrolling=False)
+def ingest_events(events):
+    """ゲームから届いた戦闘ログを取り込んで、このセッションの集計を返す。
+    形が違うバッチ（古いビルドの戻り値や、iframe から送られた壊れた値）はリランを止めずに飛ばす。"""
+    try:
+        return combat_log().ingest(events)
+    except ValueError as err:
+        st.sidebar.caption(f"⚠️ 読めない戦闘ログを飛ばしました（{err}）")
+        return None
+
+
+session = None
+if view_mode == VIEW_GALLERY:
+    # 武器の調整は選んでいる武器のぶんだけ（ほかの武器は初期値）。それ以外の設定は全部の枠で同じ
+    arena_values = (hit_stop_gallery(
+        GALLERY_ARENAS, is_infinite, start_hp,
+        sword_hit_stop, shotgun_damage, laser_damage, giant_beam_damage,
+        particle_budget, sandbag_count,
+        quality_tier, quality_down_ms, quality_up_ms, perf_hud, use_worker, renderer, sfx_volume,
+    ) or {}).get("arenas") or []
+    # 戦闘ログは全部の枠のぶんを取り込み、サイドバーの実測には選んでいる武器の枠を出す
+    for (arena_weapon, _), value in zip(GALLERY_ARENAS, arena_values):
+        if value and value.get("events"):
+            arena_session = ingest_events(value["events"])
+            if arena_weapon == weapon_type:
+                session = arena_session
+    game_value = next((value for (arena_weapon, _), value in zip(GALLERY_ARENAS, arena_values)
+                       if arena_weapon == weapon_type and value), {})
+else:
+    game_value = hit_stop_game(
+        weapon_type, is_infinite, start_hp,
+        sword_hit_stop, shotgun_damage, laser_damage, giant_beam_damage,
+        particle_budget, sandbag_count,
+        quality_tier, quality_down_ms, quality_up_ms, perf_hud, use_worker, renderer, sfx_volume,
+        replay=replay_file.getvalue() if replay_file else None,
+    ) or {}
+    if game_value.get("events"):
+        session = ingest_events(game_value["events"])
+
+last_ko = game_value.get("ko")
+if last_ko and last_ko["weapon"] == weapon_type:
+    actual_slot.caption(f"実測: {last_ko['ttk']:.1f}秒で撃破（通算{last_ko['koCount']}回）")
+
+# 戦闘ログはまとめて届く（同じバッチがリランで何度返ってきても、取り込むのは1回だけ）
+if session is not None:
+    combat_slot.markdown("##### 🗒️ このセッションの実測")
+    col_c, col_d = combat_slot.columns(2)
+    col_c.metric("DPS", f"{session.dps:.0f}")
+    col_d.metric("ヒットストップ/分", f"{session.hit_stop_per_minute:.0f}F")
+    combat_slot.caption(f"{session.hits}ヒット / 撃破{session.kos}回（戦っていた時間 {session.seconds:.0f}秒）")
+
+last_replay = game_value.get("replay")
+if replay_file and last_replay:
+    if "error" in last_replay:
+        replay_slot.error(last_replay["error"])
+    else:
+        replay_slot.caption(
+            f"{last_replay['ticks']}ティック（{last_replay['ticks'] / 60:.1f}秒ぶん）を"
+            f"{last_replay['ms']:.0f}msで再生 / 実時間の{last_replay['speedup']:.0f}倍"
+        )
+        if last_replay["match"] is not None:
+            replay_slot.caption("結果: 記録と一致 ✅" if last_replay["match"] else "結果: 記録とずれました ⚠️")
@@ -0,0 +1,155 @@
+# ★ゲームから届く戦闘ログ（applyDamage 1回 = 1件）を SQLite に貯めて、セッションごとの実測をまとめる★
+# ゲームは当たりを iframe の中に列ごとに溜めて、何十件かまとめて1バッチで送ってくる:
+#   {"session", "seq", "tick": [...], "weapon": [...], "damage": [...], "critical": [...], "hitStop": [...], "ko": [...]}
+# コンポーネントの戻り値はリランのたびに同じものが返ってくるので、(session, seq) で1回だけ取り込む。
+# 書き込みはメモリのバッファに溜めて、FLUSH_ROWS 件か FLUSH_SECONDS 秒ごとに executemany でまとめて書く。
+# バッファは BUFFER_ROWS 件まで（書けないあいだは古いものから捨てる）。
+# セッションごとの集計は取り込むときに足していくので、サイドバーを出すのに DB は読まない。
+import atexit
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from combat_sim import SIM_HZ
+
+DB_PATH = Path(__file__).with_name("data") / "combat_log.sqlite"
+WEAPONS = ("ball", "sword", "shotgun", "laser", "giant_beam")  # game.js の WEAPON_ORDER と同じ順（番号で届く）
+COLUMNS = ("tick", "weapon", "damage", "critical", "hitStop", "ko")
+_CASTS = (int, int, float, int, int, int)  # COLUMNS の各列を何で読むか（null や文字は取り込む前にはじく）
+
+FLUSH_ROWS = 2048
+FLUSH_SECONDS = 5.0
+BUFFER_ROWS = 65536
+SESSION_LIMIT = 1024      # 集計を覚えておくセッション数（古いものから忘れる）
+IDLE_GAP_TICKS = SIM_HZ * 2  # 当たりの間がこれより空いたら、そのあいだは戦っていない時間として数えない
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS combat_events (
+    session TEXT NOT NULL, seq INTEGER NOT NULL, tick INTEGER NOT NULL, weapon TEXT NOT NULL,
+    damage REAL NOT NULL, critical INTEGER NOT NULL, hit_stop INTEGER NOT NULL, ko INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS combat_events_session ON combat_events (session, tick);
+"""
+
+
+@dataclass
+class SessionSummary:
+    hits: int = 0
+    damage: float = 0.0
+    hit_stop_frames: int = 0
+    kos: int = 0
+    combat_ticks: int = 0      # 戦っていた時間（当たりの間隔の合計。IDLE_GAP_TICKS より長い間は切り詰める）
+    last_tick: int = -1
+
+    @property
+    def seconds(self):
+        # 1発だけでも割り算できるように、最低1秒として数える
+        return max(self.combat_ticks / SIM_HZ, 1.0)
+
+    @property
+    def dps(self):
+        return self.damage / self.seconds
+
+    @property
+    def hit_stop_per_minute(self):
+        return self.hit_stop_frames * 60 / self.seconds
+
+
+def _columns(batch):
+    # 届いたバッチの形と中身の型を確かめて、列を取り出す（おかしなものは ValueError）。
+    # 1件ずつ取り込んでいる途中で落ちると集計と seq が半端に進むので、ここで全部読んでおく
+    try:
+        session = str(batch["session"])
+        seq = int(batch["seq"])
+        cols = [[cast(value) for value in batch[name]] for name, cast in zip(COLUMNS, _CASTS)]
+    except (KeyError, TypeError, ValueError) as err:
+        raise ValueError(f"戦闘ログの形が違います: {err}") from None
+    if len({len(c) for c in cols}) != 1:
+        raise ValueError("戦闘ログの列の長さがそろっていません")
+    return session, seq, cols
+
+
+class CombatLog:
+    """戦闘ログの置き場所（プロセスに1個。Streamlit のセッションのスレッドから同時に呼ばれる）。"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._rows = deque(maxlen=BUFFER_ROWS)
+        self._last_write = time.monotonic()
+        self._seen = {}                    # session -> 取り込み済みの最後の seq
+        self._summaries = OrderedDict()    # session -> SessionSummary
+        self._conn = None
+
+    def ingest(self, batch):
+        """ゲームから届いたバッチを取り込んで、そのセッションの集計を返す（取り込み済みなら集計だけ返す）。"""
+        session, seq, (ticks, weapons, damages, criticals, hit_stops, kos) = _columns(batch)
+        with self._lock:
+            summary = self._summary(session)
+            if seq <= self._seen.get(session, 0):
+                return summary
+            self._seen[session] = seq
+            for tick, weapon, damage, critical, hit_stop, ko in zip(ticks, weapons, damages, criticals, hit_stops, kos):
+                name = WEAPONS[weapon] if 0 <= weapon < len(WEAPONS) else str(weapon)
+                self._rows.append((session, seq, tick, name, damage, int(bool(critical)), hit_stop, int(bool(ko))))
+                if summary.last_tick >= 0:
+                    summary.combat_ticks += min(max(tick - summary.last_tick, 0), IDLE_GAP_TICKS)
+                summary.last_tick = tick
+                summary.hits += 1
+                summary.damage += damage
+                summary.hit_stop_frames += hit_stop
+                summary.kos += bool(ko)
+            if len(self._rows) >= FLUSH_ROWS or time.monotonic() - self._last_write >= FLUSH_SECONDS:
+                self._write()
+            return summary
+
+    def summary(self, session):
+        """そのセッションの集計（まだ何も届いていなければ None）。"""
+        with self._lock:
+            return self._summaries.get(session)
+
+    def flush(self):
+        """バッファに溜まっている分を今すぐ書く。"""
+        with self._lock:
+            self._write()
+
+    def _summary(self, session):
+        summary = self._summaries.get(session)
+        if summary is None:
+            summary = self._summaries[session] = SessionSummary()
+            if len(self._summaries) > SESSION_LIMIT:
+                old, _ = self._summaries.popitem(last=False)
+                self._seen.pop(old, None)
+        else:
+            self._summaries.move_to_end(session)
+        return summary
+
+    def _write(self):
+        self._last_write = time.monotonic()
+        if not self._rows:
+            return
+        try:
+            if self._conn is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                self._conn = conn
+            with self._conn:
+                self._conn.executemany("INSERT INTO combat_events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._rows)
+        except (OSError, sqlite3.Error):
+            # 書けなかったら（読み取り専用のディスクなど）バッファに残して次の機会にもう一度。あふれたら古いものから捨てる
+            return
+        self._rows.clear()
+
+
+@lru_cache(maxsize=None)
+def combat_log(path=DB_PATH):
+    """プロセス全体で1個の CombatLog（終了するときに残りを書く）。"""
+    log = CombatLog(path)
+    atexit.register(log.flush)
+    return log
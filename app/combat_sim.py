@@ -0,0 +1,364 @@
+# ★ヒットストップ戦闘のルールをPythonで再現するヘッドレス・シミュレーター★
+# game.js の applyDamage と weapon_*.js の当たり判定（checkBallCollisions / checkSwordCollisions /
+# checkPelletCollisions / checkLaserCollisions / checkGiantBeamCollisions）と同じ数値を使い、
+# 何百回ぶんの戦闘をNumPyでまとめて計算して、撃破時間・DPS・ヒットストップ量を出す。
+# （数値を変えたら game.js / weapon_*.js 側の定数もそろえること）
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+SIM_HZ = 60
+
+# --- game.js / weapon_*.js と同じ定数（単位はティック / px） ---
+WHITE_RADIUS = 30
+KO_HIT_STOP = 120
+DEFAULT_HIT_STOP = 4
+
+SWORD_LENGTH = 130
+SWORD_SWING_ANGLE = np.deg2rad(120)
+SWORD_SPEED = 12
+SWORD_HIT_WINDOW = np.pi / 7
+
+SHOTGUN_PELLETS = 12
+SHOTGUN_SPREAD = np.pi / 5
+SHOTGUN_SPEED = 25
+SHOTGUN_COOLDOWN = 40
+PELLET_SIZE = 5
+PELLET_LIFE = 30
+
+LASER_COOLDOWN = 30
+LASER_SPEED = 45
+LASER_LENGTH = 160
+LASER_SPREAD = np.pi / 6
+LASER_LIFE = 100
+
+GIANT_BEAM_SPEED = 8
+GIANT_BEAM_WIDTH = 240
+GIANT_BEAM_HEIGHT = 80
+GIANT_BEAM_COOLDOWN = 60
+GIANT_BEAM_MAX_HITS = 5
+GIANT_BEAM_LIFE = 150
+GIANT_BEAM_HIT_COOLDOWN = 10
+GIANT_BEAM_FIRE_HIT_STOP = 6
+
+# --- プレイヤーの動きのモデル（ここはゲームには無い「想定」） ---
+ARENA_WIDTH = 1200
+ARENA_HEIGHT = 600
+AIM_ERROR = 0.05            # 飛び道具の狙いのブレ（ラジアンの標準偏差）
+SWORD_ANGLE_ERROR = 0.5     # 剣を振る位置と白丸の方向のズレ（ラジアンの標準偏差）
+BALL_SPEED_RANGE = (4.0, 30.0)  # 鉄球を投げたときの速さ（px/ティック）
+BALL_CYCLE_TICKS = 60       # 鉄球を拾って投げ直すまでの時間
+
+# 何秒ぶん・何戦ぶん回すか。決めなければ、まず短く回して DPS を見てから、撃破に要りそうな時間に合わせて伸ばす
+# （HP 5000 の鉄球は撃破まで3分ほどかかる）。長く回すときは戦数を減らして、戦数×秒を ENGAGEMENT_BUDGET に収める
+PILOT_ENGAGEMENTS = 32
+PILOT_SECONDS = 10
+HORIZON_MARGIN = 1.25       # 平均の DPS で撃破できる時間の何倍まで回すか（運の悪い戦も撃破まで見る）
+HORIZON_RANGE = (15, 600)   # 秒
+ENGAGEMENT_BUDGET = 2000    # 戦数×秒
+ENGAGEMENT_RANGE = (24, 200)
+INFINITE_SECONDS = 60       # 無限モードは1分あたりで見せるので1分ぶん
+
+
+@dataclass(frozen=True)
+class CombatStats:
+    weapon_type: str
+    engagements: int
+    ko_rate: float              # 時間内に撃破できた割合（無限モードでは 0）
+    ttk_median: float           # 撃破までの秒数（撃破できなかったら nan）
+    ttk_p10: float
+    ttk_p90: float
+    horizon_seconds: float      # 何秒まで回したか（撃破できなかった戦は「これより長い」）
+    dps: float                  # 1秒あたりのダメージ
+    hit_stop_frames: float      # 撃破までのヒットストップ合計フレーム（無限モードでは1分あたり）
+    hits: float                 # 撃破までの（無限モードでは1分あたりの）ヒット数
+
+
+def shotgun_hit_stop(damage):
+    # weapon_shotgun.js の checkPelletCollisions の散弾ヒットストップ段階
+    if damage < 8:
+        return 1
+    if damage >= 18:
+        return 5
+    if damage >= 14:
+        return 4
+    if damage >= 10:
+        return 3
+    return 2
+
+
+def ball_damage(speed):
+    # weapon_ball.js の checkBallCollisions の「速さ→ダメージ」式（配列OK）
+    speed = np.asarray(speed, dtype=float)
+    return np.where(speed < 2, 5.0, np.minimum(5 + ((speed - 2) / 20) * 45, 50.0))
+
+
+def ball_hit_stop(damage):
+    return np.maximum(np.floor(np.asarray(damage) / 2), 3)
+
+
+def sword_damage(sword_hit_stop):
+    return 10 + sword_hit_stop * 1.5
+
+
+def _geometry():
+    # game.js の initPositions と同じ配置：黒は左25%、白は右75%の高さ真ん中
+    bx, by = ARENA_WIDTH * 0.25, ARENA_HEIGHT * 0.5
+    wx, wy = ARENA_WIDTH * 0.75, ARENA_HEIGHT * 0.5
+    return bx, by, wx, wy
+
+
+def _along_and_across(ox, oy, angle, tx, ty):
+    # 進行方向に沿った距離と、横方向のズレ
+    dx, dy = tx - ox, ty - oy
+    c, s = np.cos(angle), np.sin(angle)
+    return dx * c + dy * s, -dx * s + dy * c
+
+
+def _first_tick_in(lo, hi, last_tick):
+    # lo < k < hi をみたす最初の整数ティック k (>=1)。無ければ inf
+    k = np.maximum(np.floor(lo) + 1, 1)
+    return np.where((k < hi) & (k <= last_tick), k, np.inf)
+
+
+def _first_tick_swept(lo, hi, last_tick):
+    # ティック k-1 → k の間に通った区間 [k-1, k] が (lo, hi) にかかる最初の k (>=1)。無ければ inf
+    # （checkPelletCollisions の sweptCircleHit と同じ連続判定。1ティックに弦より長く進んでもすり抜けない）
+    k = np.maximum(np.ceil(lo), 1)
+    return np.where((k - 1 < hi) & (k <= last_tick), k, np.inf)
+
+
+def _wall_exit(ox, oy, angle, speed):
+    # weapon_laser.js の updateLaserBolts と同じ「次の位置が枠の外に出たティック」と、クランプ後の位置
+    vx, vy = np.cos(angle) * speed, np.sin(angle) * speed
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kx = np.where(vx > 0, np.floor((ARENA_WIDTH - ox) / vx) + 1,
+                      np.where(vx < 0, np.floor(ox / -vx) + 1, np.inf))
+        ky = np.where(vy > 0, np.floor((ARENA_HEIGHT - oy) / vy) + 1,
+                      np.where(vy < 0, np.floor(oy / -vy) + 1, np.inf))
+    k = np.minimum(kx, ky)
+    nx = np.clip(ox + vx * k, 0, ARENA_WIDTH)
+    ny = np.clip(oy + vy * k, 0, ARENA_HEIGHT)
+    # x と y を両方はみ出したら y の壁が優先（元コードの判定順）
+    hit_y = ky <= kx
+    reflect = np.where(hit_y, -angle, np.pi - angle)
+    return k, nx, ny, reflect
+
+
+def _laser_hit_tick(ox, oy, angle, tx, ty, wall_tick):
+    # 線分（長さ LASER_LENGTH）と円の当たり。先端が白丸の弦に届いた最初のティック
+    along, across = _along_and_across(ox, oy, angle, tx, ty)
+    r = WHITE_RADIUS + 5
+    half = np.sqrt(np.maximum(r * r - across * across, 0))
+    lo = (along - half) / LASER_SPEED
+    k = np.maximum(np.ceil(lo), 1)
+    ok = (np.abs(across) < r) & (along + half > 0) & (k < wall_tick) & (k < LASER_LIFE)
+    return np.where(ok, k, np.inf)
+
+
+def _timeline_stats(weapon_type, ticks, damage, stops, max_hp, infinite, horizon_ticks):
+    # ダメージイベント (ticks, damage, stops) を時間順に並べて、撃破・DPS・ヒットストップを集計
+    n = ticks.shape[0]
+    order = np.argsort(ticks, axis=1, kind="stable")
+    t = np.take_along_axis(ticks, order, axis=1)
+    d = np.take_along_axis(damage, order, axis=1)
+    s = np.take_along_axis(stops, order, axis=1)
+    valid = t < horizon_ticks
+    d = np.where(valid, d, 0.0)
+    cum = np.cumsum(d, axis=1)
+
+    if infinite:
+        keep = valid
+        has_ko = np.zeros(n, dtype=bool)
+        ttk = np.full(n, np.nan)
+    else:
+        ko_mask = (cum >= max_hp) & valid
+        has_ko = ko_mask.any(axis=1)
+        ko_idx = np.argmax(ko_mask, axis=1)
+        idx = np.arange(t.shape[1])[None, :]
+        keep = valid & (~has_ko[:, None] | (idx <= ko_idx[:, None]))
+        rows = np.arange(n)
+        s = s.copy()
+        s[rows[has_ko], ko_idx[has_ko]] = KO_HIT_STOP
+        ttk = np.where(has_ko, t[rows, ko_idx] / SIM_HZ, np.nan)
+
+    # ヒットストップは「加算」ではなく「上書き」。次のイベントまでの長さで打ち切る
+    tk = np.where(keep, t, np.inf)
+    nxt = np.concatenate([tk[:, 1:], np.full((n, 1), np.inf)], axis=1)
+    with np.errstate(invalid="ignore"):
+        frozen = np.where(keep, np.minimum(s, nxt - tk), 0.0).sum(axis=1)
+    hits = (keep & (d > 0)).sum(axis=1)
+    dealt = np.where(keep, d, 0.0).sum(axis=1)
+
+    if infinite:
+        minutes = horizon_ticks / SIM_HZ / 60
+        dps = dealt / (horizon_ticks / SIM_HZ)
+        frozen, hits = frozen / minutes, hits / minutes
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dps = np.where(has_ko, dealt / ttk, dealt / (horizon_ticks / SIM_HZ))
+
+    def pct(q):
+        return float(np.percentile(ttk[has_ko], q)) if has_ko.any() else float("nan")
+
+    return CombatStats(
+        weapon_type=weapon_type,
+        engagements=n,
+        ko_rate=float(has_ko.mean()),
+        ttk_median=pct(50), ttk_p10=pct(10), ttk_p90=pct(90),
+        horizon_seconds=horizon_ticks / SIM_HZ,
+        dps=float(np.mean(dps)),
+        hit_stop_frames=float(np.mean(frozen)),
+        hits=float(np.mean(hits)),
+    )
+
+
+def _shotgun_events(rng, n, horizon_ticks, shotgun_damage):
+    bx, by, wx, wy = _geometry()
+    shots = horizon_ticks // SHOTGUN_COOLDOWN + 1
+    fire = (np.arange(shots) * SHOTGUN_COOLDOWN)[None, :, None]
+    aim = np.arctan2(wy - by, wx - bx) + rng.normal(0, AIM_ERROR, (n, shots, 1))
+    angle = aim + (rng.random((n, shots, SHOTGUN_PELLETS)) - 0.5) * SHOTGUN_SPREAD
+    along, across = _along_and_across(bx, by, angle, wx, wy)
+    r = WHITE_RADIUS + PELLET_SIZE
+    half = np.sqrt(np.maximum(r * r - across * across, 0))
+    k = _first_tick_swept((along - half) / SHOTGUN_SPEED, (along + half) / SHOTGUN_SPEED, PELLET_LIFE - 1)
+    k = np.where(np.abs(across) < r, k, np.inf)
+    ticks = (fire + k).reshape(n, -1)
+    damage = np.full(ticks.shape, float(shotgun_damage))
+    stops = np.full(ticks.shape, float(shotgun_hit_stop(shotgun_damage)))
+    return ticks, damage, stops
+
+
+def _laser_events(rng, n, horizon_ticks, laser_damage):
+    bx, by, wx, wy = _geometry()
+    shots = horizon_ticks // LASER_COOLDOWN + 1
+    fire = (np.arange(shots) * LASER_COOLDOWN)[None, :]
+    angle = np.arctan2(wy - by, wx - bx) + rng.normal(0, AIM_ERROR, (n, shots))
+
+    wall, nx, ny, reflect = _wall_exit(bx, by, angle, LASER_SPEED)
+    direct = _laser_hit_tick(bx, by, angle, wx, wy, wall)
+    # 壁で3本に分裂（generation 0 だけ）。子は壁に当たったティックから飛び始める
+    children = []
+    for spread in (0.0, LASER_SPREAD, -LASER_SPREAD):
+        child_angle = reflect + spread
+        child_wall, _, _, _ = _wall_exit(nx, ny, child_angle, LASER_SPEED)
+        hit = _laser_hit_tick(nx, ny, child_angle, wx, wy, child_wall)
+        children.append(np.where(wall < LASER_LIFE, wall + hit, np.inf))
+    k = np.stack([direct] + children, axis=-1)
+    ticks = (fire[..., None] + k).reshape(n, -1)
+    damage = np.full(ticks.shape, float(laser_damage))
+    stops = np.full(ticks.shape, float(DEFAULT_HIT_STOP))
+    return ticks, damage, stops
+
+
+def _giant_beam_events(rng, n, horizon_ticks, giant_beam_damage):
+    bx, by, wx, wy = _geometry()
+    shots = horizon_ticks // GIANT_BEAM_COOLDOWN + 1
+    fire = (np.arange(shots) * GIANT_BEAM_COOLDOWN)[None, :]
+    angle = np.arctan2(wy - by, wx - bx) + rng.normal(0, AIM_ERROR, (n, shots))
+    along, across = _along_and_across(bx, by, angle, wx, wy)
+    # ビームの当たり判定は 幅*0.9 × 高さ*0.8 の箱と白丸の距離
+    hit_w, hit_h = GIANT_BEAM_WIDTH * 0.9, GIANT_BEAM_HEIGHT * 0.8
+    ey = np.maximum(np.abs(across) - hit_h / 2, 0)
+    reach = np.sqrt(np.maximum(WHITE_RADIUS ** 2 - ey ** 2, 0))
+    lo = (along - hit_w - reach) / GIANT_BEAM_SPEED
+    hi = (along + reach) / GIANT_BEAM_SPEED
+    first = _first_tick_in(lo, hi, GIANT_BEAM_LIFE - 1)
+    first = np.where(ey < WHITE_RADIUS, first, np.inf)
+    # 当たっている間は hitCooldown ごとに最大 GIANT_BEAM_MAX_HITS 回
+    nth = np.arange(GIANT_BEAM_MAX_HITS)[None, None, :]
+    k = first[..., None] + nth * GIANT_BEAM_HIT_COOLDOWN
+    last = np.minimum(np.ceil(hi) - 1, GIANT_BEAM_LIFE - 1)[..., None]
+    k = np.where(k <= last, k, np.inf)
+    hit_ticks = (fire[..., None] + k).reshape(n, -1)
+    # 発射の瞬間にもヒットストップ（ダメージ0のイベント）
+    fire_ticks = np.broadcast_to(fire, (n, shots)).astype(float)
+    ticks = np.concatenate([fire_ticks, hit_ticks], axis=1)
+    damage = np.concatenate([np.zeros((n, shots)), np.full(hit_ticks.shape, float(giant_beam_damage))], axis=1)
+    stops = np.concatenate([np.full((n, shots), float(GIANT_BEAM_FIRE_HIT_STOP)),
+                            np.full(hit_ticks.shape, float(DEFAULT_HIT_STOP))], axis=1)
+    return ticks, damage, stops
+
+
+def _ball_events(rng, n, horizon_ticks):
+    # 投げる→当たる→ヒットストップで全部止まる→拾って投げ直す、の繰り返し
+    throws = horizon_ticks // BALL_CYCLE_TICKS + 1
+    speed = rng.uniform(*BALL_SPEED_RANGE, (n, throws))
+    damage = ball_damage(speed)
+    stops = ball_hit_stop(damage)
+    waited = np.concatenate([np.zeros((n, 1)), np.cumsum(stops, axis=1)[:, :-1]], axis=1)
+    ticks = (np.arange(throws)[None, :] + 1) * BALL_CYCLE_TICKS + waited
+    return ticks, damage, stops
+
+
+def _sword_events(rng, n, horizon_ticks, sword_hit_stop):
+    # 1振り = SWORD_SPEED ティック。3つの区間でそれぞれ最大1ヒット、ヒット中はスイングも止まる
+    phi = rng.normal(0, SWORD_ANGLE_ERROR, n)[:, None]
+    j = np.arange(1, SWORD_SPEED)[None, :]
+    p = j / SWORD_SPEED
+    ease = np.where(p < 0.5, 2 * p * p, -1 + (4 - 2 * p) * p)
+    rel = -SWORD_SWING_ANGLE / 2 + SWORD_SWING_ANGLE * ease
+    inside = np.abs(rel - phi) < SWORD_HIT_WINDOW
+    phase = np.minimum(np.floor(p * 3), 2).astype(int)[0]
+    first_in_phase = np.full((n, 3), np.inf)
+    for ph in range(3):
+        cols = np.where(phase == ph)[0]
+        hit = inside[:, cols]
+        first_in_phase[:, ph] = np.where(hit.any(axis=1), j[0, cols][np.argmax(hit, axis=1)], np.inf)
+    hit_mask = np.isfinite(first_in_phase)
+    per_swing = hit_mask.sum(axis=1)
+    earlier = np.cumsum(hit_mask, axis=1) - hit_mask
+    within = first_in_phase + earlier * sword_hit_stop
+
+    cycle = SWORD_SPEED + per_swing * sword_hit_stop
+    swings = horizon_ticks // SWORD_SPEED + 1
+    base = np.arange(swings)[None, :, None] * cycle[:, None, None]
+    ticks = (base + within[:, None, :]).reshape(n, -1)
+    damage = np.full(ticks.shape, float(sword_damage(sword_hit_stop)))
+    stops = np.full(ticks.shape, float(sword_hit_stop))
+    return ticks, damage, stops
+
+
+def _events(rng, weapon_type, n, horizon_ticks, sword_hit_stop, shotgun_damage, laser_damage, giant_beam_damage):
+    if weapon_type == "ball":
+        return _ball_events(rng, n, horizon_ticks)
+    if weapon_type == "sword":
+        return _sword_events(rng, n, horizon_ticks, sword_hit_stop)
+    if weapon_type == "shotgun":
+        return _shotgun_events(rng, n, horizon_ticks, shotgun_damage)
+    if weapon_type == "laser":
+        return _laser_events(rng, n, horizon_ticks, laser_damage)
+    if weapon_type == "giant_beam":
+        return _giant_beam_events(rng, n, horizon_ticks, giant_beam_damage)
+    raise ValueError(f"未知の武器です: {weapon_type}")
+
+
+def _auto_horizon(max_hp, dps):
+    # 平均の DPS で撃破できる時間に余裕を足した長さ。当たらない設定（DPS 0）なら一番長く回す
+    if dps <= 0:
+        return HORIZON_RANGE[1]
+    return float(np.clip(max_hp / dps * HORIZON_MARGIN + 10, *HORIZON_RANGE))
+
+
+def simulate(weapon_type, max_hp=200, infinite=False, sword_hit_stop=5, shotgun_damage=8,
+             laser_damage=25, giant_beam_damage=15, engagements=None, horizon_seconds=None, seed=0):
+    rng = np.random.default_rng(seed)
+    params = (sword_hit_stop, shotgun_damage, laser_damage, giant_beam_damage)
+    if horizon_seconds is None:
+        if infinite:
+            horizon_seconds = INFINITE_SECONDS
+        else:
+            pilot_ticks = PILOT_SECONDS * SIM_HZ
+            pilot = _events(rng, weapon_type, PILOT_ENGAGEMENTS, pilot_ticks, *params)
+            horizon_seconds = _auto_horizon(max_hp, _timeline_stats(weapon_type, *pilot, max_hp, True, pilot_ticks).dps)
+    if engagements is None:
+        engagements = int(np.clip(ENGAGEMENT_BUDGET // horizon_seconds, *ENGAGEMENT_RANGE))
+    horizon_ticks = int(horizon_seconds * SIM_HZ)
+    events = _events(rng, weapon_type, engagements, horizon_ticks, *params)
+    return _timeline_stats(weapon_type, *events, max_hp, infinite, horizon_ticks)
+
+
+# サイドバーから毎回呼ばれるので、同じ設定の結果はプロセス全体で使い回す
+estimate = lru_cache(maxsize=256)(simulate)
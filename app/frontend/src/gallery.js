@@ -0,0 +1,113 @@
+// ★ギャラリー：武器ごとのアリーナを1つのコンポーネントに並べて、1本の requestAnimationFrame でまとめて回す★
+// game.js はページに1個しか置けないので、アリーナは1枠ずつ index.html?arena=番号 の iframe にする（同じオリジン）。
+// 枠の中のゲームは自分では回らず（host.js の scheduledFrames）、ここのスケジューラが番を回す。回すのは
+//   ・ページが見えていて（visibilitychange）
+//   ・枠が画面に入っていて（IntersectionObserver。Streamlit のページをスクロールして外れた枠も分かる）
+//   ・止まっていない（game.js の isSettled()。止まったら、入力・設定・サイズの変更が来るまで回さない）
+// 枠だけ。回さなくなった枠には pause()（戦闘ログを送らせる）、また回すときは resume() を送る。
+// 回す枠が1つも無くなったらループ自体も止める（requestAnimationFrame も頼まない）。
+// 枠ごとのコンポーネントの値は { arenas: [枠0の値, 枠1の値, ...] } にまとめて Python に返す
+// 効果音（sfx.js）はここで1つだけ作って全部の枠で使う（AudioContext も同時に鳴らす数の上限も1つ）
+
+// 枠の状態
+//   waiting: ゲームが次のフレームを待っている（false なら起動中か、ワーカーがまだ前のフレームを描いている）
+//   settled: 最後のフレームで止まっていた / dirty: そのあとに入力・設定が来た / running: resume() してから pause() していない
+function startGallery(config, arenas) {
+    // このページ自体はゲームを持たない
+    for (const id of ['stage', 'respawnBtn', 'saveReplayBtn']) document.getElementById(id).remove();
+    document.body.classList.add('gallery');
+    const grid = document.createElement('div'); grid.id = 'gallery';
+    document.body.appendChild(grid);
+
+    const arenaConfig = (base, weaponType) => Object.assign({}, base, { weaponType });
+    const slots = arenas.map((spec, index) => {
+        const figure = document.createElement('figure'); figure.className = 'arena';
+        const iframe = document.createElement('iframe'); iframe.src = 'index.html?arena=' + index; iframe.title = spec.label;
+        const caption = document.createElement('figcaption'); caption.textContent = spec.label;
+        figure.append(iframe, caption); grid.appendChild(figure);
+        return { weaponType: spec.weaponType, iframe, config: arenaConfig(config, spec.weaponType), handlers: null,
+                 onScreen: false, waiting: false, settled: false, dirty: true, running: false };
+    });
+    const values = slots.map(() => null);
+    let pageVisible = document.visibilityState !== 'hidden';
+    let rafId = 0;
+    const sfx = pageSfx(config.sfxVolume / 100);
+
+    const wants = s => pageVisible && s.onScreen && (!s.settled || s.dirty);
+    function pause(s) {
+        if (!s.running) return;
+        s.running = false; s.handlers.pause();
+    }
+    function schedule() {
+        if (rafId === 0 && slots.some(s => s.waiting && wants(s))) rafId = requestAnimationFrame(tick);
+    }
+    function tick() {
+        rafId = 0;
+        for (const s of slots) {
+            if (!s.waiting) continue;
+            if (!wants(s)) { pause(s); continue; }
+            if (!s.running) { s.running = true; s.handlers.resume(); }
+            s.waiting = false; s.dirty = false;
+            s.handlers.frame(); // 同じスレッドのゲームはここで描き終わって、また frameDone が来る
+        }
+    }
+    // 見える・見えないが変わったら：回さなくなった枠は止めて、回す枠があればループを動かす
+    function refresh() {
+        for (const s of slots) if (s.waiting && !wants(s)) pause(s);
+        schedule();
+    }
+
+    if (typeof IntersectionObserver === 'function') {
+        const byIframe = new Map(slots.map(s => [s.iframe, s]));
+        const observer = new IntersectionObserver(entries => {
+            for (const e of entries) byIframe.get(e.target).onScreen = e.isIntersecting;
+            refresh();
+        });
+        for (const s of slots) observer.observe(s.iframe);
+    } else {
+        for (const s of slots) s.onScreen = true;
+    }
+    document.addEventListener('visibilitychange', () => { pageVisible = document.visibilityState !== 'hidden'; refresh(); });
+
+    // 枠の中の index.html / host.js から呼ばれる入口
+    window.hitStopGallery = {
+        sfx,
+        arena(index) {
+            const s = slots[index]; const started = s.config;
+            return {
+                config: started,
+                attach(handlers) {
+                    s.handlers = handlers;
+                    if (s.config !== started) handlers.applyConfig(s.config); // 読み込んでいるあいだに設定が変わった
+                    return {
+                        frameDone(settled) {
+                            s.waiting = true; s.settled = settled;
+                            if (!wants(s)) pause(s);
+                            schedule();
+                        },
+                        poke() { s.dirty = true; schedule(); },
+                        setComponentValue(value) {
+                            values[index] = value;
+                            Streamlit.setComponentValue({ arenas: values });
+                        },
+                    };
+                },
+            };
+        },
+    };
+
+    // 幅が変わると並びの段数も変わるので、そのたびに高さを合わせる
+    const fitHeight = () => Streamlit.setFrameHeight(Math.ceil(document.documentElement.getBoundingClientRect().height));
+    if (typeof ResizeObserver === 'function') new ResizeObserver(fitHeight).observe(grid);
+    fitHeight();
+
+    // 2回目以降の設定は武器だけ差し替えて全部の枠に配る（リプレイはギャラリーでは使わない）
+    window.applyConfig = newConfig => {
+        for (const s of slots) {
+            s.config = arenaConfig(newConfig, s.weaponType);
+            if (s.handlers) s.handlers.applyConfig(s.config);
+        }
+    };
+}
+
+startGallery(gameConfig, gameArenas);
@@ -0,0 +1,1458 @@
+// 描画先とページまわりは host.js の gameHost 越しに触る（ワーカーで動くときは document が無い）
+const canvas = gameHost.canvases.game;
+const ctx = canvas.getContext('2d');
+const bgCanvas = gameHost.canvases.bg;
+const bgCtx = bgCanvas.getContext('2d');
+const fxCanvas = gameHost.canvases.fx;
+const fxCtx = fxCanvas.getContext('2d');
+// WebGL を選んだときだけ使う層（エンティティ層とエフェクト層のあいだ）。コンテキストは選ばれたときに作る
+const glCanvas = gameHost.canvases.gl;
+// ヒットストップ中だけ使う薄い層（エンティティ層と GL の層のあいだ）。止めた絵の上に動くものだけを描く
+const liveCanvas = gameHost.canvases.live;
+const liveCtx = liveCanvas.getContext('2d');
+// 止めた絵の状態（使い方は drawFrozen() を参照）。止めた絵を変えるところはどこでも frozenDirty を立てる
+let frozenTick = false; let frozenDirty = true; let liveLayerUsed = false;
+let frozenParticleMark = 0, frozenPopupMark = 0; // 止めた絵に描いた火花・数字の数（これより後ろは後から出た子）
+
+// ★Python側から設定をJSON1個でまとめて受け取る（最初の1回は gameHost.config）★
+// サイドバーを動かすと applyConfig() で差し替わるので let
+let IS_INFINITE, MAX_HP, WEAPON_TYPE, SWORD_HIT_STOP_VAL, SHOTGUN_DAMAGE_VAL, LASER_DAMAGE_VAL, GIANT_BEAM_DAMAGE_VAL;
+function readWeaponConfig(config) {
+    IS_INFINITE = config.isInfinite;
+    MAX_HP = config.maxHp;
+    WEAPON_TYPE = config.weaponType;
+    SWORD_HIT_STOP_VAL = config.swordHitStop;
+    SHOTGUN_DAMAGE_VAL = config.shotgunDamage;
+    LASER_DAMAGE_VAL = config.laserDamage;
+    GIANT_BEAM_DAMAGE_VAL = config.giantBeamDamage;
+}
+readWeaponConfig(gameHost.config);
+let liveConfig = gameHost.config; // Streamlit から最後に届いた設定（リプレイが終わったらこれで再開する）
+
+// ★乱数はシード付き（mulberry32）。同じシード・同じ入力なら同じ試合になる★
+// simRandom: 試合の流れに効くもの（散弾の広がり・揺れ）/ fxRandom: 見た目だけのもの（火花）
+// 火花の数は描画品質で変わるので、列を分けておかないと品質しだいで試合がずれる
+function mulberry32(seed) {
+    let a = seed >>> 0;
+    return function() {
+        a = (a + 0x6D2B79F5) >>> 0;
+        let t = a;
+        t = Math.imul(t ^ (t >>> 15), t | 1);
+        t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+        return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+}
+let simSeed = 0; let simRandom = Math.random; let fxRandom = Math.random;
+function seedRandom(seed) {
+    simSeed = seed >>> 0;
+    simRandom = mulberry32(simSeed); fxRandom = mulberry32(simSeed ^ 0x9E3779B9);
+}
+function newSeed() { return (Math.random() * 4294967296) >>> 0; }
+
+const GRID_SIZE = 80;
+
+// ★描画品質の段階（0が最高）。重いときは自動で1段ずつ下げて、余裕が戻ったら上げる★
+// scale: 内部解像度の倍率 / particleRate: 火花の数の倍率 / glow: shadowBlurを使うか / beamDetail: 2=光+芯, 1=光だけ, 0=ただの帯
+const QUALITY_TIERS = [
+    { scale: 1.0,  particleRate: 1.0,  glow: true,  beamDetail: 2 },
+    { scale: 0.8,  particleRate: 0.6,  glow: true,  beamDetail: 1 },
+    { scale: 0.65, particleRate: 0.35, glow: false, beamDetail: 1 },
+    { scale: 0.5,  particleRate: 0.15, glow: false, beamDetail: 0 },
+];
+let QUALITY_AUTO, QUALITY_DOWN_MS, QUALITY_UP_MS;
+function readQualityConfig(config) {
+    QUALITY_AUTO = config.qualityTier < 0;
+    QUALITY_DOWN_MS = config.qualityDownMs; // 平均フレーム間隔がこれを超えたら1段下げる
+    QUALITY_UP_MS = config.qualityUpMs;     // 1フレームの処理時間の平均がこれを下回り続けたら1段上げる
+}
+readQualityConfig(gameHost.config);
+const QUALITY_WINDOW = 60; // 直近何フレームの平均で判断するか
+let qualityTier = QUALITY_AUTO ? 0 : Math.min(gameHost.config.qualityTier, QUALITY_TIERS.length - 1);
+let quality = QUALITY_TIERS[qualityTier];
+
+// 論理サイズ（CSS px）。シミュレーションと当たり判定はずっと view の座標で動く
+// 画面（display）はすぐ変わるけど、view はリプレイで再現できるようにティックの頭で変える
+let viewW = 0, viewH = 0;
+let displayW = 0, displayH = 0;
+
+let displayDpr = 1;
+
+// 画面の大きさが変わったら host.js から呼ばれる（見た目の大きさはページ側で合わせてある）
+function resizeCanvas(w, h, dpr) {
+    displayW = w; displayH = h;
+    resizeLayers();
+    bgCanvas.width = w + SHAKE_MARGIN * 2; bgCanvas.height = h + SHAKE_MARGIN * 2;
+    renderBackground();
+    if (dpr !== displayDpr) { displayDpr = dpr; invalidateGlowSprites(); digitAtlas = null; }
+    queueInput(INPUT_RESIZE, w, h);
+}
+
+function setViewSize(w, h) { viewW = w; viewH = h; resizeSpatialHash(); frozenDirty = true; }
+
+// エンティティ層とエフェクト層だけ内部解像度を下げる（見た目の大きさはCSSで元のまま）
+function resizeLayers() {
+    const s = quality.scale;
+    for (const [c, g] of [[canvas, ctx], [liveCanvas, liveCtx], [fxCanvas, fxCtx]]) {
+        c.width = Math.round(displayW * s); c.height = Math.round(displayH * s);
+        g.setTransform(s, 0, 0, s, 0, 0);
+    }
+    glCanvas.width = Math.round(displayW * s); glCanvas.height = Math.round(displayH * s);
+    frozenDirty = true; // 大きさを変えると中身も消える
+}
+
+function setQualityTier(tier) {
+    if (tier === qualityTier) return;
+    qualityTier = tier; quality = QUALITY_TIERS[tier];
+    invalidateGlowSprites(); // 光の有無・ビームの形が変わるので焼き直し
+    resizeLayers();
+}
+
+// 直近 QUALITY_WINDOW フレームの「フレーム間隔」と「処理時間」の移動平均で段階を決める
+// 下げるのはすぐ、上げるのは間隔も処理時間も余裕がある状態が2窓ぶん続いてから（行ったり来たりしないように）
+const frameIntervals = new Float64Array(QUALITY_WINDOW);
+const frameWorkTimes = new Float64Array(QUALITY_WINDOW);
+let frameIntervalSum = 0, frameWorkSum = 0, qualityCursor = 0;
+let qualitySettle = QUALITY_WINDOW; let qualityHeadroom = 0;
+
+function governQuality(interval, work) {
+    const k = qualityCursor;
+    frameIntervalSum += interval - frameIntervals[k]; frameWorkSum += work - frameWorkTimes[k];
+    frameIntervals[k] = interval; frameWorkTimes[k] = work;
+    qualityCursor = (k + 1) % QUALITY_WINDOW;
+    if (!QUALITY_AUTO) return;
+    if (qualitySettle > 0) { qualitySettle--; return; }
+
+    const avgInterval = frameIntervalSum / QUALITY_WINDOW; const avgWork = frameWorkSum / QUALITY_WINDOW;
+    if (avgInterval > QUALITY_DOWN_MS && qualityTier < QUALITY_TIERS.length - 1) {
+        setQualityTier(qualityTier + 1); qualitySettle = QUALITY_WINDOW; qualityHeadroom = 0;
+    } else if (avgInterval <= QUALITY_DOWN_MS && avgWork < QUALITY_UP_MS && qualityTier > 0) {
+        if (++qualityHeadroom >= QUALITY_WINDOW * 2) {
+            setQualityTier(qualityTier - 1); qualitySettle = QUALITY_WINDOW; qualityHeadroom = 0;
+        }
+    } else {
+        qualityHeadroom = 0;
+    }
+}
+
+// 品質に合わせた火花の数・光のぼかし
+function particleCount(n) { return Math.max(1, Math.round(n * quality.particleRate)); }
+function glowBlur(n) { return quality.glow ? n : 0; }
+function glowPad(n) { return quality.glow ? n : 2; }
+
+// 背景グリッドはリサイズのときだけ描く（毎フレーム線を引き直さない）
+function renderBackground() {
+    const w = bgCanvas.width; const h = bgCanvas.height;
+    bgCtx.clearRect(0, 0, w, h);
+    bgCtx.strokeStyle = '#444'; bgCtx.lineWidth = 1; bgCtx.beginPath();
+    for (let x = SHAKE_MARGIN % GRID_SIZE; x < w; x += GRID_SIZE) { bgCtx.moveTo(x, 0); bgCtx.lineTo(x, h); }
+    for (let y = SHAKE_MARGIN % GRID_SIZE; y < h; y += GRID_SIZE) { bgCtx.moveTo(0, y); bgCtx.lineTo(w, y); }
+    bgCtx.stroke();
+}
+
+// 画面揺れは描き直しではなくレイヤーごと CSS transform でずらす（変わったときだけページに頼む）
+let appliedShakeX = 0, appliedShakeY = 0;
+function applyScreenShake() {
+    const sx = Math.round(screenShakeX); const sy = Math.round(screenShakeY);
+    if (sx === appliedShakeX && sy === appliedShakeY) return;
+    appliedShakeX = sx; appliedShakeY = sy;
+    gameHost.setShake(sx, sy);
+}
+
+// ★シミュレーションは固定ティック（60Hz）で進める。画面のHzに関係なく同じ手触り！★
+// 以下の速度・重力・クールダウン・ヒットストップは全部「1ティックあたり」「ティック数」の単位
+const SIM_HZ = 60; const SIM_DT = 1000 / SIM_HZ;
+const MAX_CATCH_UP_TICKS = 5; // 重いフレームの後でも1フレームで進めるのはここまで
+const MAX_FRAME_DELTA = 250;  // タブ復帰などで時間が飛んだときの上限(ms)
+
+const KO_HIT_STOP = 120;
+
+// 自機の向きの基準（剣の構え・持ち替えたときの向き）。武器ごとの設定はそれぞれの weapon_*.js にある
+const FIXED_UP_ANGLE = -Math.PI / 2;
+
+let black = { 
+    x: 100, y: 100, px: 100, py: 100, pAngle: FIXED_UP_ANGLE, vx: 0, vy: 0, radius: 30, 
+    isDragging: false, 
+    angle: FIXED_UP_ANGLE, baseAngle: FIXED_UP_ANGLE, swingProgress: 0, isSwinging: false,
+    hitFlags: [false, false, false],
+    cooldownTimer: 0, 
+    targetX: 100, targetY: 100
+};
+// ★サンドバッグ（白丸）は複数体。1体ずつHPとヒットストップの輪っかを持つ★
+let SANDBAG_COUNT = 0;
+const TARGET_RADIUS = 30;
+const CROWD_KO_HIT_STOP = 12; // 最後の1体以外が倒れたときの短い止め
+const targets = [];
+let aliveCount = 0;
+let isKO = false; // 全員倒した
+
+// 1体なら元の位置（右75%）、複数なら右半分にずらしながら並べる
+function layoutTargets() {
+    const W = viewW; const H = viewH;
+    if (SANDBAG_COUNT === 1) {
+        const t = targets[0];
+        t.baseX = W * 0.75; t.baseY = H * 0.5; t.radius = TARGET_RADIUS;
+    } else {
+        const rx = W * 0.5, ry = H * 0.1, rw = W * 0.45, rh = H * 0.8;
+        const cols = Math.ceil(Math.sqrt(SANDBAG_COUNT * rw / rh)); const rows = Math.ceil(SANDBAG_COUNT / cols);
+        const cw = rw / cols; const ch = rh / rows;
+        const radius = Math.max(4, Math.min(TARGET_RADIUS, Math.min(cw, ch) * 0.4));
+        targets.forEach((t, i) => {
+            const row = Math.floor(i / cols); const col = i % cols;
+            t.baseX = rx + (col + 0.5 + (row % 2 ? 0.25 : -0.25)) * cw;
+            t.baseY = ry + (row + 0.5) * ch;
+            t.radius = radius;
+        });
+    }
+    for (const t of targets) { t.x = t.px = t.baseX; t.y = t.py = t.baseY; }
+    maxTargetRadius = targets[0].radius;
+}
+
+function initPositions() {
+    layoutTargets();
+    black.x = viewW * 0.25; black.y = viewH * 0.5;
+    black.vx = 0; black.vy = 0; black.targetX = black.x; black.targetY = black.y;
+    black.angle = FIXED_UP_ANGLE; black.baseAngle = FIXED_UP_ANGLE;
+    black.cooldownTimer = 0;
+    black.px = black.x; black.py = black.y; black.pAngle = black.angle;
+}
+
+function respawnTargets() {
+    for (const t of targets) { t.hp = MAX_HP; t.alive = true; t.visible = true; t.ringTimer = 0; }
+    aliveCount = SANDBAG_COUNT; isKO = false; roundStartTick = -1;
+    initPositions(); gameHost.showRespawn(false); frozenDirty = true;
+}
+
+// ★ブロードフェーズ：一様グリッドの空間ハッシュ（毎ティック作り直し）★
+// 弾 × サンドバッグ の総当たりをやめて、近くのセルにいる子だけを詳しく判定する
+const CELL_SIZE = 96;
+let maxTargetRadius = TARGET_RADIUS;
+let gridCols = 1, gridRows = 1;
+let cellStart = new Int32Array(2);
+let cellCursor = new Int32Array(1);
+let cellItems, targetCells, targetCellCount, queryStamp, queryResult; let queryId = 0;
+
+// サンドバッグを作り直す（数が変わったら並びも変わるので、HPも含めて新しく始める）
+function setSandbagCount(n) {
+    SANDBAG_COUNT = n; targets.length = 0;
+    for (let i = 0; i < n; i++) {
+        targets.push({ x: 0, y: 0, px: 0, py: 0, baseX: 0, baseY: 0, radius: TARGET_RADIUS, hp: MAX_HP,
+                       alive: true, visible: true, ringTimer: 0, ringMax: 0, ringKO: false });
+    }
+    aliveCount = n; isKO = false; roundStartTick = -1; frozenDirty = true;
+    cellItems = new Int32Array(n * 4); // 半径 <= CELL_SIZE/2 なので1体は最大4セル
+    targetCells = new Int32Array(n * 4);
+    targetCellCount = new Uint8Array(n);
+    queryStamp = new Uint32Array(n); queryResult = new Int32Array(n);
+}
+
+function resizeSpatialHash() {
+    gridCols = Math.max(1, Math.ceil(viewW / CELL_SIZE)); gridRows = Math.max(1, Math.ceil(viewH / CELL_SIZE));
+    cellStart = new Int32Array(gridCols * gridRows + 1);
+    cellCursor = new Int32Array(gridCols * gridRows);
+}
+function cellCol(x) { return Math.min(gridCols - 1, Math.max(0, Math.floor(x / CELL_SIZE))); }
+function cellRow(y) { return Math.min(gridRows - 1, Math.max(0, Math.floor(y / CELL_SIZE))); }
+
+function rebuildSpatialHash() {
+    cellStart.fill(0);
+    for (let i = 0; i < SANDBAG_COUNT; i++) {
+        const t = targets[i]; let n = 0;
+        if (t.alive) {
+            const c0 = cellCol(t.x - t.radius), c1 = cellCol(t.x + t.radius);
+            const r0 = cellRow(t.y - t.radius), r1 = cellRow(t.y + t.radius);
+            for (let r = r0; r <= r1; r++) for (let c = c0; c <= c1; c++) {
+                const cell = r * gridCols + c; targetCells[i * 4 + n++] = cell; cellStart[cell + 1]++;
+            }
+        }
+        targetCellCount[i] = n;
+    }
+    const cells = gridCols * gridRows;
+    for (let k = 0; k < cells; k++) { cellStart[k + 1] += cellStart[k]; cellCursor[k] = cellStart[k]; }
+    for (let i = 0; i < SANDBAG_COUNT; i++) {
+        for (let n = 0; n < targetCellCount[i]; n++) cellItems[cellCursor[targetCells[i * 4 + n]]++] = i;
+    }
+}
+
+// 矩形にかかるセルのサンドバッグを重複なしで queryResult に集めて、個数を返す
+function queryTargets(minX, minY, maxX, maxY) {
+    queryId++; let n = 0;
+    const c0 = cellCol(minX), c1 = cellCol(maxX), r0 = cellRow(minY), r1 = cellRow(maxY);
+    for (let r = r0; r <= r1; r++) for (let c = c0; c <= c1; c++) {
+        const cell = r * gridCols + c;
+        for (let k = cellStart[cell]; k < cellStart[cell + 1]; k++) {
+            const i = cellItems[k];
+            if (queryStamp[i] === queryId) continue;
+            queryStamp[i] = queryId; queryResult[n++] = i;
+        }
+    }
+    return n;
+}
+
+// 全体を止めつつ、当たった子に輪っかを出す
+function setHitStop(t, frames, ko = false) {
+    // 止まっていた子がブルブルし始める・撃破で弾も止まる → 止めた絵から外すので描き直し
+    if (t.ringTimer <= 0 || ko) frozenDirty = true;
+    hitStopTimer = frames;
+    t.ringTimer = frames; t.ringMax = frames; t.ringKO = ko;
+    if (t === logTarget) { // 最後に書いた値がその当たりの止め
+        logHitStop[logIndex] = Math.min(frames, 255);
+        if (hitSoundIndex >= 0) hitSounds[hitSoundIndex + 2] = frames;
+    }
+}
+
+// 毎ティック：輪っかのタイマーを進めて、終わった子は元の位置へ（倒れた子はここで消える）
+function updateTargets() {
+    for (const t of targets) {
+        if (t.ringTimer <= 0) continue;
+        t.ringTimer--;
+        if (t.ringTimer === 0) {
+            t.x = t.baseX; t.y = t.baseY;
+            if (!t.alive) t.visible = false;
+            frozenDirty = true; // 元の位置に戻った（消えた）子を止めた絵に入れ直す
+        }
+    }
+}
+
+let mouseX = 0, mouseY = 0;
+let hitStopTimer = 0;
+let screenShakeX = 0, screenShakeY = 0;
+let simTick = 0; let simAccumulator = 0; let lastFrameTime = null;
+let koCount = 0; let roundStartTick = -1; // 撃破の実測（最初に当てたティックから）
+
+setSandbagCount(gameHost.config.sandbagCount);
+
+// 描画は前ティックと今ティックの間を補間する
+function lerp(a, b, t) { return a + (b - a) * t; }
+function lerpAngle(a, b, t) {
+    let d = b - a;
+    while (d > Math.PI) d -= Math.PI * 2; while (d < -Math.PI) d += Math.PI * 2;
+    return a + d * t;
+}
+
+// ★エンティティは型付き配列の固定長プールで持つ（毎フレームの new や filter() をやめてGCの引っかかりをなくす）★
+// fields: { 名前: Float32Array など }、evictBy: 満杯のときに一番小さい子から上書きするフィールド
+class EntityPool {
+    constructor(capacity, fields, evictBy) {
+        this.capacity = capacity; this.count = 0; this.evictBy = evictBy;
+        this.columns = []; this.names = [];
+        for (const name in fields) { this[name] = new fields[name](capacity); this.columns.push(this[name]); this.names.push(name); }
+    }
+    // 空きスロットの番号を返す。満杯なら一番古い（薄い）子を追い出して再利用
+    spawn() {
+        if (this.count < this.capacity) return this.count++;
+        const key = this[this.evictBy]; let victim = 0;
+        for (let i = 1; i < this.count; i++) if (key[i] < key[victim]) victim = i;
+        return victim;
+    }
+    // 上限を変える（今いる子は新しい上限に収まるぶんだけ残す）
+    resize(capacity) {
+        this.capacity = capacity; this.count = Math.min(this.count, capacity);
+        for (let c = 0; c < this.columns.length; c++) {
+            const col = new this.columns[c].constructor(capacity);
+            col.set(this.columns[c].subarray(0, this.count));
+            this.columns[c] = col; this[this.names[c]] = col;
+        }
+    }
+    // 最後の子で穴を埋める（並び順は保たない）
+    remove(i) {
+        const last = --this.count;
+        if (i === last) return;
+        for (let c = 0; c < this.columns.length; c++) this.columns[c][i] = this.columns[c][last];
+    }
+}
+
+let PARTICLE_BUDGET = gameHost.config.particleBudget;
+const POPUP_BUDGET = 96;
+
+// パーティクルの色はパレット番号で持つ（大きい火花の hsl() は6段階に量子化）
+const PARTICLE_COLORS = ['#FFD700', '#00ffff', '#ff55ff', '#ff00ff', '#ffaa00'];
+const C_GOLD = 0, C_CYAN = 1, C_PINK = 2, C_MAGENTA = 3, C_ORANGE = 4;
+const C_FIRE = PARTICLE_COLORS.length; const FIRE_STEPS = 6;
+for (let i = 0; i < FIRE_STEPS; i++) PARTICLE_COLORS.push(`hsl(${15 + i * 10}, 100%, 60%)`);
+
+const particles = new EntityPool(PARTICLE_BUDGET, {
+    x: Float32Array, y: Float32Array, px: Float32Array, py: Float32Array, vx: Float32Array, vy: Float32Array,
+    life: Float32Array, decay: Float32Array, size: Float32Array, color: Uint8Array
+}, 'life');
+const damagePopups = new EntityPool(POPUP_BUDGET, {
+    x: Float32Array, y: Float32Array, py: Float32Array, vy: Float32Array, life: Float32Array,
+    damage: Int32Array, isCritical: Uint8Array
+}, 'life');
+const MOVING_POOLS = [particles]; // 武器の弾は registerWeapon() で足す
+
+// ★光りモノ（shadowBlur）は1回だけオフスクリーンに描いて、あとは回転した drawImage で貼るだけ★
+// キーは形・サイズ・色。画面サイズやDPRが変わったら作り直す
+const GLOW_SPRITE_LIMIT = 64;
+const glowSprites = new Map();
+let glowSpriteDpr = 1;
+
+function invalidateGlowSprites() { glowSprites.clear(); glowSpriteDpr = displayDpr; }
+
+// w,h: 図形の大きさ、pad: 光がはみ出す余白、(ox,oy): 図形の原点（貼るときの基準点）
+function getGlowSprite(key, w, h, pad, ox, oy, paint) {
+    let sprite = glowSprites.get(key);
+    if (sprite) return sprite;
+    if (glowSprites.size >= GLOW_SPRITE_LIMIT) glowSprites.clear();
+    const sw = w + pad * 2; const sh = h + pad * 2; const dpr = glowSpriteDpr;
+    const c = gameHost.createCanvas(Math.ceil(sw * dpr), Math.ceil(sh * dpr));
+    const g = c.getContext('2d');
+    g.scale(dpr, dpr); g.translate(pad + ox, pad + oy);
+    paint(g);
+    sprite = { canvas: c, ax: pad + ox, ay: pad + oy, w: sw, h: sh };
+    glowSprites.set(key, sprite);
+    return sprite;
+}
+function drawGlowSprite(ctx, sprite, x, y, angle) {
+    ctx.save(); ctx.translate(x, y); ctx.rotate(angle);
+    ctx.drawImage(sprite.canvas, -sprite.ax, -sprite.ay, sprite.w, sprite.h);
+    ctx.restore();
+}
+
+// --- パーティクル ---
+function spawnParticle(x, y, isBig, color = -1) {
+    const P = particles; const i = P.spawn();
+    if (i < frozenParticleMark) frozenDirty = true; // 止めた絵に描いた子を追い出した
+    const angle = fxRandom() * Math.PI * 2;
+    const speed = isBig ? fxRandom() * 15 + 5 : fxRandom() * 5 + 2;
+    P.x[i] = x; P.y[i] = y; P.px[i] = x; P.py[i] = y;
+    P.vx[i] = Math.cos(angle) * speed; P.vy[i] = Math.sin(angle) * speed;
+    P.life[i] = 1.0;
+    P.decay[i] = isBig ? fxRandom() * 0.01 + 0.005 : fxRandom() * 0.05 + 0.02;
+    P.color[i] = color >= 0 ? color : (isBig ? C_FIRE + Math.floor(fxRandom() * FIRE_STEPS) : C_GOLD);
+    P.size[i] = isBig ? fxRandom() * 8 + 4 : fxRandom() * 3 + 2;
+}
+function updateParticles() {
+    const P = particles;
+    for (let i = P.count - 1; i >= 0; i--) {
+        P.x[i] += P.vx[i]; P.y[i] += P.vy[i]; P.vx[i] *= 0.95; P.vy[i] *= 0.95; P.life[i] -= P.decay[i];
+        if (P.life[i] <= 0) P.remove(i);
+    }
+}
+// ★パーティクルは「色 × 透明度の段階」でバケツ分けして、バケツごとにパス1本でまとめて塗る★
+// 描画コストが粒の数ではなくバケツの数で決まるようになる
+const ALPHA_BANDS = 8;
+const PARTICLE_BUCKETS = PARTICLE_COLORS.length * ALPHA_BANDS;
+const bucketStart = new Int32Array(PARTICLE_BUCKETS + 1);
+const bucketCursor = new Int32Array(PARTICLE_BUCKETS);
+let particleBucket = new Uint16Array(PARTICLE_BUDGET);
+let bucketOrder = new Int32Array(PARTICLE_BUDGET);
+
+function setParticleBudget(n) {
+    PARTICLE_BUDGET = n; particles.resize(n); frozenDirty = true;
+    particleBucket = new Uint16Array(n); bucketOrder = new Int32Array(n);
+}
+
+// from から後ろの子だけを描く（ヒットストップ中に後から出た子）
+function drawParticles(ctx, a, from = 0) {
+    const P = particles; const n = P.count;
+    if (n <= from) return;
+    // 計数ソートでバケツ順に並べる（配列は使い回し）
+    bucketStart.fill(0);
+    for (let i = from; i < n; i++) {
+        const band = Math.min(ALPHA_BANDS - 1, (P.life[i] * ALPHA_BANDS) | 0);
+        const k = P.color[i] * ALPHA_BANDS + band;
+        particleBucket[i] = k; bucketStart[k + 1]++;
+    }
+    for (let k = 0; k < PARTICLE_BUCKETS; k++) { bucketStart[k + 1] += bucketStart[k]; bucketCursor[k] = bucketStart[k]; }
+    for (let i = from; i < n; i++) bucketOrder[bucketCursor[particleBucket[i]]++] = i;
+
+    for (let k = 0; k < PARTICLE_BUCKETS; k++) {
+        const start = bucketStart[k]; const end = bucketStart[k + 1];
+        if (start === end) continue;
+        ctx.globalAlpha = ((k % ALPHA_BANDS) + 0.5) / ALPHA_BANDS;
+        ctx.fillStyle = PARTICLE_COLORS[(k / ALPHA_BANDS) | 0];
+        ctx.beginPath();
+        for (let j = start; j < end; j++) {
+            const i = bucketOrder[j];
+            const x = lerp(P.px[i], P.x[i], a); const y = lerp(P.py[i], P.y[i], a); const r = P.size[i];
+            ctx.moveTo(x + r, y); ctx.arc(x, y, r, 0, Math.PI * 2);
+        }
+        ctx.fill();
+    }
+    ctx.globalAlpha = 1.0;
+}
+
+// --- ダメージ数字 ---
+function spawnDamagePopup(x, y, damage, isCritical) {
+    const D = damagePopups; const i = D.spawn();
+    if (i < frozenPopupMark) frozenDirty = true;
+    D.x[i] = x; D.y[i] = y; D.py[i] = y; D.vy[i] = -2; D.life[i] = 1.0;
+    D.damage[i] = Math.floor(damage); D.isCritical[i] = isCritical ? 1 : 0;
+}
+function updateDamagePopups() {
+    const D = damagePopups;
+    for (let i = D.count - 1; i >= 0; i--) {
+        D.y[i] += D.vy[i]; D.vy[i] *= 0.95; D.life[i] -= 0.02;
+        if (D.life[i] <= 0) D.remove(i);
+    }
+}
+
+// ★ダメージ数字は、0〜9 を縁取りごと焼いておいた画像（グリフアトラス）から1文字ずつ貼る★
+// 毎フレームのフォント切り替えと文字のラスタライズをやめる。DPRが変わったら焼き直す
+// 縁取りだけの列と中身だけの列を分けて焼いて、数字ごとに「縁取り全部 → 中身全部」の順で貼る（strokeText → fillText と同じ重なり方）
+const POPUP_STYLES = [
+    { font: 'bold 24px Arial Black', size: 24, fill: '#ffffff' }, // ふつう
+    { font: 'bold 36px Arial Black', size: 36, fill: '#ff0000' }, // クリティカル
+];
+const POPUP_STROKE = 3;
+const popupDigits = new Uint8Array(10);
+let digitAtlas = null;
+
+function buildDigitAtlas() {
+    const dpr = displayDpr; const pad = Math.ceil(POPUP_STROKE / 2) + 1;
+    const probe = gameHost.createCanvas(1, 1).getContext('2d');
+    let width = 0; let rowY = 0;
+    const rows = POPUP_STYLES.map(style => {
+        probe.font = style.font;
+        const m = probe.measureText('0123456789');
+        const ascent = Math.ceil(m.actualBoundingBoxAscent || style.size * 0.8) + pad;
+        const height = ascent + Math.ceil(m.actualBoundingBoxDescent || style.size * 0.2) + pad;
+        const row = { style, y: rowY, ascent, height, advance: new Float32Array(10), w: new Float32Array(10), x: new Float32Array(20) };
+        for (let d = 0; d < 10; d++) { row.advance[d] = probe.measureText(String(d)).width; row.w[d] = Math.ceil(row.advance[d]) + pad * 2; }
+        let x = 0;
+        for (let k = 0; k < 20; k++) { row.x[k] = x; x += row.w[k % 10]; }
+        width = Math.max(width, x); rowY += height;
+        return row;
+    });
+    const c = gameHost.createCanvas(Math.ceil(width * dpr), Math.ceil(rowY * dpr));
+    const g = c.getContext('2d');
+    g.scale(dpr, dpr); g.textAlign = 'left'; g.textBaseline = 'alphabetic';
+    g.strokeStyle = 'black'; g.lineWidth = POPUP_STROKE;
+    for (const row of rows) {
+        g.font = row.style.font; g.fillStyle = row.style.fill;
+        for (let d = 0; d < 10; d++) {
+            g.strokeText(String(d), row.x[d] + pad, row.y + row.ascent);
+            g.fillText(String(d), row.x[10 + d] + pad, row.y + row.ascent);
+        }
+    }
+    return { canvas: c, dpr, pad, rows };
+}
+
+function drawDamagePopups(ctx, a, from = 0) {
+    const D = damagePopups;
+    if (D.count <= from) return;
+    if (!digitAtlas) digitAtlas = buildDigitAtlas();
+    const { canvas: atlas, dpr, pad, rows } = digitAtlas;
+    for (let i = from; i < D.count; i++) {
+        const row = rows[D.isCritical[i]];
+        // 下の桁から取り出す（文字列は作らない）
+        let n = 0; let value = D.damage[i]; let width = 0;
+        do { const d = value % 10; popupDigits[n++] = d; width += row.advance[d]; value = (value - d) / 10; } while (value > 0);
+        const left = D.x[i] - width / 2; const top = lerp(D.py[i], D.y[i], a) - row.ascent; // 中央ぞろえ・ベースラインが y
+        ctx.globalAlpha = D.life[i];
+        for (let layer = 0; layer < 20; layer += 10) {
+            let x = left;
+            for (let k = n - 1; k >= 0; k--) {
+                const d = popupDigits[k];
+                ctx.drawImage(atlas, row.x[layer + d] * dpr, row.y * dpr, row.w[d] * dpr, row.height * dpr, x - pad, top, row.w[d], row.height);
+                x += row.advance[d];
+            }
+        }
+    }
+    ctx.globalAlpha = 1.0;
+}
+
+// ★WebGL で描くとき：散弾・レーザー・ビーム・ヒットストップの輪・火花を、種類ごとのインスタンス配列に詰めて描く★
+// 斬撃とダメージ数字は今までどおりエフェクト層（Canvas 2D）に描く（GL の層はその下）
+// 'webgl' を選んでも作れなかったら（WebGL が無い・コンテキストを失った）Canvas 2D の draw() に戻る
+let glRenderer = null; let glUnavailable = false; let glBatches = null;
+let RENDERER = 'canvas'; // 'canvas' / 'webgl' / 'webgl2'（実際に使っているもの）
+
+function setRenderer(name) {
+    if (name === 'webgl' && !glRenderer && !glUnavailable) {
+        glRenderer = createGlRenderer(glCanvas);
+        if (glRenderer) {
+            glBatches = {};
+        } else {
+            glUnavailable = true;
+        }
+    }
+    const next = name === 'webgl' && glRenderer ? glRenderer.api : 'canvas';
+    if (next === 'canvas' && RENDERER !== 'canvas') glRenderer.clear();
+    if (next !== RENDERER) frozenDirty = true; // 火花と輪の描き先が変わる
+    RENDERER = next;
+}
+
+// '#rrggbb' と 'hsl(h, s%, l%)' を [r, g, b]（0〜1）に
+function colorToRgb(css) {
+    if (css[0] === '#') return [1, 3, 5].map(k => parseInt(css.slice(k, k + 2), 16) / 255);
+    const [h, sat, l] = css.match(/[\d.]+/g).map(Number);
+    const a = sat / 100 * Math.min(l / 100, 1 - l / 100);
+    return [0, 8, 4].map(n => { const k = (n + h / 30) % 12; return l / 100 - a * Math.max(-1, Math.min(k - 3, 9 - k, 1)); });
+}
+const GL_PARTICLE_RGB = PARTICLE_COLORS.map(colorToRgb);
+const GL_WHITE = [1, 1, 1], GL_YELLOW = [1, 1, 0], GL_CYAN = [0, 1, 1], GL_MAGENTA = [1, 0, 1];
+const GL_LASER_CORE = [0.8, 1, 1], GL_BEAM_CORE = [1, 0.86, 1], GL_KO_RED = [1, 0.2, 0.2];
+
+// 種類ごとのインスタンス配列（初めて使うときに作る。武器の弾は weapon_*.js の drawGl が名前を決める）
+function glBatch(name, capacity) {
+    return glBatches[name] || (glBatches[name] = glRenderer.batch(capacity));
+}
+
+function drawGl(a, bx, by) {
+    const R = glRenderer; const glow = quality.glow;
+    R.begin(displayW, displayH);
+
+    // 散弾・レーザー・ビームは武器ごとに
+    for (const w of loadedWeapons) w.drawGl(R, a);
+
+    // ヒットストップの輪（撃破の輪は赤く点滅）
+    const rb = glBatch('rings'); rb.clear();
+    const ringRgb = weapon.ringRgb;
+    for (const t of targets) {
+        if (t.ringTimer <= 0) continue;
+        const tx = lerp(t.px, t.x, a); const ty = lerp(t.py, t.y, a);
+        const onBall = !t.ringKO && weapon.ringAtContact;
+        const expansion = t.ringKO ? (t.ringMax - t.ringTimer) : (30 - t.ringTimer) * 2;
+        const radius = (black.radius + 20 + expansion) * (t.radius / TARGET_RADIUS);
+        if (t.ringKO) rb.push(tx, ty, 1, 0, 5, radius, glowPad(12), GL_SHAPE_RING, GL_KO_RED, Math.random(), GL_KO_RED, 0.4);
+        else rb.push(onBall ? (bx + tx) / 2 : tx, onBall ? (by + ty) / 2 : ty, 1, 0, 2.5, radius, glowPad(10), GL_SHAPE_RING, ringRgb, 0.8, ringRgb, 0.4);
+    }
+    R.draw(rb);
+
+    // 火花：色はパレット、濃さは残りの寿命そのまま（Canvas 2D のような段階分けはいらない）
+    const F = particles; const fb = glBatch('particles', 256); fb.clear();
+    for (let i = 0; i < F.count; i++) {
+        const rgb = GL_PARTICLE_RGB[F.color[i]]; const r = F.size[i];
+        fb.push(lerp(F.px[i], F.x[i], a), lerp(F.py[i], F.y[i], a), 1, 0, 0, r, glow ? r * 1.5 : 0, GL_SHAPE_CAPSULE, rgb, F.life[i], rgb, F.life[i] * 0.5);
+    }
+    R.draw(fb);
+}
+
+function applyDamage(t, damage, hitX, hitY, isCritical) {
+    if (roundStartTick < 0) roundStartTick = simTick;
+    if (!IS_INFINITE) t.hp -= damage;
+    logHit(t, damage, isCritical, !IS_INFINITE && t.hp <= 0 && t.alive);
+    spawnDamagePopup(t.x, t.y - 40, damage, isCritical);
+    
+    if (!IS_INFINITE && t.hp <= 0 && t.alive) {
+        t.alive = false; t.hp = 0; aliveCount--;
+        if (aliveCount === 0) {
+            isKO = true; setHitStop(t, KO_HIT_STOP, true); reportKO();
+            for(let i=0, n=particleCount(80); i<n; i++) spawnParticle(t.x, t.y, true);
+        } else {
+            // まだ残りがいるときは短く止めるだけ
+            setHitStop(t, CROWD_KO_HIT_STOP, true);
+            for(let i=0, n=particleCount(40); i<n; i++) spawnParticle(t.x, t.y, true);
+        }
+    } else if (!isKO) {
+        setHitStop(t, 4); // デフォルト（各武器で上書き）
+        const pCount = particleCount(Math.floor(damage / 5) + 3);
+        for(let i=0; i<pCount; i++) spawnParticle(hitX, hitY, false, isCritical ? C_MAGENTA : C_GOLD);
+    }
+}
+
+// 全員倒したら Python 側に知らせる（サイドバーに実測の撃破時間を出す）
+// Python に返す値はいつも { ko, replay, events } の形でまるごと送る
+const componentValue = { ko: null, replay: null, events: null };
+function reportKO() {
+    if (replaying) return;
+    koCount++;
+    componentValue.ko = { koCount, weapon: WEAPON_TYPE, ttk: (simTick - roundStartTick) / SIM_HZ };
+    takeCombatLog(); // どのみち送るので、溜まっている戦闘ログも一緒に
+    gameHost.setComponentValue(componentValue);
+}
+
+// ★戦闘ログ：applyDamage 1回で1件（ティック・武器・ダメージ・クリティカル・ヒットストップのフレーム数・撃破）★
+// 列ごとの型付き配列に溜めて、まとめて1バッチで Python に送る（値を送るたびにリランが走るので、1件ずつは送らない）。
+// 送るのは、撃破したとき（撃破の報告と一緒に）・COMBAT_LOG_FLUSH_COUNT 件たまったとき・
+// 前に送ってから COMBAT_LOG_FLUSH_MS 経って、しかも COMBAT_LOG_QUIET_TICKS のあいだ誰にも当てていないとき（戦闘の合間）
+// tick はこの iframe で試合が進んだティック数（リプレイややり直しでは戻らない）。リプレイの中の当たりは入れない
+// Python 側は session と seq で同じバッチを1回だけ取り込む（combat_log.py）
+const COMBAT_LOG_SIZE = 1024;        // 1ティックに大勢を斬っても溢れないように、送る目安より大きく取る
+const COMBAT_LOG_FLUSH_COUNT = 256;
+const COMBAT_LOG_FLUSH_MS = 10000;
+const COMBAT_LOG_QUIET_TICKS = SIM_HZ * 2;
+const logTick = new Uint32Array(COMBAT_LOG_SIZE); const logWeapon = new Uint8Array(COMBAT_LOG_SIZE);
+const logDamage = new Float64Array(COMBAT_LOG_SIZE); const logCritical = new Uint8Array(COMBAT_LOG_SIZE);
+const logHitStop = new Uint8Array(COMBAT_LOG_SIZE); const logKO = new Uint8Array(COMBAT_LOG_SIZE);
+const logSession = newSeed().toString(16) + newSeed().toString(16);
+let logCount = 0; let logSeq = 0; let logClock = 0; let logLastFlush = 0;
+let logTarget = null; let logIndex = 0; // ヒットストップは applyDamage の後に武器が決めるので、その当たりを覚えておく
+let hittingWeapon = null; // 今当たり判定をしている武器（持ち替える前に撃った弾は、撃った武器のもの）
+
+function logHit(t, damage, isCritical, ko) {
+    if (replaying) return;
+    if (logCount === COMBAT_LOG_SIZE) flushCombatLog();
+    const i = logCount++;
+    logTick[i] = logClock; logWeapon[i] = hittingWeapon.index; logDamage[i] = damage;
+    logCritical[i] = isCritical ? 1 : 0; logHitStop[i] = 0; logKO[i] = ko ? 1 : 0;
+    logTarget = t; logIndex = i;
+    queueHitSound(ko ? HIT_SOUND_KO : hittingWeapon.index);
+}
+// 溜まっている分を componentValue.events に移す（送るのは呼んだ側）
+function takeCombatLog() {
+    if (logCount === 0) return;
+    const n = logCount;
+    componentValue.events = {
+        session: logSession, seq: ++logSeq,
+        tick: Array.from(logTick.subarray(0, n)), weapon: Array.from(logWeapon.subarray(0, n)),
+        damage: Array.from(logDamage.subarray(0, n)), critical: Array.from(logCritical.subarray(0, n)),
+        hitStop: Array.from(logHitStop.subarray(0, n)), ko: Array.from(logKO.subarray(0, n)),
+    };
+    logCount = 0; logTarget = null;
+}
+function flushCombatLog() {
+    takeCombatLog();
+    gameHost.setComponentValue(componentValue);
+}
+// フレームごとに、送りどきかどうかだけを見る
+function pollCombatLog(now) {
+    if (logCount === 0) return;
+    const quiet = logClock - logTick[logCount - 1] >= COMBAT_LOG_QUIET_TICKS;
+    if (logCount >= COMBAT_LOG_FLUSH_COUNT || (quiet && now - logLastFlush >= COMBAT_LOG_FLUSH_MS)) {
+        logLastFlush = now;
+        flushCombatLog();
+    }
+}
+
+// ★効果音：当たりを [ティック, 音, ヒットストップ] でフレームのあいだ溜めて、フレームの終わりにまとめて gameHost.playHits() へ★
+// 鳴らすのはページ側の sfx.js（ワーカーには AudioContext が無い）。ティックは当たった simTick で、sfx.js はそのティックに合わせて鳴らす。
+// 音は武器の番号（WEAPON_ORDER の順）、撃破は HIT_SOUND_KO。ヒットストップは戦闘ログと同じく、武器が setHitStop() したときに埋まる。
+// リプレイの中の当たりは鳴らさない（logHit() から呼ぶので、戦闘ログと同じ当たりだけ）
+const HIT_SOUND_KO = 5; // sfx.js の SFX_KO と同じ
+const HIT_SOUND_QUEUE_SIZE = 64; // 1フレームにこれより多く当たった分は鳴らさない（同時に鳴らせる数よりずっと多い）
+const hitSounds = new Uint32Array(HIT_SOUND_QUEUE_SIZE * 3);
+let hitSoundCount = 0; let hitSoundIndex = -1; // 今の当たり（logTarget）の hitSounds の位置
+
+function queueHitSound(sound) {
+    if (hitSoundCount === HIT_SOUND_QUEUE_SIZE) { hitSoundIndex = -1; return; }
+    const i = hitSoundIndex = hitSoundCount++ * 3;
+    hitSounds[i] = simTick; hitSounds[i + 1] = sound; hitSounds[i + 2] = 0;
+}
+function flushHitSounds() {
+    if (hitSoundCount === 0) return;
+    gameHost.playHits(simTick, hitSounds.slice(0, hitSoundCount * 3));
+    hitSoundCount = 0; hitSoundIndex = -1;
+}
+
+// ★武器はそれぞれ weapon_*.js の1ファイル。読み込まれたら registerWeapon() で自分を登録する★
+// 本体は今の武器のフックを呼ぶだけで、武器の種類で分岐しない。ページには選んだ武器のファイルだけを読み込み、
+// 持ち替えたときに gameHost.loadWeapon() で足す（持ち替えても飛んでいる弾は残るので、読み込んだ武器は外さない）
+// 弾の更新・当たり判定・チェックサムは、読み込んだ順ではなく WEAPON_ORDER の順に回す（リプレイが同じ結果になるように）
+const WEAPON_ORDER = ['ball', 'sword', 'shotgun', 'laser', 'giant_beam'];
+const WEAPON_DEFAULTS = {
+    shake: 10,                          // ヒットストップ中の画面揺れ
+    ringColor: 'rgba(255, 100, 0, 0.8)', ringRgb: [1, 0.4, 0], // ヒットストップの輪（Canvas 2D / WebGL）
+    ringAtContact: false,               // 輪を自機とサンドバッグのあいだに出す
+    pool: null, poolLabel: '',          // 弾の EntityPool（HUD・チェックサム・ベンチ用）
+    pools: [],                          // 試合をやり直すときに空にするもの（pool は自動で入る）
+    onDown() {}, onMove() {}, onUp() {}, // 入力（位置は本体が mouseX/Y とドラッグに反映してから呼ぶ）
+    movePlayer() {}, collideMelee() {}, // 今の武器だけ：自機を動かす・自機で殴る
+    updateProjectiles() {}, collideProjectiles() {}, updateEffects() {}, // 読み込んだ武器ぜんぶ
+    drawPlayer() {}, drawProjectiles() {}, drawEffects() {}, drawGl() {},
+};
+const weapons = {};
+const loadedWeapons = [];
+let weapon = null; // 今の武器（WEAPON_TYPE のモジュール）
+const weaponWaiters = {};
+
+function registerWeapon(name, module) {
+    const w = Object.assign({ name, index: WEAPON_ORDER.indexOf(name) }, WEAPON_DEFAULTS, module);
+    if (w.pool) { w.pools = [w.pool, ...w.pools]; MOVING_POOLS.push(w.pool); }
+    weapons[name] = w;
+    loadedWeapons.push(w);
+    loadedWeapons.sort((p, q) => WEAPON_ORDER.indexOf(p.name) - WEAPON_ORDER.indexOf(q.name));
+    if (name === WEAPON_TYPE) weapon = w;
+    for (const resolve of weaponWaiters[name] || []) resolve(w);
+    delete weaponWaiters[name];
+}
+// 武器のファイルが読み込まれるのを待つ（読み込み済みならすぐ）
+function requireWeapon(name) {
+    if (weapons[name]) return Promise.resolve(weapons[name]);
+    return new Promise(resolve => {
+        // ワーカーの importScripts() はその場で読み込むので、待ち手を先に置いてから頼む
+        (weaponWaiters[name] ||= []).push(resolve);
+        gameHost.loadWeapon(name);
+    });
+}
+// 弾の数（その武器を読み込んでいなければ 0）。HUD・ベンチ用
+function projectileCount(name) {
+    const w = weapons[name];
+    return w && w.pool ? w.pool.count : 0;
+}
+
+// ★砲台（散弾・レーザー・ビーム）の共通部分：近くを押したら掴んで動かす・離れたところを押したら撃つ・マウスの方を向く★
+// spec: color / cooldownColor（砲口とクールダウンの色）、cooldown（ティック）、fire(角度)
+function shooterWeapon(spec) {
+    const aim = () => { if (!black.isDragging) black.angle = Math.atan2(mouseY - black.y, mouseX - black.x); };
+    return Object.assign({
+        onDown(pos) {
+            if (Math.hypot(pos.x - black.x, pos.y - black.y) < black.radius * 2.5) {
+                black.isDragging = true; black.vx = 0; black.vy = 0;
+            } else if (black.cooldownTimer <= 0) {
+                black.cooldownTimer = spec.cooldown;
+                spec.fire(Math.atan2(pos.y - black.y, pos.x - black.x));
+            }
+        },
+        onMove: aim,
+        movePlayer: aim,
+        drawPlayer(g, bx, by, bAngle) {
+            g.save(); g.translate(bx, by); g.rotate(bAngle);
+            g.fillStyle = 'black'; g.beginPath(); g.arc(0, 0, black.radius, 0, Math.PI * 2); g.fill();
+            g.fillStyle = spec.color;
+            g.beginPath(); g.arc(black.radius-5, 0, 8, 0, Math.PI*2); g.fill();
+            if(black.cooldownTimer > 0) {
+                 g.fillStyle = spec.cooldownColor;
+                 g.beginPath(); g.moveTo(0,0);
+                 g.arc(0, 0, black.radius, -Math.PI/2, -Math.PI/2 + (Math.PI*2 * (black.cooldownTimer/spec.cooldown)), false);
+                 g.fill();
+            }
+            g.restore();
+        },
+    }, spec);
+}
+
+function onDown(pos) {
+    frozenDirty = true; // 撃った・持った（ヒットストップ中でも止めた絵を作り直す）
+    weapon.onDown(pos);
+}
+
+function onMove(pos) {
+    mouseX = pos.x; mouseY = pos.y;
+    if (black.isDragging) { black.x = pos.x; black.y = pos.y; }
+    weapon.onMove(pos);
+}
+
+function onUp() {
+    weapon.onUp();
+    black.isDragging = false;
+}
+
+// ★ポインタの軌跡：届いたサンプル（coalesced events の1個1個）を時刻つきで覚えておく★
+// 投げる速さは「最後の1イベントの移動量」ではなく、直近 THROW_WINDOW_MS の移動量 ÷ 経過時間で決める
+// （マウスのレートやフレームの間隔に左右されず、本当に振った速さになる）
+// 時刻は前のサンプルからの差（POINTER_TIME_UNIT 分の1 ms の整数）で届くので、記録から同じ値を作り直せる
+const POINTER_TIME_UNIT = 10;  // 0.1ms 単位
+const POINTER_TRACK = 32;      // 覚えておくサンプル数（1kHz のマウスでも 32ms ぶん）
+const THROW_WINDOW_MS = 48;
+const THROW_SCALE = 0.5;       // 1ティックぶんの移動量 × 0.5（前の投げ方と同じ重さ）
+const trackX = new Float32Array(POINTER_TRACK); const trackY = new Float32Array(POINTER_TRACK);
+const trackT = new Float64Array(POINTER_TRACK);
+let trackCount = 0; let trackHead = 0; let pointerClock = 0;
+
+function trackPointer(x, y, dt, restart) {
+    pointerClock += dt / POINTER_TIME_UNIT;
+    if (restart) trackCount = 0;
+    trackHead = (trackHead + 1) % POINTER_TRACK;
+    trackX[trackHead] = x; trackY[trackHead] = y; trackT[trackHead] = pointerClock;
+    if (trackCount < POINTER_TRACK) trackCount++;
+}
+
+// 時刻 now までの THROW_WINDOW_MS に入っているサンプルから、1ティックあたりの速さを black に入れる
+function throwVelocity(now) {
+    black.vx = 0; black.vy = 0;
+    if (trackCount === 0 || now - trackT[trackHead] > THROW_WINDOW_MS) return;
+    let oldest = trackHead;
+    for (let k = 1; k < trackCount; k++) {
+        const i = (trackHead - k + POINTER_TRACK) % POINTER_TRACK;
+        if (now - trackT[i] > THROW_WINDOW_MS) break;
+        oldest = i;
+    }
+    const span = trackT[trackHead] - trackT[oldest];
+    if (span <= 0) return;
+    const perTick = THROW_SCALE * 1000 / SIM_HZ / span;
+    black.vx = (trackX[trackHead] - trackX[oldest]) * perTick;
+    black.vy = (trackY[trackHead] - trackY[oldest]) * perTick;
+}
+
+// ★入力はその場で反映せず、キューに積んで次のティックの頭でまとめて反映する★
+// 反映したティック番号ごとに記録しておけば、リプレイで同じ入力を同じティックに流し込める
+const INPUT_NOP = 0, INPUT_DOWN = 1, INPUT_MOVE = 2, INPUT_UP = 3, INPUT_RESPAWN = 4, INPUT_RESIZE = 5, INPUT_CONFIG = 6, INPUT_END = 7;
+const INPUT_QUEUE_SIZE = 256;
+const inputType = new Uint8Array(INPUT_QUEUE_SIZE);
+const inputX = new Int16Array(INPUT_QUEUE_SIZE); const inputY = new Int16Array(INPUT_QUEUE_SIZE);
+const inputDt = new Uint16Array(INPUT_QUEUE_SIZE); // DOWN/MOVE/UP：前のポインタ入力からの時間
+const inputConfigs = []; // INPUT_CONFIG の中身（届いた順）
+let inputCount = 0;
+
+function pushInput(type, x, y, dt = 0) {
+    if (inputCount === INPUT_QUEUE_SIZE) return; // 1ティックにこんなに来ることはないので、あふれたら捨てる
+    inputType[inputCount] = type; inputX[inputCount] = x; inputY[inputCount] = y; inputDt[inputCount] = dt; inputCount++;
+}
+// 画面からの入力。リプレイ中は試合に混ぜない
+function queueInput(type, x, y) { if (!replaying) pushInput(type, x, y); }
+
+// ポインタの入力はページ側のイベント時刻（ms）つきで届く。前のサンプルとの差にして積む
+// （時計の基準がページとワーカーで違っても、差なら同じ）
+let lastPointerTime = null;
+function queuePointer(type, x, y, time) {
+    if (replaying) return;
+    const dt = lastPointerTime === null ? 0 : Math.round((time - lastPointerTime) * POINTER_TIME_UNIT);
+    lastPointerTime = time;
+    pushInput(type, x, y, Math.min(0xFFFF, Math.max(0, dt)));
+}
+
+function drainInputs() {
+    for (let k = 0; k < inputCount; k++) {
+        const type = inputType[k]; const x = inputX[k]; const y = inputY[k]; const dt = inputDt[k];
+        const config = type === INPUT_CONFIG ? inputConfigs.shift() : null;
+        recordInput(type, x, y, dt, config);
+        if (type === INPUT_DOWN) { trackPointer(x, y, dt, true); onDown({ x, y }); }
+        else if (type === INPUT_MOVE) { trackPointer(x, y, dt, false); onMove({ x, y }); }
+        else if (type === INPUT_UP) { pointerClock += dt / POINTER_TIME_UNIT; onUp(); }
+        else if (type === INPUT_RESPAWN) respawnTargets();
+        else if (type === INPUT_RESIZE) setViewSize(x, y);
+        else if (type === INPUT_CONFIG) applyConfigNow(config);
+    }
+    inputCount = 0;
+}
+
+// ★記録：ヘッダ（シード・画面サイズ・設定）＋ 入力1個ごとに [前の入力からのティック数 u16][種類 u8][中身] のバイナリ★
+// 中身は DOWN/MOVE が int16 x2 + uint16 時間差、UP が uint16 時間差、RESIZE が int16 x2、
+// CONFIG が uint32 長さ + JSON、END が uint32 チェックサム（保存したときの状態）
+const REPLAY_MAGIC = 0x32525348; // 'HSR2'（HSR1 はポインタの時刻が無いので、投げる速さを再現できない）
+const REPLAY_MAGIC_V1 = 0x31525348;
+const REC_MAX_BYTES = 8 << 20;   // これを超えたら記録をやめる（60Hzで動かしっぱなしでも数時間ぶん）
+let recBytes = new Uint8Array(64 << 10); let recView = new DataView(recBytes.buffer);
+let recLength = 0; let recLastTick = 0; let recording = false;
+const textEncoder = new TextEncoder(); const textDecoder = new TextDecoder();
+
+function recReserve(n) {
+    if (recLength + n <= recBytes.length) return true;
+    if (recLength + n > REC_MAX_BYTES) { recording = false; return false; }
+    const grown = new Uint8Array(Math.min(REC_MAX_BYTES, Math.max(recBytes.length * 2, recLength + n)));
+    grown.set(recBytes.subarray(0, recLength));
+    recBytes = grown; recView = new DataView(recBytes.buffer);
+    return true;
+}
+function recJson(config) {
+    const json = textEncoder.encode(JSON.stringify(config));
+    if (!recReserve(4 + json.length)) return;
+    recView.setUint32(recLength, json.length, true); recBytes.set(json, recLength + 4); recLength += 4 + json.length;
+}
+
+function startRecording() {
+    recLength = 0; recLastTick = simTick; recording = true;
+    recReserve(12);
+    recView.setUint32(0, REPLAY_MAGIC, true); recView.setUint32(4, simSeed, true);
+    recView.setUint16(8, viewW, true); recView.setUint16(10, viewH, true); recLength = 12;
+    recJson(liveConfig);
+}
+
+function recordInput(type, x, y, dt, config) {
+    if (!recording) return;
+    let delta = simTick - recLastTick; recLastTick = simTick;
+    for (; delta > 0xFFFF; delta -= 0xFFFF) {
+        if (!recReserve(3)) return;
+        recView.setUint16(recLength, 0xFFFF, true); recView.setUint8(recLength + 2, INPUT_NOP); recLength += 3;
+    }
+    if (!recReserve(9)) return;
+    recView.setUint16(recLength, delta, true); recView.setUint8(recLength + 2, type); recLength += 3;
+    if (type === INPUT_DOWN || type === INPUT_MOVE || type === INPUT_RESIZE) {
+        recView.setInt16(recLength, x, true); recView.setInt16(recLength + 2, y, true); recLength += 4;
+    }
+    if (type === INPUT_DOWN || type === INPUT_MOVE || type === INPUT_UP) {
+        recView.setUint16(recLength, dt, true); recLength += 2;
+    } else if (type === INPUT_CONFIG) {
+        recJson(config);
+    }
+}
+
+const CHECKSUM_WEAPONS = ['shotgun', 'laser', 'giant_beam']; // 弾を混ぜる武器と順番
+// 試合の状態を32bitにまとめる（火花やダメージ数字など見た目だけのものは入れない）
+function simChecksum() {
+    let h = 0x811C9DC5;
+    const mix = v => { h = Math.imul(h ^ (Math.round(v * 256) | 0), 0x01000193) >>> 0; };
+    mix(simTick); mix(hitStopTimer); mix(black.x); mix(black.y); mix(black.vx); mix(black.vy); mix(black.angle);
+    for (const t of targets) { mix(t.hp); mix(t.x); mix(t.y); }
+    // 読み込んでいない武器は弾0個として混ぜる（武器を分ける前の記録と同じ値になる）
+    for (const name of CHECKSUM_WEAPONS) {
+        const P = weapons[name] ? weapons[name].pool : null;
+        const n = P ? P.count : 0;
+        mix(n);
+        for (let i = 0; i < n; i++) { mix(P.x[i]); mix(P.y[i]); }
+    }
+    return h;
+}
+
+// 今までの記録の末尾に END（今のティックとチェックサム）を付けたコピーを返す
+function exportRecording() {
+    let delta = simTick - recLastTick; const gaps = Math.floor(delta / 0xFFFF);
+    const out = new Uint8Array(recLength + gaps * 3 + 7);
+    out.set(recBytes.subarray(0, recLength));
+    const view = new DataView(out.buffer); let pos = recLength;
+    for (; delta > 0xFFFF; delta -= 0xFFFF, pos += 3) { view.setUint16(pos, 0xFFFF, true); view.setUint8(pos + 2, INPUT_NOP); }
+    view.setUint16(pos, delta, true); view.setUint8(pos + 2, INPUT_END);
+    view.setUint32(pos + 3, simChecksum(), true);
+    return out.subarray(0, pos + 7);
+}
+
+function saveRecording() {
+    gameHost.download(exportRecording(), `hitstop-${simSeed.toString(16)}-${simTick}.hsr`);
+}
+
+// ★連続判定：(x0,y0)→(x1,y1) と動く点が、半径 r の円に最初に触れる割合 s (0〜1) を返す★
+// 触れなければ -1、最初から中にいたら 0。半径 a の弾なら r に a を足して呼ぶ（円どうし = 点と太った円）
+// 終わりの位置だけを見る判定と違って、1ティックに円より長く進んでもすり抜けない
+function sweptCircleHit(x0, y0, x1, y1, cx, cy, r) {
+    const fx = x0 - cx; const fy = y0 - cy;
+    const c = fx * fx + fy * fy - r * r;
+    if (c < 0) return 0;
+    const dx = x1 - x0; const dy = y1 - y0;
+    const b = fx * dx + fy * dy;
+    if (b >= 0) return -1; // 止まっている or 離れていく
+    const a = dx * dx + dy * dy;
+    const disc = b * b - a * c;
+    if (disc < 0) return -1;
+    const s = (-b - Math.sqrt(disc)) / a;
+    return s <= 1 ? s : -1;
+}
+
+// 補間用に、ティックを進める前の位置を覚えておく
+function snapshotPrevState() {
+    black.px = black.x; black.py = black.y; black.pAngle = black.angle;
+    for (const t of targets) { t.px = t.x; t.py = t.y; }
+    for (const P of MOVING_POOLS) {
+        for (let i = 0; i < P.count; i++) { P.px[i] = P.x[i]; P.py[i] = P.y[i]; }
+    }
+    for (let i = 0; i < damagePopups.count; i++) damagePopups.py[i] = damagePopups.y[i];
+}
+
+// ★1ティック分だけシミュレーションを進める（描画はしない）★
+function update() {
+    snapshotPrevState();
+    simTick++;
+    if (!replaying) logClock++;
+    logTarget = null;
+    drainInputs();
+    if (black.cooldownTimer > 0) black.cooldownTimer--;
+    updateTargets();
+
+    frozenTick = hitStopTimer > 0; // このティックは止まっている（補間の前後がそろう）
+    if (hitStopTimer > 0) {
+        hitStopTimer--;
+        const shakePower = isKO ? 30 * (hitStopTimer/KO_HIT_STOP) : weapon.shake;
+        screenShakeX = (simRandom() - 0.5) * shakePower;
+        screenShakeY = (simRandom() - 0.5) * shakePower;
+        // 輪っかが出ている子だけブルブルさせる
+        for (const t of targets) {
+            if (t.ringTimer <= 0) continue;
+            t.x = t.baseX + (simRandom() - 0.5) * shakePower * 2;
+            t.y = t.baseY + (simRandom() - 0.5) * shakePower * 2;
+        }
+        
+        if (hitStopTimer <= 0) {
+            if (isKO) gameHost.showRespawn(true);
+            screenShakeX = 0; screenShakeY = 0;
+        }
+        if (!isKO) {
+             updateProjectiles();
+             checkCollisions(false);
+        }
+        return;
+    }
+
+    weapon.movePlayer();
+    updateProjectiles();
+
+    if (aliveCount > 0) checkCollisions(true);
+
+    updateParticles();
+    updateDamagePopups();
+    for (const w of loadedWeapons) w.updateEffects();
+}
+
+// 弾は持ち替える前に撃ったものも飛び続けるので、読み込んだ武器ぜんぶを進める
+function updateProjectiles() {
+    for (const w of loadedWeapons) w.updateProjectiles();
+}
+
+// 当たり判定（ブロードフェーズ作り直し + 近接 + 飛び道具）。HUD用に時間も測る
+function checkCollisions(melee) {
+    const start = PERF_HUD ? performance.now() : 0;
+    rebuildSpatialHash();
+    if (melee) { hittingWeapon = weapon; weapon.collideMelee(); }
+    checkProjectileCollisions();
+    if (PERF_HUD) perfCollisionMs += perfMeasure('collisions', start);
+}
+
+// ★パフォーマンスHUD（サイドバーでON）：fps・フレーム時間の分位点・フェーズ別の時間・数・GCっぽい引っかかり★
+// 同じ区間を performance.measure にも出すので、DevTools のトレースとゲームのフェーズが並んで見える
+let PERF_HUD = false;
+const PERF_SAMPLES = 240;      // 分位点を取るフレーム数
+const PERF_REPORT_MS = 250;    // HUDの書き換え間隔
+const GC_SPIKE_RATIO = 2.5;    // 中央値のこの倍を超えて、しかも自分の処理では説明できない間隔を「GC疑い」にする
+const perfIntervals = new Float64Array(PERF_SAMPLES); const perfSorted = new Float64Array(PERF_SAMPLES);
+let perfCursor = 0, perfFilled = 0, perfMedian = SIM_DT;
+let perfUpdateMs = 0, perfCollisionMs = 0, perfDrawMs = 0, perfFrames = 0, perfReportStart = 0;
+let perfGcSpikes = 0, perfLastSpike = 0, perfLastHeap = 0;
+function setPerfHud(on) {
+    if (on === PERF_HUD) return;
+    PERF_HUD = on; gameHost.showHud(on);
+    perfUpdateMs = 0; perfCollisionMs = 0; perfDrawMs = 0; perfFrames = 0; perfReportStart = performance.now();
+}
+setPerfHud(gameHost.config.perfHud);
+
+function perfMeasure(name, start) {
+    const end = performance.now();
+    performance.measure('hitstop:' + name, { start, end });
+    return end - start;
+}
+
+function recordPerf(now, interval, workStart, drawStart) {
+    const workEnd = performance.now();
+    performance.measure('hitstop:update', { start: workStart, end: drawStart });
+    performance.measure('hitstop:draw', { start: drawStart, end: workEnd });
+    perfUpdateMs += drawStart - workStart; perfDrawMs += workEnd - drawStart;
+    perfFrames++;
+    if (interval > 0) {
+        perfIntervals[perfCursor] = interval;
+        perfCursor = (perfCursor + 1) % PERF_SAMPLES; perfFilled = Math.min(perfFilled + 1, PERF_SAMPLES);
+        // 長い間隔なのに自分の処理は短い → 外で止まっていた。ヒープが減っていればほぼGC
+        const heap = performance.memory ? performance.memory.usedJSHeapSize : 0;
+        const heapDropped = heap < perfLastHeap;
+        if (interval > perfMedian * GC_SPIKE_RATIO && workEnd - workStart < interval / 2 && (heapDropped || !performance.memory)) {
+            perfGcSpikes++; perfLastSpike = now;
+        }
+        perfLastHeap = heap;
+    }
+    if (now - perfReportStart >= PERF_REPORT_MS) {
+        renderPerfHud(now);
+        performance.clearMarks(); performance.clearMeasures(); // バッファを溜めっぱなしにしない
+    }
+}
+
+// 読み込んだ武器の弾の数（"pellets 12  lasers 3  "）
+function projectileHud() {
+    let text = '';
+    for (const w of loadedWeapons) if (w.pool) text += `${w.poolLabel} ${w.pool.count}  `;
+    return text;
+}
+function percentile(sorted, n, p) { return sorted[Math.min(n - 1, Math.floor(n * p))]; }
+
+function renderPerfHud(now) {
+    const n = perfFilled; const f = Math.max(1, perfFrames);
+    perfSorted.set(perfIntervals); const sorted = perfSorted.subarray(0, n).sort();
+    if (n > 0) perfMedian = percentile(sorted, n, 0.5);
+    const fps = perfFrames * 1000 / Math.max(1, now - perfReportStart);
+    const spikeAgo = perfLastSpike ? ((now - perfLastSpike) / 1000).toFixed(1) + '秒前' : '-';
+    gameHost.setHudText(
+        `FPS ${fps.toFixed(1)}  品質 ${qualityTier}  描画 ${RENDERER}\n` +
+        (n > 0 ? `frame p50 ${perfMedian.toFixed(1)} / p95 ${percentile(sorted, n, 0.95).toFixed(1)} / p99 ${percentile(sorted, n, 0.99).toFixed(1)} ms\n` : '') +
+        `sim ${((perfUpdateMs - perfCollisionMs) / f).toFixed(2)}  hit ${(perfCollisionMs / f).toFixed(2)}  draw ${(perfDrawMs / f).toFixed(2)} ms/frame\n` +
+        `particles ${particles.count}/${PARTICLE_BUDGET}  ${projectileHud()}popups ${damagePopups.count}\n` +
+        `GC疑い ${perfGcSpikes}回 (最後: ${spikeAgo})`);
+    perfUpdateMs = 0; perfCollisionMs = 0; perfDrawMs = 0; perfFrames = 0; perfReportStart = now;
+}
+
+// ★描画ループ：経過時間ぶんだけ固定ティックを回して、端数は補間で描く★
+// 次のフレームは gameHost.requestFrame() に頼む。ふつうは requestAnimationFrame そのもので、
+// ギャラリー（gallery.js）では共通のスケジューラが、見えていて止まっていないアリーナにだけ回す
+function frame(now) {
+    if (replaying) { lastFrameTime = now; gameHost.requestFrame(frame, false); return; } // リプレイ中は描かない
+    if (lastFrameTime === null) lastFrameTime = now;
+    const interval = now - lastFrameTime;
+    simAccumulator += Math.min(interval, MAX_FRAME_DELTA);
+    lastFrameTime = now;
+    const workStart = performance.now();
+    if (PERF_HUD) performance.mark('hitstop:frame');
+
+    let ticks = 0;
+    while (simAccumulator >= SIM_DT && ticks < MAX_CATCH_UP_TICKS) {
+        update();
+        simAccumulator -= SIM_DT; ticks++;
+    }
+    // 追いつけない分は捨てる（処理落ちスパイラル防止）
+    if (simAccumulator >= SIM_DT) simAccumulator = 0;
+
+    const drawStart = performance.now();
+    draw(simAccumulator / SIM_DT);
+    if (PERF_HUD) recordPerf(now, interval, workStart, drawStart);
+    // タブ復帰などの飛んだフレームは品質の判断に入れない
+    if (0 < interval && interval <= MAX_FRAME_DELTA) governQuality(interval, performance.now() - workStart);
+    pollCombatLog(now);
+    flushHitSounds();
+    // ティックが進まなかったフレームでは、前と今の位置がそろっていて止まって見えるので判断しない
+    gameHost.requestFrame(frame, ticks > 0 && isSettled());
+}
+
+// ★止まっているか：残っている入力・ヒットストップ・輪っか・クールダウン・粒・数字・弾・エフェクトが無くて、自機も動いていない★
+// 止まっているあいだは描き直しても同じ絵なので、ギャラリーは入力が来るまでこのアリーナを回さない。
+// 1ティックに REST_MOVE px・REST_TURN rad より動かなければ止まっているとみなす（剣の構えのゆらぎは 0.002rad くらい）
+const REST_MOVE = 0.05; const REST_TURN = 0.005;
+function isSettled() {
+    if (replaying || inputCount > 0 || hitStopTimer > 0 || black.cooldownTimer > 0 || black.isSwinging) return false;
+    if (particles.count > 0 || damagePopups.count > 0) return false;
+    for (const w of loadedWeapons) for (const P of w.pools) if (P.count > 0) return false;
+    for (const t of targets) if (t.ringTimer > 0) return false;
+    return Math.abs(black.x - black.px) < REST_MOVE && Math.abs(black.y - black.py) < REST_MOVE
+        && Math.abs(black.angle - black.pAngle) < REST_TURN;
+}
+
+function checkProjectileCollisions() {
+    if (aliveCount === 0) return;
+    for (const w of loadedWeapons) { hittingWeapon = w; w.collideProjectiles(); }
+}
+
+function draw(a) {
+    const bx = lerp(black.px, black.x, a); const by = lerp(black.py, black.y, a);
+    const bAngle = lerpAngle(black.pAngle, black.angle, a);
+    applyScreenShake();
+    // WebGL が途中で使えなくなったら（GPUのリセットなど）Canvas 2D に戻す
+    if (RENDERER !== 'canvas' && glRenderer.isLost()) { glUnavailable = true; glRenderer = null; RENDERER = 'canvas'; frozenDirty = true; }
+    if (hitStopTimer > 0 && frozenTick) { drawFrozen(a, bx, by, bAngle); return; }
+
+    if (liveLayerUsed) { liveCtx.clearRect(0, 0, displayW, displayH); liveLayerUsed = false; }
+    frozenDirty = true; // 次に止まったら、その時点の絵を撮り直す
+    ctx.clearRect(0, 0, displayW, displayH);
+    fxCtx.clearRect(0, 0, displayW, displayH);
+    drawTargets(ctx, a);
+    drawPlayer(ctx, bx, by, bAngle);
+    if (RENDERER !== 'canvas') {
+        drawGl(a, bx, by);
+    } else {
+        drawProjectiles(ctx, a);
+        drawHitRings(fxCtx, a, bx, by);
+        drawParticles(fxCtx, a);
+    }
+    drawWeaponEffects(fxCtx, a);
+    drawDamagePopups(fxCtx, a);
+}
+
+// 飛んでいる弾（読み込んだ武器ぜんぶ）と、斬撃などのエフェクト
+function drawProjectiles(g, a) {
+    for (const w of loadedWeapons) w.drawProjectiles(g, a);
+}
+function drawWeaponEffects(g, a) {
+    for (const w of loadedWeapons) w.drawEffects(g, a);
+}
+
+// ★ヒットストップ中は、止まった世界を毎フレーム描き直さない★
+// 止まって最初のフレームで、動かないもの（じっとしているサンドバッグ・火花・斬撃・ダメージ数字、撃破の止めなら弾も）を
+// いつもの層に1回だけ描いて、そのまま残す。そのあと毎フレーム描くのは、上の薄い層（liveCanvas）の動くものだけ：
+// ブルブルしているサンドバッグ・自機・まだ飛んでいる弾・輪・止めた後に出た火花と数字。画面揺れはもともと層ごと CSS でずらしている
+// 止めた絵が変わったら（新しく輪が出た・輪が終わった・撃った・リサイズ・持ち替えなど）frozenDirty が立って撮り直す
+// WebGL のときは GL の層をいつもどおり毎フレーム描く（種類ごとに1回の描画なので、止めても軽くならない）
+function drawFrozen(a, bx, by, bAngle) {
+    const moving = !isKO; // 撃破の止めのあいだは弾も止まる
+    if (frozenDirty) {
+        frozenDirty = false;
+        ctx.clearRect(0, 0, displayW, displayH);
+        fxCtx.clearRect(0, 0, displayW, displayH);
+        drawTargets(ctx, a, false);
+        if (RENDERER === 'canvas') {
+            if (!moving) drawProjectiles(ctx, a);
+            drawParticles(fxCtx, a);
+        }
+        drawWeaponEffects(fxCtx, a);
+        drawDamagePopups(fxCtx, a);
+        frozenParticleMark = particles.count; frozenPopupMark = damagePopups.count;
+    }
+
+    liveCtx.clearRect(0, 0, displayW, displayH); liveLayerUsed = true;
+    drawTargets(liveCtx, a, true);
+    drawPlayer(liveCtx, bx, by, bAngle);
+    if (RENDERER !== 'canvas') {
+        drawGl(a, bx, by);
+    } else {
+        if (moving) drawProjectiles(liveCtx, a);
+        drawHitRings(liveCtx, a, bx, by);
+        drawParticles(liveCtx, a, frozenParticleMark);
+    }
+    drawDamagePopups(liveCtx, a, frozenPopupMark);
+}
+
+// ringing: 省略 = 全員、true = 輪が出ている（ヒットストップ中にブルブルする）子だけ、false = それ以外
+function targetShown(t, ringing) {
+    return t.visible && (ringing === undefined || (t.ringTimer > 0) === ringing);
+}
+
+// サンドバッグとHPバー
+function drawTargets(g, a, ringing) {
+    // 本体はまとめて1本のパスで描く
+    g.fillStyle = 'white'; g.strokeStyle = '#ccc'; g.lineWidth = 2;
+    g.beginPath();
+    for (const t of targets) {
+        if (!targetShown(t, ringing)) continue;
+        const tx = lerp(t.px, t.x, a); const ty = lerp(t.py, t.y, a);
+        g.moveTo(tx + t.radius, ty); g.arc(tx, ty, t.radius, 0, Math.PI * 2);
+    }
+    g.fill(); g.stroke();
+    g.font = '12px Arial'; g.textAlign = 'center';
+    for (const t of targets) {
+        if (!targetShown(t, ringing)) continue;
+        const tx = lerp(t.px, t.x, a); const ty = lerp(t.py, t.y, a);
+        const scale = t.radius / TARGET_RADIUS;
+        const barWidth = 80 * scale; const barHeight = Math.max(2, 8 * scale);
+        const barX = tx - barWidth / 2; const barY = ty + t.radius + 15 * scale;
+        g.fillStyle = '#555'; g.fillRect(barX, barY, barWidth, barHeight);
+        if (IS_INFINITE) {
+            g.fillStyle = '#00ffff'; g.fillRect(barX, barY, barWidth, barHeight);
+            if (scale === 1) { g.fillStyle = '#fff'; g.fillText("∞", tx, barY + 9); }
+        } else {
+            const hpPercent = t.hp / MAX_HP;
+            g.fillStyle = hpPercent > 0.5 ? '#00ff00' : (hpPercent > 0.2 ? '#ffff00' : '#ff0000');
+            g.fillRect(barX, barY, barWidth * hpPercent, barHeight);
+        }
+    }
+}
+
+// 自機（鉄球・剣・砲台）
+function drawPlayer(g, bx, by, bAngle) {
+    weapon.drawPlayer(g, bx, by, bAngle);
+}
+
+// ヒットストップの輪（Canvas 2D のとき。ふだんはエフェクト層、止めの間は liveCanvas に描く）
+function drawHitRings(fxCtx, a, bx, by) {
+    const ringColor = weapon.ringColor;
+    for (const t of targets) {
+        if (t.ringTimer <= 0) continue;
+        const tx = lerp(t.px, t.x, a); const ty = lerp(t.py, t.y, a);
+        if (t.ringKO) { fxCtx.strokeStyle = `rgba(255, 50, 50, ${Math.random()})`; fxCtx.lineWidth = 10; }
+        else { fxCtx.strokeStyle = ringColor; fxCtx.lineWidth = 5; }
+        const onBall = !t.ringKO && weapon.ringAtContact;
+        const ringX = onBall ? (bx + tx) / 2 : tx;
+        const ringY = onBall ? (by + ty) / 2 : ty;
+        const expansion = t.ringKO ? (t.ringMax - t.ringTimer) : (30 - t.ringTimer) * 2;
+        const scale = t.radius / TARGET_RADIUS;
+        fxCtx.beginPath(); fxCtx.arc(ringX, ringY, (black.radius + 20 + expansion) * scale, 0, Math.PI * 2); fxCtx.stroke();
+    }
+}
+
+// ★サイドバーの変更は走っているゲームにそのまま差し込む（HP・弾・位置はそのまま）★
+// 試合に効く設定は入力と同じくティックの頭で反映して記録する。品質とHUDは見た目だけなのですぐ変える
+function applyConfigNow(config) {
+    const prevWeapon = WEAPON_TYPE;
+    readWeaponConfig(config);
+    weapon = weapons[WEAPON_TYPE]; // applyConfig() / runReplay() で読み込み済み
+    frozenDirty = true; // HPの上限・無限モード・武器で見た目が変わる
+    if (WEAPON_TYPE !== prevWeapon) {
+        // 持ち替え：振り途中・ドラッグ中・クールダウンだけ捨てる（飛んでいる弾はそのまま）
+        black.isSwinging = false; black.isDragging = false; black.cooldownTimer = 0;
+        black.vx = 0; black.vy = 0; black.angle = FIXED_UP_ANGLE; black.baseAngle = FIXED_UP_ANGLE;
+    }
+    if (!IS_INFINITE) for (const t of targets) t.hp = Math.min(t.hp, MAX_HP);
+    if (config.particleBudget !== PARTICLE_BUDGET) setParticleBudget(config.particleBudget);
+    if (config.sandbagCount !== SANDBAG_COUNT) {
+        setSandbagCount(config.sandbagCount); layoutTargets();
+        gameHost.showRespawn(false);
+    }
+}
+
+let configQueue = Promise.resolve(); // 届いた順に反映する（武器の読み込みを待っても順番は入れ替わらない）
+function applyConfig(config, replay, replayId) {
+    readQualityConfig(config);
+    if (!QUALITY_AUTO) setQualityTier(Math.min(config.qualityTier, QUALITY_TIERS.length - 1));
+    setPerfHud(config.perfHud);
+    setRenderer(config.renderer);
+    if (replay && replayId !== lastReplayId) { lastReplayId = replayId; runReplay(replay); }
+    if (JSON.stringify(config) === JSON.stringify(liveConfig)) return; // KO の報告などで返ってきただけ
+    liveConfig = config;
+    // 持ち替えは武器のファイルが届いてから、入力と同じくティックの頭で反映する
+    configQueue = configQueue.then(() => requireWeapon(config.weaponType)).then(() => {
+        if (!replaying) { inputConfigs.push(config); pushInput(INPUT_CONFIG, 0, 0); }
+        gameHost.markDirty(); // 武器を待っているあいだに止まったアリーナでも、この設定を反映させる
+    });
+}
+
+// 試合を最初の状態に戻す（起動時・リプレイの頭・リプレイのあと）
+function resetSimulation(config, w, h, seed) {
+    readWeaponConfig(config);
+    weapon = weapons[WEAPON_TYPE];
+    if (config.particleBudget !== PARTICLE_BUDGET) setParticleBudget(config.particleBudget);
+    for (const P of [particles, damagePopups]) P.count = 0;
+    for (const w of loadedWeapons) for (const P of w.pools) P.count = 0;
+    setSandbagCount(config.sandbagCount);
+    setViewSize(w, h);
+    seedRandom(seed);
+    simTick = 0; simAccumulator = 0; hitStopTimer = 0; screenShakeX = 0; screenShakeY = 0;
+    inputCount = 0; inputConfigs.length = 0;
+    black.isDragging = false; black.isSwinging = false; black.swingProgress = 0; black.hitFlags.fill(false);
+    mouseX = 0; mouseY = 0; trackCount = 0; pointerClock = 0;
+    initPositions();
+    gameHost.showRespawn(false);
+}
+
+function startLiveGame() {
+    resetSimulation(liveConfig, displayW, displayH, newSeed());
+    startRecording();
+}
+
+// ★リプレイ：記録を描画なしで、実時間より速く流す★
+// 入力を記録どおりのティックに積んで update() だけを回し、かかった時間と最後のチェックサムを返す
+const REPLAY_SLICE_MS = 30; // これだけ回したら一度ブラウザに返す（固まらないように）
+let replaying = false; let lastReplayId = null;
+
+function parseRecording(bytes) {
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    if (bytes.byteLength >= 16 && view.getUint32(0, true) === REPLAY_MAGIC_V1) throw new Error('古い形式の記録です（ポインタの時刻が入っていないので再生できません）');
+    if (bytes.byteLength < 16 || view.getUint32(0, true) !== REPLAY_MAGIC) throw new Error('リプレイファイルではありません');
+    let pos = 12;
+    const readJson = () => {
+        const len = view.getUint32(pos, true);
+        const config = JSON.parse(textDecoder.decode(bytes.subarray(pos + 4, pos + 4 + len)));
+        pos += 4 + len; return config;
+    };
+    const header = { seed: view.getUint32(4, true), w: view.getUint16(8, true), h: view.getUint16(10, true), config: readJson() };
+    const events = []; let tick = 0; let end = null;
+    while (pos + 3 <= bytes.byteLength) {
+        tick += view.getUint16(pos, true); const type = view.getUint8(pos + 2); pos += 3;
+        if (type === INPUT_NOP) continue;
+        if (type === INPUT_END) { end = { tick, checksum: view.getUint32(pos, true) }; break; }
+        let x = 0, y = 0, dt = 0, config = null;
+        if (type === INPUT_DOWN || type === INPUT_MOVE || type === INPUT_RESIZE) { x = view.getInt16(pos, true); y = view.getInt16(pos + 2, true); pos += 4; }
+        if (type === INPUT_DOWN || type === INPUT_MOVE || type === INPUT_UP) { dt = view.getUint16(pos, true); pos += 2; }
+        else if (type === INPUT_CONFIG) config = readJson();
+        events.push({ tick, type, x, y, dt, config });
+    }
+    return { header, events, endTick: end ? end.tick : tick, checksum: end ? end.checksum : null };
+}
+
+async function runReplay(bytes) {
+    let rec;
+    try { rec = parseRecording(bytes); }
+    catch (err) { componentValue.replay = { error: String(err.message || err) }; gameHost.setComponentValue(componentValue); return; }
+
+    replaying = true; recording = false;
+    // 記録の中で使った武器を先に読み込んでおく（途中で待つと速さを測れない）
+    await Promise.all([rec.header.config, ...rec.events.map(e => e.config).filter(Boolean)].map(c => requireWeapon(c.weaponType)));
+    resetSimulation(rec.header.config, rec.header.w, rec.header.h, rec.header.seed);
+    let next = 0; let busyMs = 0;
+    while (simTick < rec.endTick) {
+        const sliceStart = performance.now();
+        while (simTick < rec.endTick && performance.now() - sliceStart < REPLAY_SLICE_MS) {
+            for (; next < rec.events.length && rec.events[next].tick === simTick + 1; next++) {
+                const e = rec.events[next];
+                if (e.config) inputConfigs.push(e.config);
+                pushInput(e.type, e.x, e.y, e.dt);
+            }
+            update();
+        }
+        busyMs += performance.now() - sliceStart;
+        await new Promise(resolve => setTimeout(resolve, 0));
+    }
+    const checksum = simChecksum();
+    componentValue.replay = {
+        ticks: simTick, ms: busyMs, speedup: simTick * SIM_DT / Math.max(busyMs, 1e-3),
+        checksum, expected: rec.checksum, match: rec.checksum === null ? null : rec.checksum === checksum,
+    };
+    await requireWeapon(liveConfig.weaponType);
+    replaying = false;
+    startLiveGame();
+    gameHost.setComponentValue(componentValue);
+}
+
+// ★起動：最初の画面サイズで試合を始めてから、host.js に入口を渡す（ここから先の入力・設定はそこから届く）★
+// 最初の武器のファイルは game.js の後に読み込まれるので、届いてから始める
+const startSize = gameHost.size;
+resizeCanvas(startSize.w, startSize.h, startSize.dpr);
+setRenderer(gameHost.config.renderer);
+requireWeapon(WEAPON_TYPE).then(() => {
+    startLiveGame();
+    if (gameHost.replay) applyConfig(liveConfig, gameHost.replay.bytes, gameHost.replay.id);
+    gameHost.start({
+        down: (x, y, time) => queuePointer(INPUT_DOWN, x, y, time),
+        // coalesced events をまとめて [x, y, 時刻, x, y, 時刻, ...] で受け取る
+        move: samples => { for (let i = 0; i < samples.length; i += 3) queuePointer(INPUT_MOVE, samples[i], samples[i + 1], samples[i + 2]); },
+        up: time => queuePointer(INPUT_UP, 0, 0, time),
+        respawn: () => queueInput(INPUT_RESPAWN, 0, 0),
+        resize: resizeCanvas,
+        applyConfig,
+        saveRecording,
+        // ギャラリーで回すのを止める・また回すとき（止めるときは溜まっている戦闘ログを送っておく）
+        pause: () => { if (logCount > 0) flushCombatLog(); },
+        resume: () => { lastFrameTime = null; },
+    });
+    gameHost.requestFrame(frame, false);
+});
@@ -0,0 +1,171 @@
+// ★WebGL の描画エンジン：光りモノを「インスタンス化した四角形」でまとめて描く★
+// 1個 = 四角形1枚。中身はフラグメントシェーダーが形までの距離（SDF）から塗る。形は2種類だけ：
+//   カプセル … 線分を太らせた形（長さ0なら円）。火花・散弾・軌跡・レーザー・ビーム
+//   輪       … 半径 r・太さ w のリング。ヒットストップの輪
+// 形のまわりにはぼかしの代わりの光（距離で薄くなる色）を付けて、加算合成で重ねる（重なるほど明るい）。
+// 種類ごとにインスタンス用の配列とバッファ（GlBatch）を持ち、1種類 = 描画命令1回。
+//
+// WebGL2 が無ければ WebGL1 + ANGLE_instanced_arrays、それも無ければ null を返す（game.js は Canvas 2D で描く）。
+// 使う拡張は instancing だけなので、ソフトウェアのラスタライザ（SwiftShader など）でもそのまま動く。
+// game.js と同じく document には触らない（ワーカーの OffscreenCanvas でも動く）。
+
+const GL_SHAPE_CAPSULE = 0, GL_SHAPE_RING = 1, GL_SHAPE_BEAM = 2; // BEAM = 縦に濃淡のあるカプセル
+// 1インスタンスの中身（float 16個）：
+//   place: x, y, cos, sin / shape: 半分の長さ(輪は太さの半分), 半径, 光の幅, 形 / core: r, g, b, a / glow: r, g, b, a
+const GL_INSTANCE_FLOATS = 16;
+const GL_ATTRIBUTES = [['a_place', 4], ['a_shape', 4], ['a_core', 4], ['a_glow', 4]];
+
+const GL_VERTEX_SHADER = `
+attribute vec2 a_corner;
+attribute vec4 a_place;
+attribute vec4 a_shape;
+attribute vec4 a_core;
+attribute vec4 a_glow;
+uniform vec2 u_view;
+varying vec2 v_local;
+varying vec4 v_shape;
+varying vec4 v_core;
+varying vec4 v_glow;
+void main() {
+    // 形＋光＋ふち1pxがちょうど入る大きさの四角形にする
+    float reach = a_shape.y + a_shape.z + 1.0;
+    vec2 extent = (a_shape.w > 0.5 && a_shape.w < 1.5) ? vec2(reach + a_shape.x) : vec2(a_shape.x + reach, reach);
+    vec2 local = a_corner * extent;
+    vec2 p = a_place.xy + vec2(local.x * a_place.z - local.y * a_place.w, local.x * a_place.w + local.y * a_place.z);
+    gl_Position = vec4(p.x / u_view.x * 2.0 - 1.0, 1.0 - p.y / u_view.y * 2.0, 0.0, 1.0);
+    v_local = local; v_shape = a_shape; v_core = a_core; v_glow = a_glow;
+}`;
+
+const GL_FRAGMENT_SHADER = `
+#ifdef GL_FRAGMENT_PRECISION_HIGH
+precision highp float;
+#else
+precision mediump float;
+#endif
+varying vec2 v_local;
+varying vec4 v_shape;
+varying vec4 v_core;
+varying vec4 v_glow;
+void main() {
+    // d: 形のふちまでの距離（中はマイナス）
+    float d;
+    if (v_shape.w > 0.5 && v_shape.w < 1.5) d = abs(length(v_local) - v_shape.y) - v_shape.x;
+    else d = length(vec2(max(abs(v_local.x) - v_shape.x, 0.0), v_local.y)) - v_shape.y;
+    float core = clamp(0.5 - d, 0.0, 1.0); // ふちは1pxでなめらかに
+    float coreAlpha = v_core.a;
+    if (v_shape.w > 1.5) coreAlpha *= mix(1.0, 0.55, clamp(abs(v_local.y) / v_shape.y, 0.0, 1.0));
+    float glow = 0.0;
+    if (v_shape.z > 0.0) { glow = clamp(1.0 - max(d, 0.0) / v_shape.z, 0.0, 1.0); glow *= glow; }
+    float a = coreAlpha * core; float g = v_glow.a * glow * (1.0 - core);
+    if (a + g <= 0.0) discard;
+    gl_FragColor = vec4(v_core.rgb * a + v_glow.rgb * g, a + g); // 乗算済みアルファ
+}`;
+
+// 種類ごとのインスタンス配列。毎フレーム clear() して push() し直す（足りなくなったら倍に広げる）
+class GlBatch {
+    constructor(gl, capacity) {
+        this.data = new Float32Array(capacity * GL_INSTANCE_FLOATS); this.count = 0;
+        this.buffer = gl.createBuffer(); this.bufferFloats = 0; // GPU 側のバッファの大きさ
+    }
+    clear() { this.count = 0; }
+    // core / glow は [r, g, b]（0〜1）
+    push(x, y, c, s, halfLength, radius, glowWidth, shape, core, coreAlpha, glow, glowAlpha) {
+        let o = this.count * GL_INSTANCE_FLOATS;
+        if (o === this.data.length) {
+            const grown = new Float32Array(this.data.length * 2); grown.set(this.data); this.data = grown;
+        }
+        const d = this.data;
+        d[o++] = x; d[o++] = y; d[o++] = c; d[o++] = s;
+        d[o++] = halfLength; d[o++] = radius; d[o++] = glowWidth; d[o++] = shape;
+        d[o++] = core[0]; d[o++] = core[1]; d[o++] = core[2]; d[o++] = coreAlpha;
+        d[o++] = glow[0]; d[o++] = glow[1]; d[o++] = glow[2]; d[o++] = glowAlpha;
+        this.count++;
+    }
+}
+
+function compileGlProgram(gl) {
+    const shader = (type, source) => {
+        const s = gl.createShader(type);
+        gl.shaderSource(s, source); gl.compileShader(s);
+        if (!gl.getShaderParameter(s, gl.COMPILE_STATUS)) throw new Error(gl.getShaderInfoLog(s) || 'shader');
+        return s;
+    };
+    const program = gl.createProgram();
+    gl.attachShader(program, shader(gl.VERTEX_SHADER, GL_VERTEX_SHADER));
+    gl.attachShader(program, shader(gl.FRAGMENT_SHADER, GL_FRAGMENT_SHADER));
+    gl.bindAttribLocation(program, 0, 'a_corner'); // 0番は毎頂点の属性にしておく（インスタンスだけの0番は避ける）
+    gl.linkProgram(program);
+    if (!gl.getProgramParameter(program, gl.LINK_STATUS)) throw new Error(gl.getProgramInfoLog(program) || 'link');
+    return program;
+}
+
+// canvas に WebGL の描画エンジンを作る。使えなければ null
+function createGlRenderer(canvas) {
+    const options = { alpha: true, premultipliedAlpha: true, antialias: false, depth: false, stencil: false };
+    let gl = canvas.getContext('webgl2', options); let api = 'webgl2';
+    let drawInstanced, setDivisor, upload;
+    if (gl) {
+        drawInstanced = (count, instances) => gl.drawArraysInstanced(gl.TRIANGLE_STRIP, 0, count, instances);
+        setDivisor = (location, divisor) => gl.vertexAttribDivisor(location, divisor);
+        upload = (data, length) => gl.bufferSubData(gl.ARRAY_BUFFER, 0, data, 0, length); // 使ったぶんだけ、view を作らずに送る
+    } else {
+        gl = canvas.getContext('webgl', options); api = 'webgl';
+        const ext = gl && gl.getExtension('ANGLE_instanced_arrays');
+        if (!ext) return null;
+        drawInstanced = (count, instances) => ext.drawArraysInstancedANGLE(gl.TRIANGLE_STRIP, 0, count, instances);
+        setDivisor = (location, divisor) => ext.vertexAttribDivisorANGLE(location, divisor);
+        upload = (data, length) => gl.bufferSubData(gl.ARRAY_BUFFER, 0, data.subarray(0, length));
+    }
+
+    let program;
+    try { program = compileGlProgram(gl); }
+    catch (err) { return null; }
+    const viewLocation = gl.getUniformLocation(program, 'u_view');
+    const attributes = GL_ATTRIBUTES.map(([name, size]) => ({ location: gl.getAttribLocation(program, name), size }));
+
+    const corners = gl.createBuffer();
+    gl.bindBuffer(gl.ARRAY_BUFFER, corners);
+    gl.bufferData(gl.ARRAY_BUFFER, new Float32Array([-1, -1, 1, -1, -1, 1, 1, 1]), gl.STATIC_DRAW);
+
+    function setup(viewW, viewH) {
+        gl.viewport(0, 0, canvas.width, canvas.height);
+        gl.useProgram(program);
+        gl.uniform2f(viewLocation, viewW, viewH);
+        gl.bindBuffer(gl.ARRAY_BUFFER, corners);
+        gl.enableVertexAttribArray(0); gl.vertexAttribPointer(0, 2, gl.FLOAT, false, 0, 0); setDivisor(0, 0);
+        for (const a of attributes) { gl.enableVertexAttribArray(a.location); setDivisor(a.location, 1); }
+        gl.enable(gl.BLEND); gl.blendFunc(gl.ONE, gl.ONE); // 加算
+    }
+
+    return {
+        api,
+        batch: (capacity = 64) => new GlBatch(gl, capacity),
+        isLost: () => gl.isContextLost(),
+        // フレームの頭：消して、論理サイズ（CSS px）で座標を受け取れるようにする
+        begin(viewW, viewH) {
+            setup(viewW, viewH);
+            gl.clearColor(0, 0, 0, 0); gl.clear(gl.COLOR_BUFFER_BIT);
+        },
+        // 1種類ぶんを描く（空なら何もしない）
+        draw(batch) {
+            if (batch.count === 0) return;
+            gl.bindBuffer(gl.ARRAY_BUFFER, batch.buffer);
+            // 配列が広がったときだけ GPU 側も取り直す。ふだんは中身を書き換えるだけ
+            if (batch.bufferFloats !== batch.data.length) {
+                gl.bufferData(gl.ARRAY_BUFFER, batch.data.byteLength, gl.DYNAMIC_DRAW); batch.bufferFloats = batch.data.length;
+            }
+            upload(batch.data, batch.count * GL_INSTANCE_FLOATS);
+            let offset = 0;
+            for (const a of attributes) {
+                gl.vertexAttribPointer(a.location, a.size, gl.FLOAT, false, GL_INSTANCE_FLOATS * 4, offset);
+                offset += a.size * 4;
+            }
+            drawInstanced(4, batch.count);
+        },
+        // Canvas 2D に戻すときに、最後の絵を残さない
+        clear() {
+            gl.viewport(0, 0, canvas.width, canvas.height);
+            gl.clearColor(0, 0, 0, 0); gl.clear(gl.COLOR_BUFFER_BIT);
+        },
+    };
+}
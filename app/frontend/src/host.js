@@ -0,0 +1,262 @@
+// ★ゲーム本体とページのあいだ（キャンバス・入力・ボタン・HUD・Streamlit）をつなぐ★
+// game.js は document を触らず、ここで作る gameHost だけを使う。
+// OffscreenCanvas が使えれば game.js はワーカーで動き、ページ側は入力とリサイズを送るだけになる
+// （Streamlit のページが重くても、シミュレーションと描画は止まらない）。
+// 使えないとき・設定でOFFのときは、今までどおり同じスレッドで game.js を読み込む。
+//
+// このファイルはページとワーカーの両方で読み込まれる（ワーカーでは gl_renderer.js・game.js の前に importScripts）。
+// 武器（weapon_*.js）は選んでいるものだけを game.js の後に読み込み、持ち替えたら loadWeapon() で足す。
+// ギャラリー（gallery.js）の1枠として開かれたときは、フレームを自分では回さず、ギャラリーの共通スケジューラに回してもらう。
+//   ページ → ゲーム: down / move / up / respawn / resize / applyConfig / saveRecording（ギャラリーでは frame / pause / resume も）
+//   ゲーム → ページ: setShake / showRespawn / showHud / setHudText / setComponentValue / download / playHits（ギャラリーでは frameDone / markDirty も）
+// 効果音（sfx.js）はページ側で鳴らす。ギャラリーの枠では、ギャラリーのページの1つの AudioContext を全部の枠で使う
+
+// 画面揺れで端が見えないように、背景だけ少し大きめに描いておく
+const SHAKE_MARGIN = 100;
+
+// ギャラリーの枠では、ゲームが次のフレームを頼むと frameDone(止まっているか) を知らせるだけにして、
+// スケジューラの番が来たら run() でそのフレームを進める（時刻はゲームと同じ場所の時計で渡す）
+function scheduledFrames(notify) {
+    let next = null;
+    return {
+        request(callback, settled) { next = callback; notify('frameDone', settled); },
+        run() { const callback = next; next = null; if (callback) callback(performance.now()); },
+    };
+}
+
+// ワーカーの中の gameHost：キャンバスは最初のメッセージで受け取り、ページへの用事は postMessage で返す
+function workerHost(init) {
+    const post = (name, ...args) => self.postMessage({ name, args });
+    const loadedWeapons = new Set([init.config.weaponType]); // 最初の武器は game.js と一緒に読み込み済み
+    const frames = init.scheduled ? scheduledFrames(post) : null;
+    // requestAnimationFrame が無いワーカー（古いブラウザ）はタイマーで回す
+    if (typeof self.requestAnimationFrame !== 'function') {
+        self.requestAnimationFrame = callback => setTimeout(() => callback(performance.now()), 1000 / 60);
+    }
+    return {
+        inWorker: true,
+        canvases: init.canvases,
+        config: init.config,
+        replay: init.replay,
+        size: init.size,
+        createCanvas: (w, h) => new OffscreenCanvas(w, h),
+        loadWeapon(name) {
+            if (loadedWeapons.has(name)) return;
+            loadedWeapons.add(name);
+            importScripts(init.weaponScripts[name]);
+        },
+        requestFrame(callback, settled) {
+            if (frames) frames.request(callback, settled); else self.requestAnimationFrame(callback);
+        },
+        markDirty() { if (frames) post('markDirty'); },
+        start(game) {
+            const calls = frames ? Object.assign({ frame: frames.run }, game) : game;
+            self.onmessage = e => calls[e.data.name](...e.data.args);
+            post('ready');
+        },
+        setShake: (x, y) => post('setShake', x, y),
+        showRespawn: on => post('showRespawn', on),
+        showHud: on => post('showHud', on),
+        setHudText: text => post('setHudText', text),
+        setComponentValue: value => post('setComponentValue', value),
+        playHits: (tick, hits) => self.postMessage({ name: 'playHits', args: [tick, hits] }, [hits.buffer]),
+        download: (bytes, name) => self.postMessage({ name: 'download', args: [bytes, name] }, [bytes.buffer]),
+    };
+}
+
+// ページ側：DOM を持って、ゲーム（同じスレッド or ワーカー）に入力とサイズを渡す
+function startPage(config, replay) {
+    const stage = document.getElementById('stage');
+    const world = document.getElementById('world');
+    const respawnBtn = document.getElementById('respawnBtn');
+    const saveReplayBtn = document.getElementById('saveReplayBtn');
+    const perfHud = document.getElementById('perfHud');
+    let canvases = {
+        bg: document.getElementById('bgCanvas'), game: document.getElementById('gameCanvas'),
+        live: document.getElementById('liveCanvas'), gl: document.getElementById('glCanvas'),
+        fx: document.getElementById('fxCanvas'),
+    };
+    const gameFiles = [GAME_SCRIPTS.gl, GAME_SCRIPTS.game]; // この順に読み込む（game.js が WebGL の描画エンジンを使う）
+    const absolute = src => new URL(src, location.href).href;
+    let workerReady = false;
+    let stageRect = null; // 入力の座標の基準にする枠の位置（下の Pointer Events を参照）
+    let arena = null; // ギャラリーの1枠として動くときの窓口（いちばん下で登録する）
+    let sfx = null; let playHits = null; // 効果音（sfx.js）と、このゲームのぶんの入口（いちばん下で決める）
+
+    // ゲームからの用事（どちらのモードでも同じものを使う）
+    const page = {
+        ready() { workerReady = true; },
+        setShake(x, y) { world.style.transform = (x === 0 && y === 0) ? '' : `translate(${x}px, ${y}px)`; },
+        showRespawn(on) { respawnBtn.style.display = on ? 'block' : 'none'; },
+        showHud(on) { perfHud.style.display = on ? 'block' : 'none'; },
+        setHudText(text) { perfHud.textContent = text; },
+        setComponentValue(value) { if (arena) arena.setComponentValue(value); else Streamlit.setComponentValue(value); },
+        frameDone(settled) { arena.frameDone(settled); },
+        markDirty() { if (arena) arena.poke(); },
+        playHits(tick, hits) { playHits(tick, hits); },
+        download(bytes, name) {
+            const url = URL.createObjectURL(new Blob([bytes], { type: 'application/octet-stream' }));
+            const a = document.createElement('a');
+            a.href = url; a.download = name; a.click();
+            setTimeout(() => URL.revokeObjectURL(url), 1000);
+        },
+    };
+
+    // ゲームへの呼び出し。起動するまでに来たものは溜めておいて、つながったら順に渡す
+    let pending = [];
+    let call = (...args) => pending.push(args);
+    function connect(to) {
+        call = to;
+        for (const args of pending) to(...args);
+        pending = [];
+    }
+    // 入力・サイズ・設定はこちらから渡す（ギャラリーでは、止まっていたアリーナがこれで動き出す）
+    function send(...args) {
+        call(...args);
+        if (arena) arena.poke();
+    }
+
+    // 見た目の大きさはここで決める。内部解像度はゲーム側が品質に合わせて決める
+    function layout() {
+        const w = window.innerWidth; const h = window.innerHeight;
+        stage.style.width = w + 'px'; stage.style.height = h + 'px';
+        for (const c of [canvases.game, canvases.live, canvases.gl, canvases.fx]) { c.style.width = w + 'px'; c.style.height = h + 'px'; }
+        const bg = canvases.bg;
+        bg.style.left = -SHAKE_MARGIN + 'px'; bg.style.top = -SHAKE_MARGIN + 'px';
+        bg.style.width = w + SHAKE_MARGIN * 2 + 'px'; bg.style.height = h + SHAKE_MARGIN * 2 + 'px';
+        stageRect = null;
+        return { w, h, dpr: window.devicePixelRatio || 1 };
+    }
+    window.addEventListener('resize', () => { const s = layout(); send('resize', s.w, s.h, s.dpr); });
+
+    // ★入力は Pointer Events にまとめる（マウスもタッチもペンも同じ道）★
+    // 枠の位置は覚えておいて、大きさやスクロールが変わったときだけ測り直す
+    // （イベントごとに getBoundingClientRect すると、そのたびにレイアウトを強制することがある）
+    window.addEventListener('scroll', () => { stageRect = null; }, { capture: true, passive: true });
+    if (typeof ResizeObserver === 'function') new ResizeObserver(() => { stageRect = null; }).observe(stage);
+
+    // 座標は整数pxにそろえて渡す（記録と同じ値で動かすため）。揺れてるレイヤーではなく動かない枠を基準にする
+    function pointerX(p) { return Math.round(p.clientX - stageRect.left); }
+    function pointerY(p) { return Math.round(p.clientY - stageRect.top); }
+    let activePointer = null; // 押しているあいだは最初の1本の指（ポインタ）だけを追う
+    function onPointerDown(e) {
+        if (activePointer !== null || !e.isPrimary) return;
+        activePointer = e.pointerId;
+        sfx.unlock(); // 音はユーザーの操作の中でしか鳴らし始められない
+        e.currentTarget.setPointerCapture(e.pointerId); // 枠の外で離しても up が届くように
+        if (!stageRect) stageRect = stage.getBoundingClientRect();
+        send('down', pointerX(e), pointerY(e), e.timeStamp);
+    }
+    function onPointerMove(e) {
+        if (activePointer !== null ? e.pointerId !== activePointer : !e.isPrimary) return;
+        if (!stageRect) stageRect = stage.getBoundingClientRect();
+        // 1フレームのあいだに溜まったサンプルを全部、それぞれの時刻つきで送る（速く振ったときの軌跡が残る）
+        const events = typeof e.getCoalescedEvents === 'function' ? e.getCoalescedEvents() : [];
+        const samples = [];
+        for (const p of events.length ? events : [e]) samples.push(pointerX(p), pointerY(p), p.timeStamp);
+        send('move', samples);
+    }
+    function onPointerUp(e) {
+        if (e.pointerId !== activePointer) return;
+        activePointer = null;
+        send('up', e.timeStamp);
+    }
+    function listen(target) {
+        target.addEventListener('pointerdown', onPointerDown);
+        target.addEventListener('pointermove', onPointerMove);
+        target.addEventListener('pointerup', onPointerUp);
+        target.addEventListener('pointercancel', onPointerUp);
+    }
+    listen(canvases.game);
+    respawnBtn.addEventListener('click', () => send('respawn'));
+    saveReplayBtn.addEventListener('click', () => send('saveRecording'));
+
+    // 同じスレッドで動かす：game.js たちをふつうに読み込んで、gameHost から直接呼び合う
+    function startInThread() {
+        const loadedWeapons = new Set([config.weaponType]);
+        const frames = arena ? scheduledFrames((name, ...args) => page[name](...args)) : null;
+        gameHost = Object.assign({
+            inWorker: false, canvases, config, replay,
+            get size() { return layout(); },
+            createCanvas(w, h) { const c = document.createElement('canvas'); c.width = w; c.height = h; return c; },
+            loadWeapon(name) {
+                if (loadedWeapons.has(name)) return;
+                loadedWeapons.add(name);
+                addScript(GAME_SCRIPTS.weapons[name]);
+            },
+            requestFrame(callback, settled) {
+                if (frames) frames.request(callback, settled); else requestAnimationFrame(callback);
+            },
+            start(game) {
+                const calls = frames ? Object.assign({ frame: frames.run }, game) : game;
+                connect((name, ...args) => calls[name](...args));
+            },
+        }, page);
+        for (const src of [...gameFiles, GAME_SCRIPTS.weapons[config.weaponType]]) addScript(src);
+    }
+    function addScript(src) {
+        const script = document.createElement('script');
+        script.src = src; script.async = false; // 後から足したスクリプトでも順番どおりに実行させる
+        document.body.appendChild(script);
+    }
+
+    // 起動に失敗したら、描画先を新しいキャンバスに取り替えて同じスレッドでやり直す
+    // （一度 OffscreenCanvas に渡したキャンバスにはもう getContext できない）
+    function fallBack(worker) {
+        worker.terminate();
+        for (const key in canvases) {
+            const fresh = canvases[key].cloneNode(false);
+            canvases[key].replaceWith(fresh); canvases[key] = fresh;
+        }
+        listen(canvases.game);
+        activePointer = null;
+        call = (...args) => pending.push(args);
+        startInThread();
+    }
+
+    function startWorker() {
+        // ワーカーは小さな起動用スクリプトから始めて、最初のメッセージで host.js と game.js たちを読み込ませる
+        // （game.js は起動した時点で設定とキャンバスが要るので、先にそれを渡しておく）
+        const boot = 'self.onmessage = e => { self.onmessage = null; self.gameInit = e.data; importScripts(...e.data.scripts); };';
+        let worker;
+        try { worker = new Worker(URL.createObjectURL(new Blob([boot], { type: 'text/javascript' }))); }
+        catch (err) { return false; }
+        const offscreen = {};
+        for (const key in canvases) offscreen[key] = canvases[key].transferControlToOffscreen();
+        const scripts = [GAME_SCRIPTS.host, ...gameFiles, GAME_SCRIPTS.weapons[config.weaponType]].map(absolute);
+        const weaponScripts = {};
+        for (const name in GAME_SCRIPTS.weapons) weaponScripts[name] = absolute(GAME_SCRIPTS.weapons[name]);
+        worker.onmessage = e => page[e.data.name](...e.data.args);
+        worker.onerror = e => { if (!workerReady) { e.preventDefault(); fallBack(worker); } };
+        worker.postMessage({ scripts, weaponScripts, canvases: offscreen, config, replay, size: layout(), scheduled: arena !== null },
+                           Object.values(offscreen));
+        connect((name, ...args) => worker.postMessage({ name, args }));
+        return true;
+    }
+
+    const canUseWorker = config.useWorker !== false && typeof Worker === 'function'
+        && typeof canvases.game.transferControlToOffscreen === 'function';
+    // iframe の大きさが落ち着いてから始める
+    setTimeout(() => { if (!canUseWorker || !startWorker()) startInThread(); }, 100);
+
+    // index.html から届く設定の差し替え先。やり直しに備えて最新のものを覚えておく
+    window.applyConfig = (newConfig, newReplay, replayId) => {
+        config = newConfig; replay = newReplay ? { bytes: newReplay, id: replayId } : null;
+        sfx.setVolume(newConfig.sfxVolume / 100);
+        send('applyConfig', newConfig, newReplay, replayId);
+    };
+
+    // ギャラリーの1枠（index.html?arena=番号）なら、ギャラリーに自分を登録する（フレームはそこから回ってくる）
+    // 効果音はそれより先に用意しておく（登録したその場で設定が届くことがある）
+    sfx = gameSfx || pageSfx(config.sfxVolume / 100);
+    playHits = sfx.track();
+    if (gameArena) arena = gameArena({
+        frame: () => call('frame'), pause: () => call('pause'), resume: () => call('resume'),
+        applyConfig: newConfig => window.applyConfig(newConfig, null, null),
+    });
+}
+
+// ワーカーでは最初のメッセージから、ページでは index.html が受け取った最初の設定から始める
+let gameHost = null;
+if (typeof document === 'undefined') gameHost = workerHost(self.gameInit);
+else startPage(gameConfig, gameReplay);
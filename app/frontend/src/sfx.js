@@ -0,0 +1,153 @@
+// ★効果音：当たった瞬間の音を WebAudio で、ヒットストップと同じティックに合わせて鳴らす★
+// ・音は起動時に1回だけ合成して AudioBuffer にしておく（当たるたびにデコードしたり <audio> を作ったりしない）
+// ・同時に鳴らすのは SFX_VOICES 個まで。GainNode は使い回し、空きが無ければ一番古い音を止めてその口を使う
+//   （同じティックの同じ音は1つにまとめて、少し大きくするだけ。大勢を一振りで斬っても口を食い尽くさない）
+// ・鳴らす時刻はフレームの時刻ではなく、当たったティック（game.js の simTick）から決める。
+//   ティック → 音の時計の対応は保ったまま使い回すので、フレームの間隔がばらついても当たりの間隔どおりに鳴る
+// ・高さと大きさはヒットストップの長さで決める（長く止まる重い当たりほど低く大きく）。撃破は専用の音
+// ・AudioContext は外から渡す。OfflineAudioContext に描き出せばブラウザの画面なしで確かめられる（SfxEngine.renderOffline）
+// ゲームがワーカーで動いていても、音はページ側で鳴らす（ワーカーには AudioContext が無い）。
+// 当たりは [ティック, 音, ヒットストップのフレーム数] の繰り返しで届く（音は WEAPON_ORDER の番号、撃破は SFX_KO）
+
+const SFX_KO = 5;
+const SFX_TICK_HZ = 60;      // game.js の SIM_HZ と同じ
+const SFX_VOICES = 12;
+const SFX_LEAD = 1 / 60;     // フレームの最後のティックの音は、今から1ティック後に鳴らす（それより前のティックの音は今すぐ）
+const SFX_RESYNC = 0.05;     // ティックと音の時計の対応がこれ(秒)よりずれたら合わせ直す（止まっていた・タブが隠れていた）
+const SFX_ATTACK = 0.002;    // 鳴り始めのプチッを消す立ち上がり(秒)
+const SFX_RELEASE = 0.01;    // 鳴り終わりのプチッを消す立ち下がり(秒)
+
+// 音色：正弦波を from → to Hz に滑らせて、雑音を混ぜて、decay 秒の時定数で減衰させる（順番は WEAPON_ORDER と同じ、最後が撃破）
+const SFX_SOUNDS = [
+    { seconds: 0.30, from: 110,  to: 40,  tone: 0.9, noise: 0.3, decay: 0.08 },  // 鉄球：重い「ドン」
+    { seconds: 0.22, from: 2400, to: 900, tone: 0.3, noise: 0.8, decay: 0.05 },  // 聖剣：「シャキン」
+    { seconds: 0.08, from: 600,  to: 200, tone: 0.2, noise: 1.0, decay: 0.015 }, // 散弾：乾いた「パチッ」
+    { seconds: 0.15, from: 1600, to: 300, tone: 1.0, noise: 0.1, decay: 0.04 },  // レーザー：「ピュン」
+    { seconds: 0.35, from: 180,  to: 90,  tone: 0.7, noise: 0.5, decay: 0.12 },  // 極太ビーム：「ゴゴッ」
+    { seconds: 1.00, from: 90,   to: 28,  tone: 1.0, noise: 0.6, decay: 0.35 },  // 撃破：「ドーン」
+];
+
+// 雑音は決まった種から作る（描き出すたびに同じ波形になる）
+function synthesizeSfx(ctx, sound, seed) {
+    const rate = ctx.sampleRate;
+    const n = Math.ceil(sound.seconds * rate);
+    const buffer = ctx.createBuffer(1, n, rate);
+    const data = buffer.getChannelData(0);
+    const glide = Math.log(sound.to / sound.from) / sound.seconds;
+    const scale = 1 / (sound.tone + sound.noise);
+    let phase = 0; let state = seed;
+    for (let i = 0; i < n; i++) {
+        const t = i / rate;
+        phase += 2 * Math.PI * sound.from * Math.exp(glide * t) / rate;
+        state = (Math.imul(state, 1664525) + 1013904223) >>> 0;
+        const noise = state / 2147483648 - 1;
+        const env = Math.min(1, t / SFX_ATTACK, (sound.seconds - t) / SFX_RELEASE) * Math.exp(-t / sound.decay);
+        data[i] = env * scale * (sound.tone * Math.sin(phase) + sound.noise * noise);
+    }
+    return buffer;
+}
+
+// ヒットストップが長いほど低く大きく（鉄球は速さで 3〜25、聖剣は 0〜20、散弾は 1〜5、撃破は 12 か 120 フレーム）
+function sfxRate(hitStop) { return 1.25 - Math.min(hitStop, 30) * 0.02; }
+function sfxLevel(hitStop) { return Math.min(1, 0.3 + Math.min(hitStop, 30) * 0.025); }
+
+class SfxEngine {
+    constructor(ctx, volume = 1) {
+        this.ctx = ctx;
+        this.master = ctx.createGain();
+        this.master.gain.value = volume;
+        this.master.connect(ctx.destination);
+        this.buffers = SFX_SOUNDS.map((sound, i) => synthesizeSfx(ctx, sound, 0x9E3779B9 + i));
+        // 口：GainNode はずっと使い回す。AudioBufferSourceNode は1回しか start できないので鳴らすたびに作る（軽い）
+        this.voices = [];
+        for (let i = 0; i < SFX_VOICES; i++) {
+            const gain = ctx.createGain();
+            gain.connect(this.master);
+            this.voices.push({ gain, source: null, sound: -1, start: -Infinity, end: -Infinity, level: 0 });
+        }
+    }
+
+    setVolume(volume) { this.master.gain.value = volume; }
+
+    // 1フレームぶんの当たりを鳴らす。tick はそのフレームの最後のティック、clock はゲームごとの { anchor }（ティック0 の音の時刻）
+    playHits(tick, hits, clock) {
+        const now = this.ctx.currentTime;
+        const ideal = now + SFX_LEAD - tick / SFX_TICK_HZ;
+        if (clock.anchor === null || Math.abs(clock.anchor - ideal) > SFX_RESYNC) clock.anchor = ideal;
+        for (let i = 0; i < hits.length; i += 3) {
+            this.play(hits[i + 1], hits[i + 2], Math.max(now, clock.anchor + hits[i] / SFX_TICK_HZ));
+        }
+    }
+
+    // 音を1つ when（音の時計の秒）に鳴らす
+    play(sound, hitStop, when) {
+        const level = sound === SFX_KO ? 1 : sfxLevel(hitStop);
+        let voice = null;
+        for (const v of this.voices) {
+            if (v.sound === sound && v.start === when) {
+                // 同じ瞬間の同じ音：重ねずに少しだけ大きくする
+                v.level = Math.min(1, Math.max(v.level, level) + level * 0.25);
+                v.gain.gain.setValueAtTime(v.level, when);
+                return;
+            }
+            if (v.end <= when && (voice === null || v.end < voice.end)) voice = v;
+        }
+        if (voice === null) {
+            // 空きが無ければ一番古い音を奪う（減衰しきりかけている音なので、途中で切ってもほとんど聞こえない）
+            voice = this.voices[0];
+            for (const v of this.voices) if (v.start < voice.start) voice = v;
+            voice.source.stop(Math.max(when, voice.start));
+        }
+        const buffer = this.buffers[sound];
+        const rate = sfxRate(hitStop);
+        const source = this.ctx.createBufferSource();
+        source.buffer = buffer;
+        source.playbackRate.value = rate;
+        source.connect(voice.gain);
+        voice.gain.gain.setValueAtTime(level, when);
+        source.start(when);
+        voice.source = source; voice.sound = sound; voice.level = level;
+        voice.start = when; voice.end = when + buffer.duration / rate;
+    }
+
+    // 画面なしで確かめる用：当たりの並び（ティックは0からでなくてよい）を OfflineAudioContext に描き出して AudioBuffer を返す
+    //   SfxEngine.renderOffline([0, 0, 25,  30, SFX_KO, 120], 2).then(buffer => ...)
+    static renderOffline(hits, seconds, sampleRate = 44100) {
+        const ctx = new OfflineAudioContext(1, Math.ceil(seconds * sampleRate), sampleRate);
+        const engine = new SfxEngine(ctx);
+        for (let i = 0; i < hits.length; i += 3) {
+            engine.play(hits[i + 1], hits[i + 2], (hits[i] - hits[0]) / SFX_TICK_HZ);
+        }
+        return ctx.startRendering();
+    }
+}
+
+// ページに1つの効果音：AudioContext は読み込んだときに作って音も合成しておき、最初に触られたときに鳴らし始める
+// （自動再生の制限で、ユーザーの操作の中で resume() するまでは鳴らない）。音量 0 のあいだは作らない
+// ギャラリーでは枠の iframe からもこれを使うので、全部の枠で1つの AudioContext と口を分け合う
+function pageSfx(volume) {
+    const AudioContextClass = window.AudioContext || window.webkitAudioContext;
+    let engine = null;
+    function ensure() {
+        if (engine === null && volume > 0 && AudioContextClass) {
+            engine = new SfxEngine(new AudioContextClass({ latencyHint: 'interactive' }), volume);
+        }
+    }
+    ensure();
+    return {
+        // ポインタを押したとき（ユーザーの操作の中）に呼ぶ
+        unlock() {
+            ensure();
+            if (engine && engine.ctx.state === 'suspended') engine.ctx.resume();
+        },
+        setVolume(newVolume) {
+            volume = newVolume; ensure();
+            if (engine) engine.setVolume(volume);
+        },
+        // ゲーム1つぶんの入口（ティックの時計はゲームごとに別）
+        track() {
+            const clock = { anchor: null };
+            return (tick, hits) => { if (engine && volume > 0) engine.playHits(tick, hits, clock); };
+        },
+    };
+}
@@ -0,0 +1,60 @@
+// ★鉄球：掴んで投げる。速さに応じてダメージとヒットストップが変わる「重量級」★
+// 武器のモジュール（game.js の registerWeapon() に渡す）。選んだときだけ読み込まれる
+const GRAVITY = 0.5; const FRICTION = 0.98; const BOUNCE = 0.7;
+
+function moveBall() {
+    if (black.isDragging) return;
+    black.vy += GRAVITY; black.vx *= FRICTION; black.vy *= FRICTION; black.x += black.vx; black.y += black.vy;
+    if (black.x + black.radius > viewW) { black.x = viewW - black.radius; black.vx *= -BOUNCE; }
+    else if (black.x - black.radius < 0) { black.x = black.radius; black.vx *= -BOUNCE; }
+    if (black.y + black.radius > viewH) { black.y = viewH - black.radius; black.vy *= -BOUNCE; if(Math.abs(black.vy) < GRAVITY) black.vy = 0; }
+    else if (black.y - black.radius < 0) { black.y = black.radius; black.vy *= -BOUNCE; }
+}
+
+function checkBallCollisions() {
+    const R = maxTargetRadius;
+    // 前のティックの位置から今の位置まで、鉄球が通った道すじで判定する（思い切り投げてもすり抜けない）
+    const x0 = black.px, y0 = black.py, x1 = black.x, y1 = black.y;
+    const reach = black.radius + R;
+    const n = queryTargets(Math.min(x0, x1) - reach, Math.min(y0, y1) - reach, Math.max(x0, x1) + reach, Math.max(y0, y1) + reach);
+    let t = null; let hitS = 2;
+    for (let k = 0; k < n; k++) {
+        const c = targets[queryResult[k]];
+        if (!c.alive) continue;
+        const s = sweptCircleHit(x0, y0, x1, y1, c.x, c.y, black.radius + c.radius);
+        if (s >= 0 && s < hitS) { t = c; hitS = s; }
+    }
+    if (!t) return; // 跳ね返るので1ティックに当たるのは一番先に触れた1体だけ
+    // 触れた瞬間の位置まで戻す（ティックの頭から重なっていたら、今の位置から押し出す）
+    if (hitS > 0) { black.x = x0 + (x1 - x0) * hitS; black.y = y0 + (y1 - y0) * hitS; }
+    const dx = black.x - t.x; const dy = black.y - t.y;
+    const dist = Math.hypot(dx, dy); const minDist = black.radius + t.radius;
+    const hitX = (black.x + t.x) / 2; const hitY = (black.y + t.y) / 2;
+    const speed = Math.sqrt(black.vx**2 + black.vy**2);
+    let damage = speed < 2 ? 5 : 5 + ((speed - 2) / 20) * 45; if(damage > 50) damage = 50; const isCritical = damage > 30;
+    const angle = Math.atan2(dy, dx); const overlap = Math.max(0, minDist - dist);
+    black.x += Math.cos(angle) * overlap; black.y += Math.sin(angle) * overlap;
+    black.vx = Math.cos(angle) * (speed * 0.8 + 2); black.vy = Math.sin(angle) * (speed * 0.8 + 2);
+    applyDamage(t, damage, hitX, hitY, isCritical);
+    // ★鉄球のヒットストップ復活！★
+    if (t.alive) setHitStop(t, Math.max(3, Math.floor(damage / 2)));
+}
+
+registerWeapon('ball', {
+    ringColor: 'rgba(255, 255, 0, 0.8)', ringRgb: GL_YELLOW,
+    ringAtContact: true, // 輪は鉄球とサンドバッグのあいだに出す
+    onDown(pos) {
+        if (Math.hypot(pos.x - black.x, pos.y - black.y) < black.radius * 2.5) {
+            black.isDragging = true; black.vx = 0; black.vy = 0;
+        }
+    },
+    onMove() { if (black.isDragging) throwVelocity(pointerClock); },
+    // 離す前にしばらく止まっていたら、そのまま落とす（最後に動かしたときの速さを持ち越さない）
+    onUp() { if (black.isDragging) throwVelocity(pointerClock); },
+    movePlayer: moveBall,
+    collideMelee: checkBallCollisions,
+    drawPlayer(g, bx, by) {
+        g.fillStyle = 'black'; g.beginPath(); g.arc(bx, by, black.radius, 0, Math.PI * 2); g.fill();
+        g.fillStyle = '#555'; g.beginPath(); g.arc(bx - 10, by - 10, 5, 0, Math.PI * 2); g.fill();
+    },
+});
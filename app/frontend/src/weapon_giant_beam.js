@@ -0,0 +1,140 @@
+// ★極太ビーム：ゆっくり進む太い帯。通り道の子に最大5回まで当たる★
+// 武器のモジュール（game.js の registerWeapon() に渡す）。選んだときだけ読み込まれる
+const GIANT_BEAM_SPEED = 8; const GIANT_BEAM_WIDTH = 240; const GIANT_BEAM_HEIGHT = 80; const GIANT_BEAM_COOLDOWN = 60; const GIANT_BEAM_MAX_HITS = 5;
+const GIANT_BEAM_BUDGET = 16;
+
+const giantBeams = new EntityPool(GIANT_BEAM_BUDGET, {
+    x: Float32Array, y: Float32Array, px: Float32Array, py: Float32Array, vx: Float32Array, vy: Float32Array,
+    angle: Float32Array, life: Float32Array, hitCount: Uint8Array, hitCooldown: Float32Array, isHitting: Uint8Array,
+    hitX: Float32Array, hitY: Float32Array
+}, 'life');
+
+// 光のスプライト：原点が後端の中心
+function paintGiantBeamGlow(g) {
+    const r = GIANT_BEAM_HEIGHT / 2; const w = GIANT_BEAM_WIDTH; const h = GIANT_BEAM_HEIGHT;
+    g.beginPath(); g.moveTo(r, -h/2); g.lineTo(w-r, -h/2); g.quadraticCurveTo(w, -h/2, w, 0); g.quadraticCurveTo(w, h/2, w-r, h/2); g.lineTo(r, h/2); g.quadraticCurveTo(0, h/2, 0, 0); g.quadraticCurveTo(0, -h/2, r, -h/2); g.closePath();
+    g.shadowBlur = glowBlur(40); g.shadowColor = '#ff00ff';
+    const grad = g.createLinearGradient(0, -h/2, 0, h/2);
+    grad.addColorStop(0, 'rgba(255, 100, 255, 0.5)'); grad.addColorStop(0.5, 'rgba(255, 220, 255, 0.9)'); grad.addColorStop(1, 'rgba(255, 100, 255, 0.5)');
+    g.fillStyle = grad; g.fill();
+    if (quality.beamDetail < 2) return; // 芯の二重がけは省略
+    g.shadowBlur = glowBlur(20); g.shadowColor = '#ffffff'; g.fillStyle = 'rgba(255, 255, 255, 0.7)';
+    const coreMargin = 10;
+    g.beginPath(); g.moveTo(r, -h/2 + coreMargin); g.lineTo(w-r, -h/2 + coreMargin); g.quadraticCurveTo(w-coreMargin, -h/2 + coreMargin, w-coreMargin, 0); g.quadraticCurveTo(w-coreMargin, h/2 - coreMargin, w-r, h/2 - coreMargin); g.lineTo(r, h/2 - coreMargin); g.quadraticCurveTo(coreMargin, h/2 - coreMargin, coreMargin, 0); g.quadraticCurveTo(coreMargin, -h/2 + coreMargin, r, -h/2 + coreMargin); g.closePath(); g.fill();
+}
+
+function spawnGiantBeam(x, y, angle) {
+    const B = giantBeams; const i = B.spawn();
+    B.x[i] = x; B.y[i] = y; B.px[i] = x; B.py[i] = y; B.angle[i] = angle;
+    B.vx[i] = Math.cos(angle) * GIANT_BEAM_SPEED; B.vy[i] = Math.sin(angle) * GIANT_BEAM_SPEED;
+    B.life[i] = 150; B.hitCount[i] = 0; B.hitCooldown[i] = 0; B.isHitting[i] = 0;
+}
+function updateGiantBeams() {
+    const B = giantBeams;
+    for (let i = B.count - 1; i >= 0; i--) {
+        B.x[i] += B.vx[i]; B.y[i] += B.vy[i]; B.life[i]--;
+        if (B.hitCooldown[i] > 0) B.hitCooldown[i]--;
+        if(fxRandom() < 0.3 * quality.particleRate) {
+            const pX = B.x[i] + (fxRandom() - 0.5) * GIANT_BEAM_WIDTH * 0.8;
+            const pY = B.y[i] + (fxRandom() - 0.5) * GIANT_BEAM_HEIGHT * 0.8;
+            spawnParticle(pX, pY, false, C_PINK);
+        }
+        if(B.isHitting[i] && fxRandom() < 0.5 * quality.particleRate) {
+             spawnParticle(B.hitX[i], B.hitY[i], false, C_MAGENTA);
+        }
+        B.isHitting[i] = 0;
+        if (B.life[i] <= 0) B.remove(i);
+    }
+}
+function drawGiantBeams(ctx, a) {
+    const B = giantBeams;
+    if (B.count === 0) return;
+    if (quality.beamDetail === 0) {
+        // 最低品質：光も角丸もないただの帯を、まとめて1回で塗る
+        const w = GIANT_BEAM_WIDTH; const h = GIANT_BEAM_HEIGHT / 2;
+        ctx.fillStyle = 'rgba(255, 200, 255, 0.8)'; ctx.beginPath();
+        for (let i = 0; i < B.count; i++) {
+            const x = lerp(B.px[i], B.x[i], a); const y = lerp(B.py[i], B.y[i], a);
+            const c = Math.cos(B.angle[i]); const s = Math.sin(B.angle[i]);
+            ctx.moveTo(x - s * h, y + c * h); ctx.lineTo(x + c * w - s * h, y + s * w + c * h);
+            ctx.lineTo(x + c * w + s * h, y + s * w - c * h); ctx.lineTo(x + s * h, y - c * h); ctx.closePath();
+        }
+        ctx.fill();
+        return;
+    }
+    const sprite = getGlowSprite('giant_beam', GIANT_BEAM_WIDTH, GIANT_BEAM_HEIGHT, glowPad(50), 0, GIANT_BEAM_HEIGHT / 2, paintGiantBeamGlow);
+    for (let i = 0; i < B.count; i++) {
+        drawGlowSprite(ctx, sprite, lerp(B.px[i], B.x[i], a), lerp(B.py[i], B.y[i], a), B.angle[i]);
+    }
+}
+// WebGL：後端の中心から前に GIANT_BEAM_WIDTH の帯（両端が丸い）。高品質なら白い芯を重ねる
+function drawGiantBeamsGl(R, a) {
+    const B = giantBeams; const bb = glBatch('beams'); bb.clear();
+    const beamHalf = (GIANT_BEAM_WIDTH - GIANT_BEAM_HEIGHT) / 2; const beamRadius = GIANT_BEAM_HEIGHT / 2;
+    for (let i = 0; i < B.count; i++) {
+        const c = Math.cos(B.angle[i]); const s = Math.sin(B.angle[i]);
+        const x = lerp(B.px[i], B.x[i], a) + c * GIANT_BEAM_WIDTH / 2; const y = lerp(B.py[i], B.y[i], a) + s * GIANT_BEAM_WIDTH / 2;
+        if (quality.beamDetail === 0) { bb.push(x, y, c, s, beamHalf, beamRadius, 0, GL_SHAPE_CAPSULE, GL_BEAM_CORE, 0.8, GL_MAGENTA, 0); continue; }
+        bb.push(x, y, c, s, beamHalf, beamRadius, glowPad(40), GL_SHAPE_BEAM, GL_BEAM_CORE, 0.9, GL_MAGENTA, 0.6);
+        if (quality.beamDetail === 2) bb.push(x, y, c, s, beamHalf, beamRadius - 10, glowPad(20), GL_SHAPE_CAPSULE, GL_WHITE, 0.7, GL_WHITE, 0.3);
+    }
+    R.draw(bb);
+}
+
+function checkGiantBeamCollisions() {
+    const R = maxTargetRadius;
+    const B = giantBeams;
+    const hitW = GIANT_BEAM_WIDTH * 0.9;
+    const hitH = GIANT_BEAM_HEIGHT * 0.8;
+    for (let i = 0; i < B.count; i++) {
+        if (B.hitCount[i] >= GIANT_BEAM_MAX_HITS) continue;
+        if (B.hitCooldown[i] > 0) continue;
+
+        // 回転した当たり箱を囲むAABBでセルを引く
+        const cos = Math.cos(B.angle[i]); const sin = Math.sin(B.angle[i]);
+        const ox = B.x[i], oy = B.y[i]; const fx = ox + hitW * cos, fy = oy + hitW * sin;
+        const padX = Math.abs(sin) * hitH / 2 + R; const padY = Math.abs(cos) * hitH / 2 + R;
+        const n = queryTargets(Math.min(ox, fx) - padX, Math.min(oy, fy) - padY, Math.max(ox, fx) + padX, Math.max(oy, fy) + padY);
+
+        let hit = false;
+        for (let k = 0; k < n; k++) {
+            const t = targets[queryResult[k]];
+            if (!t.alive) continue;
+            const dx = t.x - ox; const dy = t.y - oy;
+            const localX = dx * cos + dy * sin;
+            const localY = -dx * sin + dy * cos;
+
+            const closestX = Math.max(0, Math.min(localX, hitW));
+            const closestY = Math.max(-hitH/2, Math.min(localY, hitH/2));
+            const distX = localX - closestX; const distY = localY - closestY;
+            const distanceSq = (distX * distX) + (distY * distY);
+
+            if (distanceSq < (t.radius * t.radius)) {
+                hit = true; B.hitX[i] = t.x; B.hitY[i] = t.y;
+                applyDamage(t, GIANT_BEAM_DAMAGE_VAL, t.x, t.y, true);
+            }
+        }
+        if (hit) {
+            B.hitCount[i]++;
+            B.hitCooldown[i] = 10;
+            B.isHitting[i] = 1;
+        }
+    }
+}
+
+registerWeapon('giant_beam', shooterWeapon({
+    color: '#ff00ff', cooldownColor: 'rgba(255, 0, 255, 0.5)', cooldown: GIANT_BEAM_COOLDOWN,
+    shake: 15, ringColor: 'rgba(255, 0, 255, 0.8)', ringRgb: GL_MAGENTA,
+    pool: giantBeams, poolLabel: 'beams',
+    fire(baseAngle) {
+        hitStopTimer = 6;
+        screenShakeX = Math.cos(baseAngle) * -10;
+        screenShakeY = Math.sin(baseAngle) * -10;
+        spawnGiantBeam(black.x, black.y, baseAngle);
+        for(let i=0, n=particleCount(30); i<n; i++) spawnParticle(black.x + Math.cos(baseAngle)*40, black.y + Math.sin(baseAngle)*40, true, C_PINK);
+    },
+    updateProjectiles: updateGiantBeams,
+    collideProjectiles: checkGiantBeamCollisions,
+    drawProjectiles: drawGiantBeams,
+    drawGl: drawGiantBeamsGl,
+}));
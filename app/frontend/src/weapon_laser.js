@@ -0,0 +1,101 @@
+// ★レーザーガン：速い光弾。壁に当たると3本に分かれて跳ね返る★
+// 武器のモジュール（game.js の registerWeapon() に渡す）。選んだときだけ読み込まれる
+const LASER_COOLDOWN = 30; const LASER_SPEED = 45; const LASER_LENGTH = 160; const LASER_SPREAD = Math.PI / 6;
+const LASER_BUDGET = 96;
+
+const laserBolts = new EntityPool(LASER_BUDGET, {
+    x: Float32Array, y: Float32Array, px: Float32Array, py: Float32Array, vx: Float32Array, vy: Float32Array,
+    angle: Float32Array, life: Float32Array, generation: Uint8Array, hasHit: Uint8Array
+}, 'life');
+
+// 光のスプライト：原点が先端、後ろに LASER_LENGTH 伸びる線
+function paintLaserGlow(g) {
+    g.shadowBlur = glowBlur(15); g.shadowColor = '#00ffff'; g.strokeStyle = '#ccffff'; g.lineWidth = 4; g.lineCap = 'round';
+    g.beginPath(); g.moveTo(0, 0); g.lineTo(-LASER_LENGTH, 0); g.stroke();
+}
+
+function spawnLaser(x, y, angle, generation) {
+    const L = laserBolts; const i = L.spawn();
+    L.x[i] = x; L.y[i] = y; L.px[i] = x; L.py[i] = y; L.angle[i] = angle;
+    L.vx[i] = Math.cos(angle) * LASER_SPEED; L.vy[i] = Math.sin(angle) * LASER_SPEED;
+    L.generation[i] = generation; L.life[i] = 100; L.hasHit[i] = 0;
+}
+function updateLaserBolts() {
+    const L = laserBolts;
+    for (let i = L.count - 1; i >= 0; i--) {
+        let nextX = L.x[i] + L.vx[i]; let nextY = L.y[i] + L.vy[i]; let hitWall = false; let wallNormal = 0;
+        if (nextX > viewW) { nextX = viewW; hitWall = true; wallNormal = Math.PI; }
+        else if (nextX < 0) { nextX = 0; hitWall = true; wallNormal = 0; }
+        if (nextY > viewH) { nextY = viewH; hitWall = true; wallNormal = -Math.PI/2; }
+        else if (nextY < 0) { nextY = 0; hitWall = true; wallNormal = Math.PI/2; }
+        if (hitWall) {
+            const generation = L.generation[i]; const angle = L.angle[i];
+            L.remove(i);
+            if (generation < 1) {
+                let reflectAngle = angle;
+                if (wallNormal === 0 || wallNormal === Math.PI) reflectAngle = Math.PI - angle; else reflectAngle = -angle;
+                spawnLaser(nextX, nextY, reflectAngle, generation + 1); spawnLaser(nextX, nextY, reflectAngle + LASER_SPREAD, generation + 1); spawnLaser(nextX, nextY, reflectAngle - LASER_SPREAD, generation + 1);
+                for(let k=0, n=particleCount(5); k<n; k++) spawnParticle(nextX, nextY, false, C_CYAN);
+            }
+            continue;
+        }
+        L.x[i] = nextX; L.y[i] = nextY;
+        L.life[i]--; if (L.life[i] <= 0) L.remove(i);
+    }
+}
+function drawLaserBolts(ctx, a) {
+    const L = laserBolts;
+    if (L.count === 0) return;
+    const sprite = getGlowSprite('laser', LASER_LENGTH + 4, 4, glowPad(20), LASER_LENGTH + 2, 2, paintLaserGlow);
+    for (let i = 0; i < L.count; i++) {
+        drawGlowSprite(ctx, sprite, lerp(L.px[i], L.x[i], a), lerp(L.py[i], L.y[i], a), L.angle[i]);
+    }
+}
+// WebGL：先端から後ろに LASER_LENGTH の線
+function drawLaserBoltsGl(R, a) {
+    const L = laserBolts; const lb = glBatch('lasers'); lb.clear();
+    for (let i = 0; i < L.count; i++) {
+        const c = Math.cos(L.angle[i]); const s = Math.sin(L.angle[i]); const half = LASER_LENGTH / 2;
+        const x = lerp(L.px[i], L.x[i], a) - c * half; const y = lerp(L.py[i], L.y[i], a) - s * half;
+        lb.push(x, y, c, s, half, 2, glowPad(15), GL_SHAPE_CAPSULE, GL_LASER_CORE, 1, GL_CYAN, 0.8);
+    }
+    R.draw(lb);
+}
+
+// 本体の線分（このティックに本体より長く進んだら、進んだぶんまで伸ばす）で判定して、
+// 尻尾から見て一番手前の子 = 先端が最初に届いた子に当てる
+function checkLaserCollisions() {
+    const R = maxTargetRadius;
+    const L = laserBolts;
+    for (let i = 0; i < L.count; i++) {
+        if (L.hasHit[i]) continue;
+        const headX = L.x[i], headY = L.y[i];
+        const length = Math.max(LASER_LENGTH, Math.hypot(headX - L.px[i], headY - L.py[i]));
+        const tailX = headX - Math.cos(L.angle[i]) * length;
+        const tailY = headY - Math.sin(L.angle[i]) * length;
+        const pad = R + 5;
+        const n = queryTargets(Math.min(headX, tailX) - pad, Math.min(headY, tailY) - pad, Math.max(headX, tailX) + pad, Math.max(headY, tailY) + pad);
+        let hit = null; let hitS = 2;
+        for (let k = 0; k < n; k++) {
+            const t = targets[queryResult[k]];
+            if (!t.alive) continue;
+            const s = sweptCircleHit(tailX, tailY, headX, headY, t.x, t.y, t.radius + 5);
+            if (s >= 0 && s < hitS) { hit = t; hitS = s; }
+        }
+        if (hit) {
+            L.hasHit[i] = 1;
+            applyDamage(hit, LASER_DAMAGE_VAL, hit.x, hit.y, true);
+        }
+    }
+}
+
+registerWeapon('laser', shooterWeapon({
+    color: '#00ffff', cooldownColor: 'rgba(0, 255, 255, 0.5)', cooldown: LASER_COOLDOWN,
+    shake: 5, ringColor: 'rgba(0, 255, 255, 0.8)', ringRgb: GL_CYAN,
+    pool: laserBolts, poolLabel: 'lasers',
+    fire(baseAngle) { spawnLaser(black.x, black.y, baseAngle, 0); },
+    updateProjectiles: updateLaserBolts,
+    collideProjectiles: checkLaserCollisions,
+    drawProjectiles: drawLaserBolts,
+    drawGl: drawLaserBoltsGl,
+}));
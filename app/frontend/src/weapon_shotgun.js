@@ -0,0 +1,91 @@
+// ★ショットガン：散弾を扇状にばらまく。1発ごとに短いヒットストップ★
+// 武器のモジュール（game.js の registerWeapon() に渡す）。選んだときだけ読み込まれる
+const SHOTGUN_PELLETS = 12; const SHOTGUN_SPREAD = Math.PI / 5; const SHOTGUN_SPEED = 25; const SHOTGUN_COOLDOWN = 40;
+const PELLET_BUDGET = 240; const PELLET_SIZE = 5;
+
+const pellets = new EntityPool(PELLET_BUDGET, {
+    x: Float32Array, y: Float32Array, px: Float32Array, py: Float32Array, vx: Float32Array, vy: Float32Array, life: Float32Array
+}, 'life');
+
+function spawnPellet(x, y, angle) {
+    const P = pellets; const i = P.spawn();
+    P.x[i] = x; P.y[i] = y; P.px[i] = x; P.py[i] = y;
+    P.vx[i] = Math.cos(angle) * SHOTGUN_SPEED; P.vy[i] = Math.sin(angle) * SHOTGUN_SPEED;
+    P.life[i] = 30;
+}
+function updatePellets() {
+    const P = pellets;
+    for (let i = P.count - 1; i >= 0; i--) {
+        P.x[i] += P.vx[i]; P.y[i] += P.vy[i]; P.life[i]--;
+        if (P.life[i] <= 0) P.remove(i);
+    }
+}
+// 散弾は弾まとめて1回の fill、軌跡もまとめて1回の stroke
+function drawPellets(ctx, a) {
+    const P = pellets;
+    if (P.count === 0) return;
+    ctx.fillStyle = '#ffff00'; ctx.beginPath();
+    for (let i = 0; i < P.count; i++) {
+        const x = lerp(P.px[i], P.x[i], a); const y = lerp(P.py[i], P.y[i], a);
+        ctx.moveTo(x + PELLET_SIZE, y); ctx.arc(x, y, PELLET_SIZE, 0, Math.PI * 2);
+    }
+    ctx.fill();
+    ctx.strokeStyle = 'rgba(255, 255, 0, 0.5)'; ctx.lineWidth = 2; ctx.beginPath();
+    for (let i = 0; i < P.count; i++) {
+        const x = lerp(P.px[i], P.x[i], a); const y = lerp(P.py[i], P.y[i], a);
+        ctx.moveTo(x, y); ctx.lineTo(x - P.vx[i]*2, y - P.vy[i]*2);
+    }
+    ctx.stroke();
+}
+// WebGL：弾（円）と軌跡（細いカプセル）
+function drawPelletsGl(R, a) {
+    const P = pellets; const pb = glBatch('pellets'); pb.clear();
+    const glow = quality.glow;
+    for (let i = 0; i < P.count; i++) {
+        const x = lerp(P.px[i], P.x[i], a); const y = lerp(P.py[i], P.y[i], a);
+        const speed = Math.hypot(P.vx[i], P.vy[i]);
+        if (speed > 0) pb.push(x - P.vx[i], y - P.vy[i], P.vx[i] / speed, P.vy[i] / speed, speed, 1, 0, GL_SHAPE_CAPSULE, GL_YELLOW, 0.5, GL_YELLOW, 0);
+        pb.push(x, y, 1, 0, 0, PELLET_SIZE, glow ? 6 : 0, GL_SHAPE_CAPSULE, GL_YELLOW, 1, GL_YELLOW, 0.5);
+    }
+    R.draw(pb);
+}
+
+// 散弾：このティックに通った線分で判定して、一番先に触れた子に当てる
+function checkPelletCollisions() {
+    const R = maxTargetRadius;
+    let pelletStop = 2;
+    if (SHOTGUN_DAMAGE_VAL < 8) pelletStop = 1; else if (SHOTGUN_DAMAGE_VAL >= 18) pelletStop = 5; else if (SHOTGUN_DAMAGE_VAL >= 14) pelletStop = 4; else if (SHOTGUN_DAMAGE_VAL >= 10) pelletStop = 3;
+    const P = pellets;
+    for (let i = P.count - 1; i >= 0; i--) {
+        const x0 = P.px[i], y0 = P.py[i], x1 = P.x[i], y1 = P.y[i]; const reach = R + PELLET_SIZE;
+        const n = queryTargets(Math.min(x0, x1) - reach, Math.min(y0, y1) - reach, Math.max(x0, x1) + reach, Math.max(y0, y1) + reach);
+        let hit = null; let hitS = 2;
+        for (let k = 0; k < n; k++) {
+            const t = targets[queryResult[k]];
+            if (!t.alive) continue;
+            const s = sweptCircleHit(x0, y0, x1, y1, t.x, t.y, t.radius + PELLET_SIZE);
+            if (s >= 0 && s < hitS) { hit = t; hitS = s; }
+        }
+        if (hit) {
+            P.remove(i);
+            applyDamage(hit, SHOTGUN_DAMAGE_VAL, x0 + (x1 - x0) * hitS, y0 + (y1 - y0) * hitS - 20, false);
+            if (hit.alive) setHitStop(hit, pelletStop);
+        }
+    }
+}
+
+registerWeapon('shotgun', shooterWeapon({
+    color: '#ff5555', cooldownColor: 'rgba(255, 0, 0, 0.5)', cooldown: SHOTGUN_COOLDOWN,
+    shake: 5, pool: pellets, poolLabel: 'pellets',
+    fire(baseAngle) {
+        for(let i=0, n=particleCount(20); i<n; i++) spawnParticle(black.x + Math.cos(baseAngle)*30, black.y + Math.sin(baseAngle)*30, false, C_ORANGE);
+        for (let i = 0; i < SHOTGUN_PELLETS; i++) {
+            const spread = (simRandom() - 0.5) * SHOTGUN_SPREAD;
+            spawnPellet(black.x, black.y, baseAngle + spread);
+        }
+    },
+    updateProjectiles: updatePellets,
+    collideProjectiles: checkPelletCollisions,
+    drawProjectiles: drawPellets,
+    drawGl: drawPelletsGl,
+}));
@@ -0,0 +1,107 @@
+// ★聖剣：マウスに付いていって、押すと振る。振りの範囲に入った子をまとめて斬る★
+// 武器のモジュール（game.js の registerWeapon() に渡す）。選んだときだけ読み込まれる
+const SWORD_LENGTH = 130; const SWORD_SWING_ANGLE = 120 * (Math.PI / 180); const SWORD_SPEED = 12;
+const SLASH_BUDGET = 8;
+
+const slashEffects = new EntityPool(SLASH_BUDGET, {
+    x: Float32Array, y: Float32Array, angle: Float32Array, life: Float32Array, length: Float32Array, width: Float32Array
+}, 'life');
+
+// 斬撃：横方向に一様な光の帯（貼るときに横に引き伸ばす）。端は画面外なので帯の両端は気にしない
+const SLASH_STRIP_LENGTH = 32;
+function slashGlowSprite(width) {
+    const w = Math.max(1, Math.round(width));
+    return getGlowSprite('slash:' + w, SLASH_STRIP_LENGTH, w, glowPad(20), 0, w / 2, g => {
+        g.fillStyle = 'white'; g.shadowBlur = glowBlur(20); g.shadowColor = 'cyan';
+        g.fillRect(-100, -w / 2, SLASH_STRIP_LENGTH + 200, w);
+    });
+}
+
+// --- 斬撃エフェクト ---
+function spawnSlash(x, y, angle) {
+    const S = slashEffects; const i = S.spawn();
+    S.x[i] = x; S.y[i] = y; S.angle[i] = angle;
+    S.life[i] = 1.0; S.length[i] = Math.max(displayW, displayH) * 2.5; S.width[i] = 2;
+}
+function updateSlashEffects() {
+    const S = slashEffects;
+    for (let i = S.count - 1; i >= 0; i--) {
+        S.life[i] -= 0.08; S.width[i] += 4;
+        if (S.life[i] <= 0) S.remove(i);
+    }
+}
+function drawSlashEffects(ctx, a) {
+    const S = slashEffects;
+    for (let i = 0; i < S.count; i++) {
+        const len = S.length[i]; const w = S.width[i];
+        const main = slashGlowSprite(w); const cross = slashGlowSprite(w / 2);
+        ctx.save(); ctx.translate(S.x[i], S.y[i]); ctx.rotate(S.angle[i]);
+        ctx.globalAlpha = S.life[i];
+        // 帯の真ん中だけを縦横に引き伸ばして貼る（左右の余白は使わない）
+        ctx.drawImage(main.canvas, main.ax * glowSpriteDpr, 0, SLASH_STRIP_LENGTH * glowSpriteDpr, main.canvas.height, -len/2, -main.ay, len, main.h);
+        ctx.rotate(Math.PI / 2);
+        ctx.drawImage(cross.canvas, cross.ax * glowSpriteDpr, 0, SLASH_STRIP_LENGTH * glowSpriteDpr, cross.canvas.height, -len/2, -cross.ay, len, cross.h);
+        ctx.restore(); ctx.globalAlpha = 1.0;
+    }
+}
+
+function moveSword() {
+    const followSpeed = black.isSwinging ? 0.05 : 0.2;
+    black.x += (black.targetX - black.x) * followSpeed; black.y += (black.targetY - black.y) * followSpeed;
+    if (black.isSwinging) {
+        black.swingProgress += 1.0 / SWORD_SPEED;
+        const startAngle = FIXED_UP_ANGLE - SWORD_SWING_ANGLE / 2; const endAngle = FIXED_UP_ANGLE + SWORD_SWING_ANGLE / 2;
+        const t = black.swingProgress; const easeT = t < 0.5 ? 2 * t * t : -1 + (4 - 2 * t) * t;
+        black.angle = startAngle + (endAngle - startAngle) * easeT;
+        if (black.swingProgress >= 1.0) { black.isSwinging = false; }
+    } else {
+        black.baseAngle = FIXED_UP_ANGLE; black.angle = FIXED_UP_ANGLE + Math.sin(simTick * SIM_DT / 400) * 0.05;
+    }
+}
+
+function checkSwordCollisions() {
+    if (!black.isSwinging) return;
+    const R = maxTargetRadius;
+    let phase = Math.floor(black.swingProgress * 3); if (phase > 2) phase = 2;
+    if (black.hitFlags[phase]) return;
+    const reach = SWORD_LENGTH + R;
+    const n = queryTargets(black.x - reach, black.y - reach, black.x + reach, black.y + reach);
+    // 剣は振りの範囲に入った子をまとめて斬る
+    let hitAny = false;
+    for (let k = 0; k < n; k++) {
+        const t = targets[queryResult[k]];
+        if (!t.alive) continue;
+        const dist = Math.hypot(black.x - t.x, black.y - t.y);
+        if (dist >= SWORD_LENGTH + t.radius) continue;
+        const angleToEnemy = Math.atan2(t.y - black.y, t.x - black.x);
+        let angleDiff = angleToEnemy - black.angle;
+        while (angleDiff > Math.PI) angleDiff -= Math.PI * 2; while (angleDiff < -Math.PI) angleDiff += Math.PI * 2;
+        if (Math.abs(angleDiff) >= Math.PI / 7) continue;
+        hitAny = true;
+        applyDamage(t, 10 + (SWORD_HIT_STOP_VAL * 1.5), t.x, t.y, true);
+        spawnSlash(t.x, t.y, black.angle);
+        if (t.alive) setHitStop(t, SWORD_HIT_STOP_VAL);
+    }
+    if (hitAny) black.hitFlags[phase] = true;
+}
+
+registerWeapon('sword', {
+    shake: 3, ringColor: 'rgba(0, 255, 255, 0.8)', ringRgb: GL_CYAN,
+    pools: [slashEffects],
+    onDown() {
+        if (!black.isSwinging) {
+            black.isSwinging = true; black.swingProgress = 0; black.hitFlags.fill(false); black.baseAngle = FIXED_UP_ANGLE;
+        }
+    },
+    onMove(pos) { black.targetX = pos.x; black.targetY = pos.y; },
+    movePlayer: moveSword,
+    collideMelee: checkSwordCollisions,
+    updateEffects: updateSlashEffects,
+    drawEffects: drawSlashEffects,
+    drawPlayer(g, bx, by, bAngle) {
+        g.save(); g.translate(bx, by); g.rotate(bAngle);
+        g.shadowBlur = glowBlur(15); g.shadowColor = '#00ffff'; g.fillStyle = '#ccffff';
+        g.beginPath(); g.moveTo(0, -10); g.lineTo(0, 10); g.lineTo(SWORD_LENGTH, 0); g.fill();
+        g.shadowBlur = 0; g.fillStyle = '#555'; g.fillRect(0, -8, 25, 16); g.fillStyle = '#888'; g.fillRect(5, -20, 10, 40); g.restore();
+    },
+});
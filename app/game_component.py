@@ -0,0 +1,81 @@
+import hashlib
+
+import streamlit.components.v1 as components
+
+from static_assets import build_frontend
+
+# ★ゲームは双方向のカスタムコンポーネント★
+# frontend/src をビルドした静的ファイルを iframe で1回だけ読み込み、リランのたびに届くのは設定(args)だけ。
+# 走っているゲームがそのまま設定を差し替えるので、HP・弾・位置は消えない
+_hit_stop_game = components.declare_component("hit_stop_game", path=str(build_frontend()))
+
+
+def hit_stop_game(weapon_type, is_infinite, max_hp,
+                  sword_hit_stop, shotgun_damage, laser_damage, giant_beam_damage,
+                  particle_budget, sandbag_count=1,
+                  quality_tier=-1, quality_down_ms=20, quality_up_ms=8,
+                  perf_hud=False, use_worker=True, renderer="canvas", sfx_volume=60,
+                  replay=None, key="hit_stop_game"):
+    """ゲームを表示して、ゲームから返ってきた値を返す（まだ何もなければ None）。
+
+    renderer は "canvas"（Canvas 2D）か "webgl"（使えなければ自動で Canvas 2D）。
+    sfx_volume は当たったときの効果音の音量（0〜100。0 で鳴らさない）。
+    replay に記録ファイル(.hsr)の中身を渡すと、描画なしで早回しして結果を返す。
+    戻り値は {"ko": 最後の撃破 or None, "replay": 最後のリプレイ結果 or None, "events": 最後の戦闘ログ or None}。
+      ko:     {"koCount": 撃破回数, "weapon": 武器, "ttk": 最初のヒットから撃破までの秒数}
+      replay: {"ticks", "ms", "speedup", "checksum", "expected", "match"} か {"error"}
+      events: {"session", "seq", "tick", "weapon", "damage", "critical", "hitStop", "ko"}（列ごとのリスト。combat_log.py を参照）
+    """
+    config = _config(weapon_type, is_infinite, max_hp,
+                     sword_hit_stop, shotgun_damage, laser_damage, giant_beam_damage,
+                     particle_budget, sandbag_count,
+                     quality_tier, quality_down_ms, quality_up_ms, perf_hud, use_worker, renderer, sfx_volume)
+    # 同じファイルを何度も流さないように、中身のハッシュで見分ける
+    replay_id = hashlib.sha1(replay).hexdigest() if replay else None
+    # key を固定しておくと、引数が変わっても iframe は作り直されない
+    return _hit_stop_game(config=config, replay=replay, replayId=replay_id, key=key, default=None)
+
+
+def hit_stop_gallery(arenas, is_infinite, max_hp,
+                     sword_hit_stop, shotgun_damage, laser_damage, giant_beam_damage,
+                     particle_budget, sandbag_count=1,
+                     quality_tier=-1, quality_down_ms=20, quality_up_ms=8,
+                     perf_hud=False, use_worker=True, renderer="canvas", sfx_volume=60,
+                     key="hit_stop_gallery"):
+    """武器ごとのアリーナを1つのコンポーネントに並べて表示する（設定は武器のほかは全部の枠で同じ）。
+
+    arenas は (武器, 見出し) の並び。枠は1本の描画ループでまとめて回し、画面の外にある枠・
+    止まっている枠（動いているものが何もない）・見えていないタブでは回さない（gallery.js を参照）。
+    戻り値は {"arenas": [枠ごとの hit_stop_game() の戻り値 or None, ...]}（まだ何もなければ None）。
+    """
+    config = _config(None, is_infinite, max_hp,
+                     sword_hit_stop, shotgun_damage, laser_damage, giant_beam_damage,
+                     particle_budget, sandbag_count,
+                     quality_tier, quality_down_ms, quality_up_ms, perf_hud, use_worker, renderer, sfx_volume)
+    arenas = [{"weaponType": weapon_type, "label": label} for weapon_type, label in arenas]
+    return _hit_stop_game(config=config, arenas=arenas, replay=None, replayId=None, key=key, default=None)
+
+
+def _config(weapon_type, is_infinite, max_hp,
+            sword_hit_stop, shotgun_damage, laser_damage, giant_beam_damage,
+            particle_budget, sandbag_count,
+            quality_tier, quality_down_ms, quality_up_ms, perf_hud, use_worker, renderer, sfx_volume):
+    return {
+        "isInfinite": is_infinite,
+        "maxHp": max_hp,
+        "weaponType": weapon_type,
+        "swordHitStop": sword_hit_stop,
+        "shotgunDamage": shotgun_damage,
+        "laserDamage": laser_damage,
+        "giantBeamDamage": giant_beam_damage,
+        "particleBudget": particle_budget,
+        "sandbagCount": sandbag_count,
+        "qualityTier": quality_tier,
+        "qualityDownMs": quality_down_ms,
+        "qualityUpMs": quality_up_ms,
+        "perfHud": perf_hud,
+        # iframe を作ったときの値だけが効く（途中で切り替えるならページを読み込み直す）
+        "useWorker": use_worker,
+        "renderer": renderer,
+        "sfxVolume": sfx_volume,
+    }
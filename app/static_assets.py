@@ -0,0 +1,94 @@
+import gzip
+import hashlib
+from pathlib import Path
+
+# minify は入っていれば使う（なくても動く。gzip/brotli だけでも十分小さくなる）
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ★ゲームのJS/CSSは起動時に1回だけビルドして、ハッシュ付きの静的ファイルとして配る★
+# 中身が変わらない限りファイル名も変わらないので、ブラウザは2回目以降キャッシュから読む。
+# index.html だけは毎回取りに来る（Streamlit が no-cache で返す）ので、差し替えはそこで伝わる。
+#
+# 同じ場所に .gz / .br も置いておくので、前段に nginx などを置くなら、ハッシュ付きのファイルだけ build から直接配って
+# 圧縮済みファイルと長期キャッシュをそのまま使える（/srv/hit_stop/app はこのリポジトリの app の置き場所に読み替える）:
+#   location ~ ^/component/game_component\.hit_stop_game/([^/]+\.[0-9a-f]{12}\.(?:js|css))$ {
+#       alias /srv/hit_stop/app/frontend/build/$1;
+#       gzip_static on; brotli_static on; add_header Cache-Control "public, max-age=31536000, immutable";
+#       error_page 404 = @streamlit;  # build がまだ無い・古いときは Streamlit に任せる
+#   }
+#   location @streamlit { proxy_pass http://127.0.0.1:8501; }
+# URL のコンポーネント名は「declare_component を呼んだモジュール名.名前」（game_component.py の hit_stop_game）。
+# Streamlit を server.baseUrlPath の下で動かすなら、その分を頭に足す。
+FRONTEND_DIR = Path(__file__).with_name("frontend")
+SRC_DIR = FRONTEND_DIR / "src"
+BUILD_DIR = FRONTEND_DIR / "build"
+
+# index.html の差し込み位置 -> 元ファイル
+# 武器は1ファイルずつ別に置く（ページは選んでいる武器のぶんだけ読み込み、持ち替えたら足す）
+# ギャラリー（武器を並べて比べる）を開いたときだけ gallery.js を読み込む
+# 効果音の sfx.js はページ側だけで読み込む（ワーカーには渡さない）
+ASSET_PLACEHOLDERS = {
+    "__HOST_JS__": "host.js", "__GL_JS__": "gl_renderer.js", "__GAME_JS__": "game.js", "__GAME_CSS__": "game.css",
+    "__WEAPON_BALL_JS__": "weapon_ball.js", "__WEAPON_SWORD_JS__": "weapon_sword.js",
+    "__WEAPON_SHOTGUN_JS__": "weapon_shotgun.js", "__WEAPON_LASER_JS__": "weapon_laser.js",
+    "__WEAPON_GIANT_BEAM_JS__": "weapon_giant_beam.js", "__GALLERY_JS__": "gallery.js", "__SFX_JS__": "sfx.js",
+}
+HASH_LENGTH = 12
+
+
+def _minify(name, text):
+    if name.endswith(".js") and rjsmin is not None:
+        return rjsmin.jsmin(text)
+    if name.endswith(".css") and rcssmin is not None:
+        return rcssmin.cssmin(text)
+    return text
+
+
+def _versioned_name(name, data):
+    stem, ext = name.rsplit(".", 1)
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    return f"{stem}.{digest}.{ext}"
+
+
+def _write_with_precompressed(path, data):
+    path.write_bytes(data)
+    # mtime=0 にしておくと、同じ中身なら .gz もバイト単位で同じになる
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        path.with_name(path.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+
+def build_frontend(src_dir=SRC_DIR, out_dir=BUILD_DIR):
+    """src_dir のゲームを minify・ハッシュ付きの名前・圧縮済みで out_dir に書き出して、out_dir を返す。"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index = (src_dir / "index.html").read_text(encoding="utf-8")
+    written = {"index.html"}
+
+    for placeholder, name in ASSET_PLACEHOLDERS.items():
+        if index.count(placeholder) != 1:
+            raise ValueError(f"index.html には {placeholder} がちょうど1個必要です")
+        data = _minify(name, (src_dir / name).read_text(encoding="utf-8")).encode("utf-8")
+        versioned = _versioned_name(name, data)
+        target = out_dir / versioned
+        if not target.exists():
+            _write_with_precompressed(target, data)
+        index = index.replace(placeholder, versioned)
+        written.update({versioned, versioned + ".gz", versioned + ".br"})
+
+    (out_dir / "index.html").write_text(index, encoding="utf-8")
+    # 前のビルドの古いファイルは消す
+    for stale in out_dir.iterdir():
+        if stale.name not in written:
+            stale.unlink()
+    return out_dir
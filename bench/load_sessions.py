@@ -0,0 +1,446 @@
+# ★Streamlit のサーバーに「同時にN人」つないで、サイドバーを触ったときの重さを測る★
+# ブラウザは使わず、ブラウザと同じ websocket（/_stcore/stream）で BackMsg を送って ForwardMsg を受け取る。
+# 1セッション = 1本の websocket。app.py はセッションごとに丸ごと再実行されるので、人数が増えたときの
+#   ・再実行の待ち時間（ウィジェットを動かしてから script_finished が届くまで）
+#   ・サーバーのCPUとメモリ（1セッションあたり何MB増えるか）
+#   ・1回の再実行で websocket を流れるバイト数
+# を見る。キャッシュやコンポーネントに渡すデータを変えたら、前後で比べて効いたかを確かめる。
+#
+#   pip install streamlit websockets psutil       # psutil は無くても動く（Linux なら /proc を読む）
+#   python bench/load_sessions.py                          # 10セッション × 20操作 → bench/results/load.json
+#   python bench/load_sessions.py -n 1 -n 10 -n 50         # 人数を変えて並べる（人数ごとにサーバーを立て直す）
+#   python bench/load_sessions.py -n 30 --max-p95-ms 500   # p95 が500msを超えたら終了コード1
+#
+# 操作はセッションごとに決まった乱数で選ぶ（--seed が同じなら同じ順番）。
+#   武器の切り替え … ラジオを別の武器にして1回再実行
+#   スライダーのドラッグ … 少しずつ値を変えて間隔をあけずに送る（途中の再実行は次の値で打ち切られる）
+#   モードの切り替え … 通常⇔無限（スライダーが出たり消えたりする）
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_SCRIPT = BENCH_DIR.parent / "app" / "app.py"
+
+from run_bench import _git_commit, percentile  # noqa: E402
+
+try:
+    import websockets
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+except ImportError:
+    websockets = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# app.py のラベルと同じ（ラベルからウィジェットIDを探す）
+WEAPON_LABEL = "武器選択 ⚔️"
+MODE_LABEL = "ゲームモード"
+# ドラッグするスライダー。武器ごとのスライダーは、その武器を選んでいるときだけ見つかる
+DRAG_LABELS = ("白丸のHP", "サンドバッグの数", "パーティクル上限",
+               "⚔️ 斬撃の重さ", "🔫 散弾1発の威力", "⚡ レーザー威力", "☄️ ビーム威力(1hit)")
+# 操作の重み（武器を変える・スライダーを動かすが大半で、モードはたまに）
+ACTIONS = (("weapon", 4), ("drag", 5), ("mode", 1))
+DRAG_STEPS = 4           # 1回のドラッグで送る値の数
+DRAG_STEP_MS = 60        # ブラウザ側の間引き（debounce）くらいの間隔で次の値を送る
+SAMPLE_SECONDS = 0.5     # サーバーのCPUとメモリを見る間隔
+STARTUP_TIMEOUT = 60.0
+RERUN_TIMEOUT = 60.0
+FINISHED_SUCCESSFULLY = 0
+FINISHED_EARLY_FOR_RERUN = 2
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ---------- サーバー側の計測 ----------
+def _proc_usage(pid):
+    """(CPU秒, RSSバイト) を返す。psutil が無ければ /proc を読む（どちらも無理なら None）。"""
+    if psutil is not None:
+        p = psutil.Process(pid)
+        t = p.cpu_times()
+        return t.user + t.system, p.memory_info().rss
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        rss = int(stat[21]) * os.sysconf("SC_PAGE_SIZE")
+        return (int(stat[11]) + int(stat[12])) / ticks, rss
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ServerSampler:
+    """サーバープロセスのCPUとメモリを一定間隔で記録する。"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.samples = []  # (時刻, CPU秒, RSSバイト)
+        self._task = None
+
+    def read(self):
+        usage = _proc_usage(self.pid)
+        return None if usage is None else (time.perf_counter(), *usage)
+
+    async def _run(self):
+        while True:
+            sample = self.read()
+            if sample is not None:
+                self.samples.append(sample)
+            await asyncio.sleep(SAMPLE_SECONDS)
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        sample = self.read()
+        if sample is not None:
+            self.samples.append(sample)
+
+    def summary(self):
+        """区間全体のCPU使用率（1コア=100%）と、区切りごとの最大・RSSの最大を返す。"""
+        s = self.samples
+        if len(s) < 2:
+            return {}
+        rates = [(b[1] - a[1]) / (b[0] - a[0]) * 100 for a, b in zip(s, s[1:]) if b[0] > a[0]]
+        return {
+            "cpu_seconds": s[-1][1] - s[0][1],
+            "cpu_mean_pct": (s[-1][1] - s[0][1]) / (s[-1][0] - s[0][0]) * 100,
+            "cpu_max_pct": max(rates, default=0.0),
+            "rss_peak_mb": max(x[2] for x in s) / (1 << 20),
+        }
+
+
+def read_streamlit_metrics(base_url):
+    """/_stcore/metrics（テキスト形式）の値を {名前{ラベル}: 値} で返す。無ければ空。"""
+    try:
+        with urllib.request.urlopen(base_url + "_stcore/metrics", timeout=10) as r:
+            text = r.read().decode("utf-8")
+    except OSError:
+        return {}
+    metrics = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            try:
+                metrics[name] = float(value)
+            except ValueError:
+                pass
+    return metrics
+
+
+def start_server(port):
+    """app.py を streamlit run で立ち上げて、ヘルスチェックが通るまで待つ。"""
+    cmd = [
+        sys.executable, "-m", "streamlit", "run", str(APP_SCRIPT),
+        "--server.headless", "true", "--server.port", str(port), "--server.address", "127.0.0.1",
+        "--server.fileWatcherType", "none", "--server.runOnSave", "false",
+        "--browser.gatherUsageStats", "false", "--logger.level", "error",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("streamlit が起動できませんでした:\n" + proc.stderr.read().decode(errors="replace"))
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"streamlit が {STARTUP_TIMEOUT:.0f}秒以内に起動しませんでした")
+
+
+# ---------- 1人ぶんのセッション ----------
+class Session:
+    """ブラウザの代わりに1本の websocket でつないで、ウィジェットの状態を送っては再実行を待つ。"""
+
+    def __init__(self, url, seed):
+        self.url = url
+        self.rng = random.Random(seed)
+        self.ws = None
+        self.widgets = {}     # 最後の実行で描かれたウィジェット: ラベル -> (ID, 種類, 要素のproto)
+        self.states = {}      # 送るウィジェットの値: ID -> WidgetState
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.reruns = []      # 操作ごとの {kind, ms, bytes_in, bytes_out, sent, interrupted}
+        self.errors = []
+
+    async def connect(self):
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None,
+                                           ping_interval=None, compression=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def _send(self):
+        msg = BackMsg()
+        # ブラウザと同じく、今見えているウィジェットの値を全部送る
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        data = msg.SerializeToString()
+        self.bytes_out += len(data)
+        await self.ws.send(data)
+
+    async def _wait_finished(self):
+        """script_finished（打ち切りではないもの）が届くまで読む。途中の打ち切りは数えて返す。"""
+        seen = {}
+        interrupted = 0
+        while True:
+            raw = await asyncio.wait_for(self.ws.recv(), RERUN_TIMEOUT)
+            self.bytes_in += len(raw)
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            kind = msg.WhichOneof("type")
+            if kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element = msg.delta.new_element
+                widget = getattr(element, element.WhichOneof("type"))
+                if getattr(widget, "id", "") and hasattr(widget, "label"):
+                    seen[widget.label] = (widget.id, element.WhichOneof("type"), widget)
+            elif kind == "script_finished":
+                if msg.script_finished == FINISHED_EARLY_FOR_RERUN:
+                    interrupted += 1
+                    seen = {}
+                    continue
+                if msg.script_finished != FINISHED_SUCCESSFULLY:
+                    self.errors.append(f"script_finished={msg.script_finished}")
+                # 消えたウィジェットの値はもう送らない（ブラウザも同じ）
+                self.widgets = seen
+                ids = {w[0] for w in seen.values()}
+                self.states = {i: s for i, s in self.states.items() if i in ids}
+                return interrupted
+
+    async def rerun(self, kind, values):
+        """values（[(ラベル, 値), ...]）を順に送って、最後の値の再実行が終わるまでを測る。"""
+        in0, out0 = self.bytes_in, self.bytes_out
+        for i, (label, value) in enumerate(values):
+            if i:
+                await asyncio.sleep(DRAG_STEP_MS / 1000)
+            self._set(label, value)
+            start = time.perf_counter()
+            await self._send()
+        interrupted = await self._wait_finished()
+        self.reruns.append({
+            "kind": kind, "ms": (time.perf_counter() - start) * 1000,
+            "bytes_in": self.bytes_in - in0, "bytes_out": self.bytes_out - out0,
+            "sent": len(values), "interrupted": interrupted,
+        })
+
+    async def first_run(self):
+        """ページを開いたときの最初の実行。(ms, 受信バイト) を返す。"""
+        start = time.perf_counter()
+        await self._send()
+        await self._wait_finished()
+        return (time.perf_counter() - start) * 1000, self.bytes_in
+
+    def _set(self, label, value):
+        widget_id, kind, _ = self.widgets[label]
+        state = WidgetState(id=widget_id)
+        if kind == "slider":
+            state.double_array_value.data.append(value)
+        elif kind == "checkbox":
+            state.bool_value = value
+        else:  # radio / selectbox は選んだ選択肢の文字列
+            state.string_value = value
+        self.states[widget_id] = state
+
+    def _current_option(self, label):
+        widget_id, _, proto = self.widgets[label]
+        state = self.states.get(widget_id)
+        return state.string_value if state is not None else proto.options[proto.default]
+
+    def next_action(self):
+        """次の操作を (種類, [(ラベル, 値), ...]) で返す。"""
+        kind = self.rng.choices([a for a, _ in ACTIONS], [w for _, w in ACTIONS])[0]
+        if kind in ("weapon", "mode"):
+            label = WEAPON_LABEL if kind == "weapon" else MODE_LABEL
+            options = [o for o in self.widgets[label][2].options if o != self._current_option(label)]
+            return kind, [(label, self.rng.choice(options))]
+        label = self.rng.choice([name for name in DRAG_LABELS if name in self.widgets])
+        widget_id, _, proto = self.widgets[label]
+        state = self.states.get(widget_id)
+        now = state.double_array_value.data[0] if state is not None else proto.default[0]
+        # 今の位置から、ランダムな向きへ数目盛りずつ動かす
+        direction = self.rng.choice((-1, 1))
+        values = []
+        for _ in range(DRAG_STEPS):
+            now = min(proto.max, max(proto.min, now + direction * proto.step * self.rng.randint(1, 3)))
+            values.append(now)
+        return "drag", [(label, v) for v in values]
+
+    async def play(self, actions, think_ms):
+        for _ in range(actions):
+            # 人が次に触るまでの間（全員が同時に送らないように、ばらつかせる）
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5) * think_ms / 1000)
+            kind, values = self.next_action()
+            try:
+                await self.rerun(kind, values)
+            except (asyncio.TimeoutError, websockets.ConnectionClosed) as e:
+                self.errors.append(f"{kind}: {type(e).__name__}")
+                return
+
+
+# ---------- 1回ぶんの計測（人数ごと） ----------
+def _mb(value):
+    return value / (1 << 20)
+
+
+def summarize_reruns(reruns, wall_seconds):
+    ms = [r["ms"] for r in reruns]
+    runs = sum(1 + r["interrupted"] for r in reruns)  # 打ち切られたぶんもサーバーは走らせている
+    summary = {
+        "interactions": len(reruns),
+        "reruns": runs,
+        "interrupted_reruns": sum(r["interrupted"] for r in reruns),
+        "reruns_per_second": runs / wall_seconds if wall_seconds else 0.0,
+        "latency_p50_ms": percentile(ms, 50),
+        "latency_p95_ms": percentile(ms, 95),
+        "latency_p99_ms": percentile(ms, 99),
+        "latency_max_ms": max(ms, default=0.0),
+        "bytes_in_per_rerun": sum(r["bytes_in"] for r in reruns) / runs if runs else 0.0,
+        "bytes_out_per_rerun": sum(r["bytes_out"] for r in reruns) / runs if runs else 0.0,
+    }
+    summary["by_action"] = {
+        kind: {
+            "count": len(group),
+            "latency_p50_ms": percentile([r["ms"] for r in group], 50),
+            "latency_p95_ms": percentile([r["ms"] for r in group], 95),
+            "bytes_in_mean": sum(r["bytes_in"] for r in group) / len(group),
+        }
+        for kind in dict(ACTIONS) if (group := [r for r in reruns if r["kind"] == kind])
+    }
+    return summary
+
+
+async def run_level(sessions, actions, think_ms, seed):
+    """新しいサーバーに sessions 人つないで、全員が actions 回ずつ操作したときの数字を返す。"""
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}/"
+    ws_url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    proc = start_server(port)
+    sampler = ServerSampler(proc.pid)
+    try:
+        # 1人目の最初の実行はモジュールの読み込みとキャッシュ作りを含むので、別に測って閉じる
+        warm = Session(ws_url, seed)
+        await warm.connect()
+        cold_ms, _ = await warm.first_run()
+        await warm.close()
+        await asyncio.sleep(SAMPLE_SECONDS)
+        baseline = sampler.read()
+
+        clients = [Session(ws_url, seed * 1000 + i) for i in range(sessions)]
+        await asyncio.gather(*(c.connect() for c in clients))
+        first_runs = await asyncio.gather(*(c.first_run() for c in clients))
+        await asyncio.sleep(SAMPLE_SECONDS)
+        connected = sampler.read()
+
+        sampler.start()
+        start = time.perf_counter()
+        await asyncio.gather(*(c.play(actions, think_ms) for c in clients))
+        wall = time.perf_counter() - start
+        await sampler.stop()
+        metrics_text = read_streamlit_metrics(base_url)
+        await asyncio.gather(*(c.close() for c in clients))
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    reruns = [r for c in clients for r in c.reruns]
+    result = {"sessions": sessions, "actions_per_session": actions, "think_ms": think_ms, "seconds": wall}
+    first_ms = [ms for ms, _ in first_runs]
+    result["first_run"] = {
+        "cold_ms": cold_ms, "p50_ms": percentile(first_ms, 50), "p95_ms": percentile(first_ms, 95),
+        "bytes_in_mean": sum(b for _, b in first_runs) / sessions,
+    }
+    result["reruns"] = summarize_reruns(reruns, wall)
+    server = sampler.summary()
+    if baseline is not None and connected is not None:
+        server.update({
+            "rss_baseline_mb": _mb(baseline[2]),
+            "rss_connected_mb": _mb(connected[2]),
+            # つないで1回実行しただけで増えたぶん ÷ 人数
+            "rss_per_session_mb": _mb(connected[2] - baseline[2]) / sessions,
+            "rss_growth_while_playing_mb": _mb(sampler.samples[-1][2] - connected[2]) if sampler.samples else None,
+        })
+    result["server"] = server
+    result["streamlit_metrics"] = metrics_text
+    result["errors"] = [e for c in clients for e in c.errors]
+    return result
+
+
+def _print_level(result):
+    r = result["reruns"]
+    s = result["server"]
+    line = (f"  再実行 p50 {r['latency_p50_ms']:.0f}ms / p95 {r['latency_p95_ms']:.0f}ms / "
+            f"p99 {r['latency_p99_ms']:.0f}ms / {r['reruns_per_second']:.1f}回/秒 / "
+            f"受信 {r['bytes_in_per_rerun'] / 1024:.1f}KB/回")
+    if "cpu_mean_pct" in s:
+        line += f" / CPU 平均{s['cpu_mean_pct']:.0f}% 最大{s['cpu_max_pct']:.0f}%"
+    if "rss_per_session_mb" in s:
+        line += f" / {s['rss_per_session_mb']:.2f}MB/人"
+    print(line, flush=True)
+    for e in result["errors"][:5]:
+        print(f"     エラー: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streamlit の同時セッション負荷ベンチ")
+    parser.add_argument("-n", "--sessions", type=int, action="append",
+                        help="同時につなぐセッション数（複数指定で人数ごとに測る。省略で10）")
+    parser.add_argument("--actions", type=int, default=20, help="1セッションあたりの操作回数")
+    parser.add_argument("--think-ms", type=float, default=1000, help="操作と操作のあいだの平均の間（ms）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-p95-ms", type=float, help="再実行の p95 がこれを超えたら終了コード1")
+    parser.add_argument("--out", type=Path, default=BENCH_DIR / "results" / "load.json")
+    args = parser.parse_args(argv)
+
+    if websockets is None:
+        parser.exit(2, "streamlit と websockets が必要です: pip install streamlit websockets\n")
+
+    levels = []
+    for sessions in args.sessions or [10]:
+        print(f"{sessions}セッション × {args.actions}操作 ...", flush=True)
+        result = asyncio.run(run_level(sessions, args.actions, args.think_ms, args.seed))
+        result["passed"] = not result["errors"] and (
+            args.max_p95_ms is None or result["reruns"]["latency_p95_ms"] <= args.max_p95_ms)
+        _print_level(result)
+        levels.append(result)
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(), "cpu_count": os.cpu_count(),
+        "sampler": "psutil" if psutil is not None else "/proc",
+        "passed": all(r["passed"] for r in levels), "levels": levels,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"結果: {args.out}")
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
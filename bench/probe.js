@@ -0,0 +1,31 @@
+// ★ベンチ用の計測フック（ページのどのスクリプトよりも先に読み込まれる）★
+// requestAnimationFrame のコールバックを包んで、フレーム間隔と1フレームの処理時間（frame() の中身）を記録する。
+// ゲーム側には何も足さないので、本番と同じコードをそのまま測れる。
+(() => {
+    const MAX_FRAMES = 1 << 17; // 60fps で30分ぶん。あふれたら古いほうから上書き
+    const intervals = new Float64Array(MAX_FRAMES);
+    const work = new Float64Array(MAX_FRAMES);
+    let count = 0; let lastNow = null; let recording = false;
+
+    const raf = window.requestAnimationFrame.bind(window);
+    window.requestAnimationFrame = callback => raf(now => {
+        const start = performance.now();
+        callback(now);
+        const spent = performance.now() - start;
+        if (recording && lastNow !== null) {
+            const i = count % MAX_FRAMES;
+            intervals[i] = now - lastNow; work[i] = spent; count++;
+        }
+        lastNow = now;
+    });
+
+    window.__benchProbe = {
+        start() { count = 0; lastNow = null; recording = true; },
+        // 記録を止めて、[間隔, 処理時間] を普通の配列で返す（Python 側で集計する）
+        stop() {
+            recording = false;
+            const n = Math.min(count, MAX_FRAMES);
+            return { intervals: Array.from(intervals.subarray(0, n)), work: Array.from(work.subarray(0, n)), dropped: count - n };
+        },
+    };
+})();
@@ -0,0 +1,336 @@
+# ★ヘッドレスChromiumでゲームを動かして、負荷シナリオごとにフレーム時間・ヒープ・エンティティ数を測る★
+# GPUもネットも使わない（描画は WebGL も含めて SwiftShader のソフトウェア、ゲームはローカルのhttp.serverから配って外向きの通信は全部止める）。
+# Streamlit も立ち上げず、ビルドした index.html に streamlit:render のメッセージを直接送って起動する。
+#
+#   pip install playwright && playwright install chromium
+#   python bench/run_bench.py                        # 全シナリオ → bench/results/latest.json
+#   python bench/run_bench.py -s shotgun_fire -s ko_burst --seconds 10
+#   python bench/run_bench.py --soak-seconds 600     # 長時間の無限モードだけ延ばす
+#
+# しきい値（bench/thresholds.json）を1つでも超えたら終了コード1を返すので、デプロイ前のチェックにそのまま使える。
+# 最後に効果音（sfx.js）を OfflineAudioContext に描き出して、鳴り始めの時刻と大きさも確かめる（音は出さない）。
+import argparse
+import functools
+import json
+import math
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "app"))
+
+from scenarios import BASE_CONFIG, SCENARIOS  # noqa: E402
+from static_assets import build_frontend  # noqa: E402
+
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:
+    sync_playwright = None
+
+VIEWPORT = {"width": 800, "height": 600}  # GAME_HEIGHT と同じ高さ
+WARMUP_SECONDS = 2.0     # 起動直後（JIT・スプライト作り）は数えない
+SAMPLE_SECONDS = 1.0     # エンティティ数とヒープを見る間隔
+GL_CHECK_SECONDS = 3.0   # 測り終えたあと、WebGL のキャンバスに何か描かれるまで待つ長さ
+LONG_FRAME_MS = 50.0     # これより長い間隔は「カクついた」フレームとして数える
+CHROMIUM_ARGS = [
+    # GPU があっても使わず、WebGL も含めて SwiftShader（CPU）で描く（--disable-gpu だと WebGL ごと消える）
+    "--use-angle=swiftshader", "--enable-unsafe-swiftshader", "--ignore-gpu-blocklist",
+    # 見えていないタブ扱いで間引かれないように
+    "--disable-background-timer-throttling", "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+]
+
+# ゲームの中の数をまとめて読む（game.js のトップレベルの変数はページから名前で見える）
+READ_ENTITIES = """() => ({
+    particles: particles.count, pellets: projectileCount('shotgun'), lasers: projectileCount('laser'),
+    beams: projectileCount('giant_beam'), popups: damagePopups.count, alive: aliveCount,
+    tick: simTick, tier: qualityTier, renderer: RENDERER,
+})"""
+SEND_CONFIG = "config => window.postMessage({ type: 'streamlit:render', args: { config } }, '*')"
+# WebGL で本当に描けたか：ゲームが描いた直後（同じフレームの requestAnimationFrame の後ろ）に glCanvas を2Dに写して、
+# 色の付いた画素を数える。シェーダーが通っても何も出ていなければ 0 になる。あわせて使った GL の名前（SwiftShader など）も返す
+READ_GL_OUTPUT = """() => new Promise(done => requestAnimationFrame(() => {
+    const source = document.getElementById('glCanvas');
+    const copy = document.createElement('canvas'); copy.width = source.width; copy.height = source.height;
+    const g = copy.getContext('2d'); g.drawImage(source, 0, 0);
+    const pixels = g.getImageData(0, 0, copy.width, copy.height).data;
+    let lit = 0;
+    for (let i = 3; i < pixels.length; i += 4) if (pixels[i] > 0) lit++;
+    const gl = source.getContext('webgl2'); const info = gl && gl.getExtension('WEBGL_debug_renderer_info');
+    done({ lit, gl: info ? gl.getParameter(info.UNMASKED_RENDERER_WEBGL) : null });
+}))"""
+
+# 効果音：鉄球の軽い当たり(3F) → 重い当たり(25F) → 撃破(120F) を30ティック（0.5秒）おきに描き出して、
+# それぞれの鳴り始めの時刻と、その区間の一番大きい振幅を返す
+SFX_HITS = (0, 0, 3, 30, 0, 25, 60, 5, 120)
+SFX_ONSET_TOLERANCE_MS = 3.0   # 鳴り始めの立ち上がり（2ms）＋ 余裕
+RENDER_SFX = """async hits => {
+    const buffer = await SfxEngine.renderOffline(hits, 2.0);
+    const data = buffer.getChannelData(0); const rate = buffer.sampleRate;
+    const result = [];
+    for (let k = 0; k < hits.length; k += 3) {
+        const from = Math.round((hits[k] - hits[0]) / 60 * rate);
+        const to = k + 3 < hits.length ? Math.round((hits[k + 3] - hits[0]) / 60 * rate) : data.length;
+        let onset = null; let peak = 0;
+        for (let i = from; i < to; i++) {
+            const v = Math.abs(data[i]);
+            if (onset === null && v > 0.01) onset = (i - from) / rate * 1000;
+            peak = Math.max(peak, v);
+        }
+        result.push({ onset_ms: onset, peak });
+    }
+    return result;
+}"""
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory):
+    """directory をローカルの空きポートで配って、(サーバー, URL) を返す。"""
+    handler = functools.partial(_QuietHandler, directory=str(directory))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def percentile(values, q):
+    """最近傍の順位で q パーセンタイルを返す（空なら 0）。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize_frames(intervals, work):
+    """フレーム間隔と処理時間の分布をまとめる。"""
+    total = sum(intervals)
+    return {
+        "frames": len(intervals),
+        "fps": len(intervals) / (total / 1000) if total else 0.0,
+        "interval_p50_ms": percentile(intervals, 50),
+        "interval_p95_ms": percentile(intervals, 95),
+        "interval_p99_ms": percentile(intervals, 99),
+        "interval_max_ms": max(intervals, default=0.0),
+        "work_p50_ms": percentile(work, 50),
+        "work_p95_ms": percentile(work, 95),
+        "work_p99_ms": percentile(work, 99),
+        "work_max_ms": max(work, default=0.0),
+        "long_frame_ratio": sum(i > LONG_FRAME_MS for i in intervals) / len(intervals) if intervals else 0.0,
+    }
+
+
+def summarize_entities(samples):
+    """1秒ごとのエンティティ数から、種類ごとの最大と平均を出す。"""
+    keys = ("particles", "pellets", "lasers", "beams", "popups", "alive")
+    return {
+        key: {"max": max(s[key] for s in samples), "mean": sum(s[key] for s in samples) / len(samples)}
+        for key in keys
+    } if samples else {}
+
+
+def check_thresholds(metrics, limits):
+    """しきい値ごとに {metric, value, limit, ok} を返す（値がしきい値以下なら ok）。"""
+    return [
+        {"metric": name, "value": metrics.get(name), "limit": limit,
+         "ok": metrics.get(name) is not None and metrics[name] <= limit}
+        for name, limit in limits.items()
+    ]
+
+
+def thresholds_for(thresholds, name):
+    return {**thresholds.get("default", {}), **thresholds.get("scenarios", {}).get(name, {})}
+
+
+def _heap_mb(cdp, collect=False):
+    # GC してから測ると、その時点で本当に生きているぶんだけになる
+    if collect:
+        cdp.send("HeapProfiler.collectGarbage")
+    return cdp.send("Runtime.getHeapUsage")["usedSize"] / (1 << 20)
+
+
+def run_scenario(browser, url, scenario, seconds):
+    """1シナリオを新しいページで走らせて、計測結果を返す。"""
+    context = browser.new_context(viewport=VIEWPORT, device_scale_factor=1)
+    # ローカルのゲーム以外には出ていかない
+    context.route("**/*", lambda route: route.continue_() if route.request.url.startswith(url) else route.abort())
+    context.add_init_script(path=str(BENCH_DIR / "probe.js"))
+    page = context.new_page()
+    errors = []
+    page.on("pageerror", lambda e: errors.append(str(e)))
+    cdp = context.new_cdp_session(page)
+    try:
+        page.goto(url)
+        page.evaluate(SEND_CONFIG, scenario.config)
+        page.wait_for_function("() => typeof simTick === 'number' && simTick > 0")
+        w, h = VIEWPORT["width"], VIEWPORT["height"]
+
+        sent = {}
+        step_seconds = scenario.step_ms / 1000
+
+        def drive(duration, on_sample=None):
+            nonlocal sent
+            start = time.perf_counter()
+            next_sample = 0.0
+            while (t := time.perf_counter() - start) < duration:
+                if scenario.config_at is not None:
+                    overrides = scenario.config_at(t)
+                    if overrides != sent:
+                        page.evaluate(SEND_CONFIG, {**scenario.config, **overrides})
+                        sent = overrides
+                scenario.step(page, t, w, h)
+                if on_sample is not None and t >= next_sample:
+                    on_sample()
+                    next_sample += SAMPLE_SECONDS
+                page.wait_for_timeout(step_seconds * 1000)
+
+        drive(WARMUP_SECONDS)
+        heap_start = _heap_mb(cdp, collect=True)
+        samples = []
+        heap_peak = heap_start
+
+        def sample():
+            nonlocal heap_peak
+            samples.append(page.evaluate(READ_ENTITIES))
+            heap_peak = max(heap_peak, _heap_mb(cdp))
+
+        page.evaluate("() => __benchProbe.start()")
+        drive(seconds, sample)
+        frames = page.evaluate("() => __benchProbe.stop()")
+        gl_output = None
+        if scenario.config.get("renderer") == "webgl":
+            # GL に描くのは火花と光線だけなので、たまたま何も飛んでいない瞬間もある。描かれるまで少し回して待つ（計測の外）
+            deadline = time.perf_counter() + GL_CHECK_SECONDS
+            while (gl_output := page.evaluate(READ_GL_OUTPUT))["lit"] == 0 and time.perf_counter() < deadline:
+                scenario.step(page, seconds, w, h)
+                page.wait_for_timeout(step_seconds * 1000)
+        heap_end = _heap_mb(cdp, collect=True)
+    finally:
+        context.close()
+
+    # WebGL を頼んだのに Canvas 2D で描いていたら、測りたいものを測れていない
+    if scenario.config.get("renderer") == "webgl" and any(s["renderer"] == "canvas" for s in samples):
+        errors.append("WebGL が使えず Canvas 2D で描画しました")
+    elif gl_output is not None and gl_output["lit"] == 0:
+        errors.append("WebGL のキャンバスに何も描かれていません")
+
+    metrics = summarize_frames(frames["intervals"], frames["work"])
+    metrics.update({
+        "heap_start_mb": heap_start, "heap_end_mb": heap_end, "heap_peak_mb": heap_peak,
+        "heap_growth_mb": heap_end - heap_start,
+        "ticks": samples[-1]["tick"] - samples[0]["tick"] if samples else 0,
+        "dropped_frames": frames["dropped"],
+    })
+    return {
+        "name": scenario.name, "description": scenario.description, "seconds": seconds,
+        "config": scenario.config, "metrics": metrics, "gl": gl_output,
+        "entities": summarize_entities(samples), "errors": errors,
+    }
+
+
+def check_sfx(browser, url):
+    """効果音を OfflineAudioContext に描き出して、当たりのティックどおりに鳴り始めるか・重いほど大きいか・割れないかを見る。"""
+    context = browser.new_context(viewport=VIEWPORT)
+    context.route("**/*", lambda route: route.continue_() if route.request.url.startswith(url) else route.abort())
+    page = context.new_page()
+    try:
+        page.goto(url)
+        page.evaluate(SEND_CONFIG, BASE_CONFIG)
+        page.wait_for_function("() => typeof SfxEngine === 'function'")
+        hits = page.evaluate(RENDER_SFX, list(SFX_HITS))
+    finally:
+        context.close()
+    onsets = [h["onset_ms"] for h in hits]
+    peaks = [h["peak"] for h in hits]
+    checks = [
+        {"metric": "sfx_onset_ms", "value": onsets, "limit": SFX_ONSET_TOLERANCE_MS,
+         "ok": all(o is not None and o <= SFX_ONSET_TOLERANCE_MS for o in onsets)},
+        {"metric": "sfx_heavier_is_louder", "value": peaks[:2], "limit": None, "ok": peaks[0] < peaks[1]},
+        {"metric": "sfx_peak", "value": max(peaks), "limit": 1.0, "ok": max(peaks) <= 1.0},
+    ]
+    return {"checks": checks, "passed": all(c["ok"] for c in checks)}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ヒットストップゲームのヘッドレス負荷ベンチ")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="走らせるシナリオ（複数指定可。省略で全部）")
+    parser.add_argument("--seconds", type=float, help="各シナリオの計測秒数（省略でシナリオごとの既定値）")
+    parser.add_argument("--soak-seconds", type=float, help="infinite_soak だけの計測秒数")
+    parser.add_argument("--thresholds", type=Path, default=BENCH_DIR / "thresholds.json")
+    parser.add_argument("--out", type=Path, default=BENCH_DIR / "results" / "latest.json")
+    parser.add_argument("--headed", action="store_true", help="ウィンドウを出して動きを見る（数値は参考程度）")
+    args = parser.parse_args(argv)
+
+    if sync_playwright is None:
+        parser.exit(2, "playwright が必要です: pip install playwright && playwright install chromium\n")
+
+    thresholds = json.loads(args.thresholds.read_text(encoding="utf-8"))
+    names = args.scenario or list(SCENARIOS)
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        server, url = serve(build_frontend(out_dir=Path(build_dir)))
+        try:
+            with sync_playwright() as p:
+                browser = p.chromium.launch(headless=not args.headed, args=CHROMIUM_ARGS)
+                results = []
+                for name in names:
+                    scenario = SCENARIOS[name]
+                    seconds = args.seconds or scenario.seconds
+                    if name == "infinite_soak" and args.soak_seconds:
+                        seconds = args.soak_seconds
+                    print(f"{name}: {seconds:.0f}秒 ...", flush=True)
+                    result = run_scenario(browser, url, scenario, seconds)
+                    result["checks"] = check_thresholds(result["metrics"], thresholds_for(thresholds, name))
+                    result["passed"] = all(c["ok"] for c in result["checks"]) and not result["errors"]
+                    results.append(result)
+                    m = result["metrics"]
+                    print(f"  {'OK ' if result['passed'] else 'NG '} 処理 p95 {m['work_p95_ms']:.2f}ms / "
+                          f"間隔 p95 {m['interval_p95_ms']:.1f}ms / {m['fps']:.0f}fps / "
+                          f"ヒープ {m['heap_growth_mb']:+.2f}MB", flush=True)
+                    for c in result["checks"]:
+                        if not c["ok"]:
+                            print(f"     {c['metric']} = {c['value']} > {c['limit']}")
+                    for e in result["errors"]:
+                        print(f"     エラー: {e}")
+                print("sfx: OfflineAudioContext ...", flush=True)
+                sfx = check_sfx(browser, url)
+                print(f"  {'OK ' if sfx['passed'] else 'NG '} 鳴り始め {sfx['checks'][0]['value']}ms", flush=True)
+                for c in sfx["checks"]:
+                    if not c["ok"]:
+                        print(f"     {c['metric']} = {c['value']}")
+                version = browser.version
+                browser.close()
+        finally:
+            server.shutdown()
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(), "browser": f"chromium {version}", "viewport": VIEWPORT,
+        "passed": all(r["passed"] for r in results) and sfx["passed"], "scenarios": results, "sfx": sfx,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"結果: {args.out}")
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# ★ベンチの負荷シナリオ★
+# どれも「ゲームの設定」＋「一定間隔で呼ばれる操作」でできている。
+# 操作は本物のマウスイベント（page.mouse）で送るので、入力キュー → update() → draw() の全部を通る。
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# app.py の初期値と同じ。シナリオはここから違うところだけ上書きする
+# 品質は「高」に固定（自動だと重くなったぶん品質が下がって、退行が数字に出にくい）
+# ワーカーは使わない（計測フックもエンティティ数の読み出しも、ページのスレッドにあるゲームを見る）
+BASE_CONFIG = {
+    "isInfinite": False, "maxHp": 200, "weaponType": "ball",
+    "swordHitStop": 5, "shotgunDamage": 8, "laserDamage": 25, "giantBeamDamage": 15,
+    "particleBudget": 1500, "sandbagCount": 1,
+    "qualityTier": 0, "qualityDownMs": 20, "qualityUpMs": 8, "perfHud": False, "useWorker": False,
+    "renderer": "canvas", "sfxVolume": 60,
+}
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    config: dict
+    # step(page, 経過秒, 画面の幅, 高さ) を step_ms ごとに呼ぶ
+    step: Callable
+    seconds: float = 20.0
+    step_ms: int = 100
+    # 経過秒 -> 上書きする設定（途中で武器を変えるシナリオ用）。変わったときだけ送る
+    config_at: Optional[Callable] = None
+
+
+def _crowd_y(t, h, period=2.0):
+    """右半分のサンドバッグの列を上下に往復する狙い位置。"""
+    phase = (t / period) % 1.0
+    return h * (0.15 + 0.7 * (1 - abs(phase * 2 - 1)))
+
+
+def _fire_at_crowd(page, t, w, h):
+    page.mouse.click(w * 0.75, _crowd_y(t, h))
+
+
+def _fire_at_corners(page, t, w, h):
+    # 角に向けて撃つと、壁で跳ね返ったレーザーが分裂しながら増える
+    corners = ((w - 2, 2), (w - 2, h - 2), (2, 2), (2, h - 2))
+    x, y = corners[int(t * 10) % len(corners)]
+    page.mouse.click(x, y)
+
+
+# 「もう一回戦う！」が出ていたら押す（ゲームの中の変数は見ないので、ワーカーで動かしても同じ）。
+# ボタンはずっと脈打っているので page.click だと止まるのを待ち続ける。DOM の click() で押して、ページの入力と同じ道を通す
+PRESS_RESPAWN = """() => {
+    const button = document.getElementById('respawnBtn');
+    if (button.style.display !== 'block') return false;
+    button.click();
+    return true;
+}"""
+
+
+def _fire_and_respawn(page, t, w, h):
+    # 全滅したらすぐ次の群れを出す（撃破の火花と止めが何度も重なる）
+    page.evaluate(PRESS_RESPAWN)
+    # 群れの手前を狙って扇を広げる（奥の真ん中を狙うと、手前の上下の角が射線に入らずに残って全滅しない）
+    page.mouse.click(w * 0.5, _crowd_y(t, h))
+
+
+SOAK_WEAPONS = ("sword", "shotgun", "laser", "giant_beam")
+SOAK_WEAPON_SECONDS = 15
+
+
+def _soak_weapon(t):
+    return {"weaponType": SOAK_WEAPONS[int(t // SOAK_WEAPON_SECONDS) % len(SOAK_WEAPONS)]}
+
+
+def _config(**overrides):
+    return {**BASE_CONFIG, **overrides}
+
+
+SCENARIOS = {
+    s.name: s for s in (
+        Scenario(
+            "shotgun_fire", "ショットガンを撃ちっぱなし（散弾12発 × 50体の判定）",
+            _config(weaponType="shotgun", isInfinite=True, maxHp=9999, sandbagCount=50),
+            _fire_at_crowd,
+        ),
+        Scenario(
+            "laser_bounce", "レーザーを角に向けて連射して、跳ね返りで増やす",
+            _config(weaponType="laser", isInfinite=True, maxHp=9999, sandbagCount=20),
+            _fire_at_corners,
+        ),
+        Scenario(
+            "giant_beam_stack", "極太ビームを重ねて撃つ（光のスプライトと大きい火花）",
+            _config(weaponType="giant_beam", isInfinite=True, maxHp=9999, sandbagCount=50),
+            _fire_at_crowd,
+        ),
+        Scenario(
+            "ko_burst", "HP最低の300体をビームでまとめて倒しては出し直す",
+            _config(weaponType="giant_beam", maxHp=100, giantBeamDamage=50, sandbagCount=300),
+            _fire_and_respawn,
+        ),
+        # WebGL の描画エンジン（ベンチの Chromium は SwiftShader なので、CPU だけのマシンでもこのまま動く）
+        Scenario(
+            "laser_bounce_webgl", "laser_bounce を WebGL で描く",
+            _config(weaponType="laser", isInfinite=True, maxHp=9999, sandbagCount=20, renderer="webgl"),
+            _fire_at_corners,
+        ),
+        Scenario(
+            "particle_storm_webgl", "火花の上限5000で ko_burst を WebGL で描く（インスタンス描画の詰め込みを見る）",
+            _config(weaponType="giant_beam", maxHp=100, giantBeamDamage=50, sandbagCount=300,
+                    particleBudget=5000, renderer="webgl"),
+            _fire_and_respawn,
+        ),
+        Scenario(
+            "infinite_soak", "無限モードで武器を回しながら長時間動かす（ヒープの増え方を見る）",
+            _config(isInfinite=True, maxHp=9999, sandbagCount=60),
+            _fire_at_crowd, seconds=120.0, config_at=_soak_weapon,
+        ),
+    )
+}
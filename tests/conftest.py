@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# app/ のモジュールは app.py と同じく、フォルダの中から平らに import する
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
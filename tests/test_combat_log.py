@@ -0,0 +1,98 @@
+import sqlite3
+
+import pytest
+
+import combat_log
+from combat_log import CombatLog, IDLE_GAP_TICKS, SESSION_LIMIT
+
+
+def batch(session="s1", seq=1, tick=(10, 20), weapon=(0, 2), damage=(25.0, 8.0), critical=(False, True),
+          hit_stop=(12, 2), ko=(False, True)):
+    return {"session": session, "seq": seq, "tick": list(tick), "weapon": list(weapon), "damage": list(damage),
+            "critical": list(critical), "hitStop": list(hit_stop), "ko": list(ko)}
+
+
+def rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT session, seq, tick, weapon, damage, critical, hit_stop, ko "
+                            "FROM combat_events ORDER BY seq, tick").fetchall()
+
+
+@pytest.fixture
+def log(tmp_path):
+    return CombatLog(tmp_path / "data" / "combat_log.sqlite")
+
+
+def test_ingest_sums_the_session(log):
+    summary = log.ingest(batch())
+    assert (summary.hits, summary.damage, summary.hit_stop_frames, summary.kos) == (2, 33.0, 14, 1)
+    assert summary.combat_ticks == 10
+    assert log.summary("s1") is summary
+    assert log.summary("other") is None
+
+
+def test_idle_gaps_are_cut(log):
+    summary = log.ingest(batch(tick=(0, 10_000)))
+    assert summary.combat_ticks == IDLE_GAP_TICKS
+
+
+def test_same_seq_is_ingested_once(log):
+    log.ingest(batch(seq=1))
+    log.ingest(batch(seq=1))      # リランで同じ戻り値がもう一度届く
+    log.ingest(batch(seq=0))      # 古いもの
+    summary = log.ingest(batch(seq=2, tick=(30,), weapon=(1,), damage=(17.5,), critical=(0,), hit_stop=(5,), ko=(0,)))
+    assert summary.hits == 3
+    # seq はセッションごと。ほかのセッションの seq 1 は別に取り込む
+    assert log.ingest(batch(session="s2", seq=1)).hits == 2
+
+
+@pytest.mark.parametrize("bad", [
+    {k: v for k, v in batch().items() if k != "ko"},  # 列が無い
+    {**batch(), "tick": [10]},                        # 列の長さがそろっていない
+    {**batch(), "damage": [25.0, None]},              # null の要素
+    {**batch(), "weapon": [0, "sword"]},              # 数でない要素
+    {**batch(), "seq": None},
+])
+def test_malformed_batches_raise_value_error_and_change_nothing(log, bad):
+    with pytest.raises(ValueError):
+        log.ingest(bad)
+    assert log.summary("s1") is None
+    # 同じ seq の正しいバッチはあとから取り込める
+    assert log.ingest(batch()).hits == 2
+
+
+def test_oldest_sessions_are_forgotten(log):
+    for i in range(SESSION_LIMIT + 1):
+        log.ingest(batch(session=f"s{i}"))
+    assert log.summary("s0") is None
+    assert log.summary(f"s{SESSION_LIMIT}") is not None
+    # 忘れたセッションの seq も忘れるので、もう一度届いたら新しいセッションとして数える
+    assert log.ingest(batch(session="s0")).hits == 2
+
+
+def test_recent_sessions_are_kept(log):
+    log.ingest(batch(session="keep"))
+    for i in range(SESSION_LIMIT):
+        log.ingest(batch(session=f"s{i}"))
+        log.ingest(batch(session="keep", seq=1))   # 取り込み済みでも届けば新しい方へ
+    assert log.summary("keep") is not None
+    assert log.summary("s0") is None
+
+
+def test_flush_writes_rows_to_sqlite(log):
+    log.ingest(batch())
+    log.flush()
+    assert rows(log.path) == [
+        ("s1", 1, 10, "ball", 25.0, 0, 12, 0),
+        ("s1", 1, 20, "shotgun", 8.0, 1, 2, 1),
+    ]
+    log.flush()                   # 書いたものは二度書かない
+    assert len(rows(log.path)) == 2
+
+
+def test_full_buffer_flushes_on_ingest(log, monkeypatch):
+    monkeypatch.setattr(combat_log, "FLUSH_ROWS", 3)
+    log.ingest(batch(seq=1))
+    assert not log.path.exists()
+    log.ingest(batch(seq=2, weapon=(4, 9)))
+    assert [row[3] for row in rows(log.path)] == ["ball", "shotgun", "giant_beam", "9"]
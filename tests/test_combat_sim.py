@@ -0,0 +1,99 @@
+import math
+
+import numpy as np
+import pytest
+
+from combat_sim import (
+    ENGAGEMENT_BUDGET, ENGAGEMENT_RANGE, KO_HIT_STOP, SIM_HZ,
+    _timeline_stats, ball_damage, ball_hit_stop, shotgun_hit_stop, simulate, sword_damage,
+)
+
+
+def timeline(ticks, damage, stops, max_hp=100, infinite=False, horizon_ticks=600):
+    as_rows = lambda a: np.atleast_2d(np.asarray(a, dtype=float))
+    return _timeline_stats("test", as_rows(ticks), as_rows(damage), as_rows(stops), max_hp, infinite, horizon_ticks)
+
+
+@pytest.mark.parametrize("damage, frames", [(5, 1), (7, 1), (8, 2), (9, 2), (10, 3), (13, 3), (14, 4), (17, 4), (18, 5), (40, 5)])
+def test_shotgun_hit_stop_steps(damage, frames):
+    assert shotgun_hit_stop(damage) == frames
+
+
+def test_ball_damage_follows_speed():
+    np.testing.assert_allclose(ball_damage([0, 1.9, 2, 12, 22, 100]), [5, 5, 5, 27.5, 50, 50])
+
+
+def test_ball_hit_stop_is_half_the_damage_but_at_least_three():
+    np.testing.assert_array_equal(ball_hit_stop([5, 7, 25, 50]), [3, 3, 12, 25])
+
+
+def test_sword_damage_grows_with_hit_stop():
+    assert sword_damage(0) == 10
+    assert sword_damage(20) == 40
+
+
+def test_ko_cuts_the_timeline_and_freezes_for_ko_hit_stop():
+    # 50 ずつ当てて HP 120 は3発目（ティック30）で撃破。4発目は数えない
+    stats = timeline([10, 20, 30, 40], [50, 50, 50, 50], [4, 4, 4, 4], max_hp=120)
+    assert stats.ko_rate == 1
+    assert stats.ttk_median == pytest.approx(30 / SIM_HZ)
+    assert stats.hits == 3
+    assert stats.hit_stop_frames == 4 + 4 + KO_HIT_STOP
+    assert stats.dps == pytest.approx(150 / (30 / SIM_HZ))
+
+
+def test_hit_stop_is_overwritten_by_the_next_hit():
+    # 10F 止まる当たりの2ティック後に次が当たったら、最初の止まりは2Fで打ち切り
+    stats = timeline([0, 2], [1, 1], [10, 10])
+    assert stats.hit_stop_frames == 2 + 10
+
+
+def test_hits_past_the_horizon_do_not_count():
+    stats = timeline([10, 700], [200, 200], [4, 4], max_hp=300, horizon_ticks=600)
+    assert stats.ko_rate == 0
+    assert math.isnan(stats.ttk_median)
+    assert stats.dps == pytest.approx(200 / 10)
+    assert stats.horizon_seconds == 10
+
+
+def test_ttk_median_is_taken_over_engagements_that_ko():
+    ticks = [[60, 1000], [120, 1000], [180, 1000], [1000, 1000]]
+    stats = timeline(ticks, np.full((4, 2), 100.0), np.full((4, 2), 4.0), max_hp=100, horizon_ticks=600)
+    assert stats.ko_rate == 0.75
+    assert stats.ttk_median == pytest.approx(2.0)
+
+
+def test_infinite_mode_reports_per_minute():
+    # 20秒で 10 ダメージを2回：DPS 1、1分あたり6ヒット・24F
+    stats = timeline([60, 120], [10, 10], [4, 4], max_hp=5, infinite=True, horizon_ticks=20 * SIM_HZ)
+    assert stats.ko_rate == 0
+    assert stats.dps == pytest.approx(1.0)
+    assert stats.hits == pytest.approx(6)
+    assert stats.hit_stop_frames == pytest.approx(24)
+
+
+@pytest.mark.parametrize("weapon_type", ["ball", "shotgun"])
+def test_high_hp_still_reaches_ko(weapon_type):
+    # HP 5000 の鉄球・散弾は撃破まで3分ほど。1分で打ち切らずに撃破まで回す
+    stats = simulate(weapon_type, max_hp=5000)
+    assert stats.ko_rate > 0.9
+    assert 120 < stats.ttk_median < stats.horizon_seconds
+
+
+@pytest.mark.parametrize("weapon_type", ["ball", "sword", "shotgun", "laser", "giant_beam"])
+@pytest.mark.parametrize("max_hp", [50, 5000])
+def test_long_runs_use_fewer_engagements(weapon_type, max_hp):
+    # キャッシュに無い設定でも安く済むように、戦数×秒を予算に収める
+    stats = simulate(weapon_type, max_hp=max_hp)
+    assert ENGAGEMENT_RANGE[0] <= stats.engagements <= ENGAGEMENT_RANGE[1]
+    assert stats.engagements * stats.horizon_seconds <= max(ENGAGEMENT_BUDGET, ENGAGEMENT_RANGE[0] * stats.horizon_seconds)
+
+
+def test_explicit_horizon_and_engagements_are_kept():
+    stats = simulate("laser", engagements=10, horizon_seconds=5)
+    assert (stats.engagements, stats.horizon_seconds) == (10, 5)
+
+
+def test_unknown_weapon():
+    with pytest.raises(ValueError):
+        simulate("bow")
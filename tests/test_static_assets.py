@@ -0,0 +1,23 @@
+import re
+
+from static_assets import ASSET_PLACEHOLDERS, build_frontend
+
+# static_assets.py のコメントにある nginx の location と同じ形
+VERSIONED = re.compile(r"^[^/]+\.[0-9a-f]{12}\.(?:js|css)$")
+
+
+def test_build_writes_hashed_assets_next_to_their_gz(tmp_path):
+    out = build_frontend(out_dir=tmp_path)
+    index = (out / "index.html").read_text(encoding="utf-8")
+    assets = [p.name for p in out.iterdir() if VERSIONED.match(p.name)]
+    assert len(assets) == len(ASSET_PLACEHOLDERS)
+    for name in assets:
+        assert name in index
+        assert (out / (name + ".gz")).exists()
+
+
+def test_component_url_name_matches_the_nginx_location():
+    # 配る URL は /component/<declare_component を呼んだモジュール名>.<名前>/...
+    import game_component
+
+    assert game_component._hit_stop_game.name == "game_component.hit_stop_game"